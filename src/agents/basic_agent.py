@@ -1,16 +1,89 @@
 
-from typing import Optional, List, Dict, Any
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Optional, List, Dict, Any, Iterator, AsyncIterator
 from src.core.llm_client import LLMClient
+from src.core.context_window import ContextBuilder
+from src.core.summarizer import ConversationSummarizer
+from src.core.tool_calling import ToolCallRunner, get_tool_calls, merge_chunks
+
+if TYPE_CHECKING:
+    from src.core.session_store import SessionStore
+
+
+@dataclass
+class TurnMetrics:
+    """单轮对话的延迟指标"""
+    time_to_first_token: Optional[float] = None  # 首个token延迟（秒）
+    total_time: float = 0.0                      # 整轮耗时（秒）
+    output_tokens: int = 0                       # 输出token数
+    
+    @property
+    def tokens_per_second(self) -> float:
+        """生成速度（首个token之后的token/秒）"""
+        if self.time_to_first_token is None:
+            return 0.0
+        generation_time = self.total_time - self.time_to_first_token
+        if generation_time <= 0:
+            return 0.0
+        return self.output_tokens / generation_time
 
 
 class TravelAssistant:
     """基础旅行助手Agent"""
     
-    def __init__(self, name: str = "Aria"):
+    def __init__(self,
+                 name: str = "Aria",
+                 client: Optional[Any] = None,
+                 context_builder: Optional[ContextBuilder] = None,
+                 summarize_history: bool = True,
+                 session_id: Optional[str] = None,
+                 session_store: Optional["SessionStore"] = None,
+                 use_tools: bool = True,
+                 max_tool_steps: int = 5,
+                 tool_registry: Optional[Any] = None,
+                 retriever: Optional[Any] = None,
+                 rag_top_k: Optional[int] = None,
+                 rag_mode: Optional[str] = None):
         self.name = name
         self.system_prompt = self._create_system_prompt()
         self.conversation_history: List[Dict[str, str]] = []
-        self.client = LLMClient().get_clients()
+        self.client = client or LLMClient().get_clients()
+        self.context_builder = context_builder or ContextBuilder(
+            reserve_output_tokens=getattr(self.client, "max_tokens", None) or 2000
+        )
+        
+        # 会话存储：从存储中恢复历史，之后每轮只增量写入
+        self.session_id = session_id
+        self.session_store = session_store
+        summary = ""
+        if session_store is not None and session_id is not None:
+            state = session_store.load(session_id)
+            self.conversation_history = state.history
+            summary = state.summary
+        
+        # 移出上下文窗口的旧消息在后台合并成摘要
+        self.summarizer = ConversationSummarizer(
+            self.client,
+            name=name,
+            summary=summary,
+            on_update=self._save_summary,
+        ) if summarize_history else None
+        self.last_metrics: Optional[TurnMetrics] = None
+        
+        # 工具调用：把注册表中的工具schema交给模型，最多执行max_tool_steps步
+        self.use_tools = use_tools
+        self.max_tool_steps = max_tool_steps
+        self._tool_registry = tool_registry
+        self._tool_runner: Optional[ToolCallRunner] = None
+        
+        # 知识检索：每轮按用户消息检索目的地资料，作为参考资料注入上下文（retriever为None时不检索）
+        # rag_mode 为 vector/bm25/hybrid，None 时使用检索器的默认模式
+        self.retriever = retriever
+        self.rag_top_k = rag_top_k
+        self.rag_mode = rag_mode
+        self.last_passages: List[Dict[str, Any]] = []
         
         print(f"✨ {self.name}旅行助手已初始化")
     
@@ -24,6 +97,7 @@ class TravelAssistant:
         3. 回答关于目的地的问题
         4. 给出预算建议
         5. 提醒旅行注意事项
+        6. 需要计算预算、换算货币、估算交通时间或查询季节时，调用提供的工具获取准确结果
 
         回答风格：
         - 友好、热情、有帮助
@@ -49,49 +123,319 @@ class TravelAssistant:
         Returns:
             AI助手的回复
         """
-        # 如果需要重置对话历史
-        if reset_conversation:
-            self.conversation_history = []
-            print("对话历史已重置")
+        messages = self._prepare_turn(user_message, reset_conversation)
         
-        # 构建消息列表
-        messages = [
-            {"role": "system", "content": self.system_prompt}
-        ]
+        try:
+            response = self._run_tool_loop(messages)
+            return self._finish_turn(user_message, response.content)
+            
+        except Exception as e:
+            return self._handle_error(e)
+    
+    async def achat(self,
+                    user_message: str,
+                    reset_conversation: bool = False,
+                    temperature: float = 0.7) -> str:
+        """
+        与用户聊天（异步版本，基于ainvoke，不阻塞事件循环）
+        
+        Args:
+            user_message: 用户消息
+            reset_conversation: 是否重置对话历史
+            temperature: 温度参数
+            
+        Returns:
+            AI助手的回复
+        """
+        # 知识检索（可能是同步的向量化HTTP请求）和会话存储读写放到线程中执行
+        messages = await asyncio.to_thread(self._prepare_turn, user_message, reset_conversation)
+        
+        try:
+            response = await self._arun_tool_loop(messages)
+            return self._finish_turn(user_message, response.content)
+            
+        except Exception as e:
+            return self._handle_error(e)
+    
+    def chat_stream(self,
+                    user_message: str,
+                    reset_conversation: bool = False) -> Iterator[str]:
+        """
+        流式聊天，逐段返回模型输出
+        
+        启用工具时与 chat() 一样执行工具调用循环：每一步都以流式调用模型，
+        模型请求工具时执行工具并进入下一步，文本分段随到随出。
+        
+        Args:
+            user_message: 用户消息
+            reset_conversation: 是否重置对话历史
+            
+        Yields:
+            回复的增量文本
+        """
+        messages = self._stream_messages(user_message, reset_conversation)
+        metrics = TurnMetrics()
+        start = time.perf_counter()
+        parts: List[str] = []
+        
+        try:
+            for step_kwargs in self._stream_steps():
+                gathered = None
+                for chunk in self.client.stream(messages, **step_kwargs):
+                    gathered = merge_chunks(gathered, chunk)
+                    delta = self._track_chunk(metrics, chunk, start)
+                    if delta:
+                        parts.append(delta)
+                        yield delta
+                calls = get_tool_calls(gathered) if step_kwargs else []
+                if not calls:
+                    break
+                messages.append(gathered)
+                messages.extend(self._runner().run(calls))
+        except Exception as e:
+            yield self._handle_error(e)
+            return
+        finally:
+            metrics.total_time = time.perf_counter() - start
+            self.last_metrics = metrics
+        
+        self._record_turn(user_message, "".join(parts))
+    
+    async def achat_stream(self,
+                           user_message: str,
+                           reset_conversation: bool = False) -> AsyncIterator[str]:
+        """
+        流式聊天（异步版本，基于astream，同样执行工具调用循环）
+        
+        Args:
+            user_message: 用户消息
+            reset_conversation: 是否重置对话历史
+            
+        Yields:
+            回复的增量文本
+        """
+        messages = await asyncio.to_thread(self._stream_messages, user_message, reset_conversation)
+        metrics = TurnMetrics()
+        start = time.perf_counter()
+        parts: List[str] = []
+        
+        try:
+            for step_kwargs in self._stream_steps():
+                gathered = None
+                async for chunk in self.client.astream(messages, **step_kwargs):
+                    gathered = merge_chunks(gathered, chunk)
+                    delta = self._track_chunk(metrics, chunk, start)
+                    if delta:
+                        parts.append(delta)
+                        yield delta
+                calls = get_tool_calls(gathered) if step_kwargs else []
+                if not calls:
+                    break
+                messages.append(gathered)
+                messages.extend(await self._runner().arun(calls))
+        except Exception as e:
+            yield self._handle_error(e)
+            return
+        finally:
+            metrics.total_time = time.perf_counter() - start
+            self.last_metrics = metrics
+        
+        self._record_turn(user_message, "".join(parts))
+    
+    def _stream_steps(self) -> Iterator[Dict[str, Any]]:
+        """流式工具调用循环每一步的调用参数：前 max_tool_steps 步附带工具，最后一步要求直接回答"""
+        tool_kwargs = self._tool_kwargs()
+        if tool_kwargs:
+            for _ in range(self.max_tool_steps):
+                yield tool_kwargs
+        yield {}
+    
+    @staticmethod
+    def _track_chunk(metrics: TurnMetrics, chunk: Any, start: float) -> str:
+        """更新流式指标并返回本段文本"""
+        delta = chunk.content or ""
+        if delta and metrics.time_to_first_token is None:
+            metrics.time_to_first_token = time.perf_counter() - start
+        
+        # 优先使用模型返回的用量统计，否则按分段数近似token数
+        usage = getattr(chunk, "usage_metadata", None)
+        if usage and usage.get("output_tokens"):
+            metrics.output_tokens = usage["output_tokens"]
+        elif delta:
+            metrics.output_tokens += 1
+        return delta
+    
+    async def arun_tool(self, tool_name: str, **kwargs) -> Any:
+        """异步执行工具（同步工具会被放到线程中执行）"""
+        return await self.tool_registry.aexecute(tool_name, **kwargs)
+    
+    @property
+    def tool_registry(self) -> Any:
+        """工具注册表（默认使用全局注册表和内置旅行工具，首次使用时导入）"""
+        if self._tool_registry is None:
+            from src.core.tools.tool_registry import tool_registry
+            import src.tools.basic_tools  # noqa: F401  注册内置工具
+            self._tool_registry = tool_registry
+        return self._tool_registry
+    
+    def _tool_kwargs(self) -> Dict[str, Any]:
+        """调用模型时附带的工具schema（与LangChain的bind_tools等价，逐层透传给路由/重试包装器）"""
+        if not self.use_tools:
+            return {}
+        schemas = self.tool_registry.function_schemas()
+        return {"tools": schemas} if schemas else {}
+    
+    def _runner(self) -> ToolCallRunner:
+        if self._tool_runner is None:
+            self._tool_runner = ToolCallRunner(self.tool_registry)
+        return self._tool_runner
+    
+    def _run_tool_loop(self, messages: List[Any]) -> Any:
+        """
+        调用模型并执行其返回的工具调用，直到模型给出最终回复
+        
+        同一步中的多个工具调用并发执行；超过步数上限时不再提供工具，要求模型直接回答。
+        """
+        tool_kwargs = self._tool_kwargs()
+        if not tool_kwargs:
+            return self.client.invoke(messages)
         
-        # 添加历史对话（最后5轮）
-        history_to_include = self.conversation_history[-10:]  # 最多10条历史消息
-        messages.extend(history_to_include)
+        messages = list(messages)
+        for _ in range(self.max_tool_steps):
+            response = self.client.invoke(messages, **tool_kwargs)
+            calls = get_tool_calls(response)
+            if not calls:
+                return response
+            messages.append(response)
+            messages.extend(self._runner().run(calls))
+        return self.client.invoke(messages)
+    
+    async def _arun_tool_loop(self, messages: List[Any]) -> Any:
+        """工具调用循环（异步版本）"""
+        tool_kwargs = self._tool_kwargs()
+        if not tool_kwargs:
+            return await self.client.ainvoke(messages)
         
-        # 添加当前用户消息
-        messages.append({"role": "user", "content": user_message})
+        messages = list(messages)
+        for _ in range(self.max_tool_steps):
+            response = await self.client.ainvoke(messages, **tool_kwargs)
+            calls = get_tool_calls(response)
+            if not calls:
+                return response
+            messages.append(response)
+            messages.extend(await self._runner().arun(calls))
+        return await self.client.ainvoke(messages)
+    
+    def _prepare_turn(self, user_message: str, reset_conversation: bool) -> List[Dict[str, str]]:
+        """处理重置并构建本轮的消息列表"""
+        # 如果需要重置对话历史
+        if reset_conversation:
+            self._clear_history()
+            print("对话历史已重置")
         
         # 调用LLM
         print(f"\n📝 用户: {user_message}")
         print("🤖 思考中...")
         
+        return self._build_messages(user_message)
+    
+    def _stream_messages(self, user_message: str, reset_conversation: bool) -> List[Any]:
+        """流式对话：处理重置并构建本轮的消息列表（不打印过程信息，避免混入流式输出）"""
+        if reset_conversation:
+            self._clear_history()
+        return list(self._build_messages(user_message))
+    
+    def _build_messages(self, user_message: str) -> List[Dict[str, str]]:
+        """构建消息列表"""
+        # 系统提示词 + 检索到的参考资料 + token预算内的最新历史 + 当前用户消息
+        return self.context_builder.build(
+            self._system_messages() + self._knowledge_messages(user_message),
+            self.conversation_history,
+            {"role": "user", "content": user_message},
+        )
+    
+    def _system_messages(self) -> List[Dict[str, str]]:
+        """固定放在上下文开头的消息（系统提示词 + 历史摘要）"""
+        messages = [{"role": "system", "content": self.system_prompt}]
+        if self.summarizer is not None:
+            summary_message = self.summarizer.as_message()
+            if summary_message:
+                messages.append(summary_message)
+        return messages
+    
+    def _knowledge_messages(self, user_message: str) -> List[Dict[str, str]]:
+        """检索与本轮问题相关的资料，检索失败时不影响回答"""
+        self.last_passages = []
+        if self.retriever is None:
+            return []
         try:
-            response = self.client.invoke(messages)
-            
-            # 保存到对话历史
-            self.conversation_history.append({"role": "user", "content": user_message})
-            self.conversation_history.append({"role": "assistant", "content": response.content})
-            
-            # 限制历史记录长度（最多保存20条消息）
-            if len(self.conversation_history) > 20:
-                self.conversation_history = self.conversation_history[-20:]
-            
-            print(f"💡 {self.name}: {response.content[:100]}...")  # 只打印前100字符
-            return response.content
-            
+            self.last_passages = self.retriever.retrieve(user_message, self.rag_top_k, mode=self.rag_mode)
         except Exception as e:
-            error_msg = f"抱歉，我暂时遇到了问题：{str(e)}"
-            print(f"错误: {error_msg}")
-            return error_msg
+            print(f"⚠️ 知识检索失败: {e}")
+            return []
+        if not self.last_passages:
+            return []
+        from src.rag.retriever import format_passages
+        return [{
+            "role": "system",
+            "content": "以下是与用户问题相关的目的地资料，回答时优先参考并注明编号；资料未涉及的内容请如实说明：\n\n"
+                       + format_passages(self.last_passages),
+        }]
+    
+    def _finish_turn(self, user_message: str, content: str) -> str:
+        """保存本轮对话并返回回复"""
+        self._record_turn(user_message, content)
+        print(f"💡 {self.name}: {content[:100]}...")  # 只打印前100字符
+        return content
+    
+    def _record_turn(self, user_message: str, content: str):
+        """保存本轮对话到历史"""
+        # 保存到对话历史
+        turn = [
+            {"role": "user", "content": user_message},
+            {"role": "assistant", "content": content},
+        ]
+        self.conversation_history.extend(turn)
+        
+        # 只保留上下文预算内还能用到的历史
+        budget = self.context_builder.prompt_budget - self.context_builder.count_messages(self._system_messages())
+        self.conversation_history, evicted = self.context_builder.select_history(self.conversation_history, budget)
+        
+        # 增量写入会话存储
+        if self._has_store():
+            self.session_store.append(self.session_id, turn)
+            if evicted:
+                self.session_store.drop_oldest(self.session_id, len(evicted))
+        
+        # 被移出的消息交给后台摘要，不阻塞本轮回复
+        if evicted and self.summarizer is not None:
+            self.summarizer.submit(evicted)
+    
+    def _handle_error(self, e: Exception) -> str:
+        """将异常转换为友好的错误回复"""
+        error_msg = f"抱歉，我暂时遇到了问题：{str(e)}"
+        print(f"错误: {error_msg}")
+        return error_msg
+    
+    def _has_store(self) -> bool:
+        return self.session_store is not None and self.session_id is not None
+    
+    def _save_summary(self, summary: str):
+        """摘要更新后写回会话存储"""
+        if self._has_store():
+            self.session_store.set_summary(self.session_id, summary)
+    
+    def _clear_history(self):
+        """清空对话历史和摘要"""
+        self.conversation_history = []
+        if self.summarizer is not None:
+            self.summarizer.reset()
+        if self._has_store():
+            self.session_store.delete(self.session_id)
     
     def reset(self):
         """重置对话"""
-        self.conversation_history = []
+        self._clear_history()
         print(f"🔄 {self.name}的对话历史已重置")
     
     def get_conversation_summary(self) -> str:
@@ -108,8 +452,23 @@ class TravelAssistant:
         return summary
 
 
-# 创建全局助手实例
-travel_assistant = TravelAssistant()
+# 全局助手实例（首次使用时才创建，避免导入模块时就初始化LLM客户端）
+_travel_assistant: Optional[TravelAssistant] = None
+
+
+def get_travel_assistant() -> TravelAssistant:
+    """获取全局助手实例"""
+    global _travel_assistant
+    if _travel_assistant is None:
+        _travel_assistant = TravelAssistant()
+    return _travel_assistant
+
+
+def __getattr__(name: str) -> Any:
+    # 兼容 `from src.agents.basic_agent import travel_assistant`
+    if name == "travel_assistant":
+        return get_travel_assistant()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 def test_basic_agent():
@@ -0,0 +1,164 @@
+"""
+多会话管理
+"""
+
+import asyncio
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from src.agents.basic_agent import TravelAssistant
+from src.core.context_window import ContextBuilder
+from src.core.llm_client import LLMClient
+from src.core.session_store import InMemorySessionStore, SessionStore
+
+
+# 异步请求等待会话锁时，每次在工作线程中最多阻塞的时间（秒），避免长期占满线程池
+_LOCK_WAIT_SLICE = 0.05
+
+
+async def _acquire(lock: threading.Lock):
+    """获取会话的线程锁：被占用时在工作线程中分段等待，不阻塞事件循环"""
+    if lock.acquire(blocking=False):
+        return
+    guard = threading.Lock()
+    state = {"held": False, "abandoned": False}
+
+    def wait() -> bool:
+        acquired = lock.acquire(timeout=_LOCK_WAIT_SLICE)
+        with guard:
+            if acquired and state["abandoned"]:
+                lock.release()
+                return False
+            state["held"] = acquired
+        return acquired
+
+    try:
+        while not await asyncio.to_thread(wait):
+            pass
+    except asyncio.CancelledError:
+        # 等待被取消：已拿到的锁立即释放，还在等待的线程拿到后自行释放
+        with guard:
+            state["abandoned"] = True
+            if state["held"]:
+                lock.release()
+        raise
+
+
+class SessionManager:
+    """按会话id分发轻量级的会话Agent
+
+    所有会话共享同一个LLM客户端和上下文构建器，会话状态保存在SessionStore中；
+    活跃会话的Agent按LRU缓存，被淘汰的会话下次访问时从存储中恢复。
+    """
+
+    def __init__(self,
+                 store: Optional[SessionStore] = None,
+                 client: Optional[Any] = None,
+                 name: str = "Aria",
+                 max_active: int = 1000):
+        self.store = store or InMemorySessionStore()
+        self.client = client or LLMClient().get_clients()
+        self.name = name
+        self.max_active = max_active
+        self.context_builder = ContextBuilder(
+            reserve_output_tokens=getattr(self.client, "max_tokens", None) or 2000
+        )
+
+        self._agents: "OrderedDict[str, TravelAssistant]" = OrderedDict()
+        # 每个会话一把线程锁，同步与异步请求共用，保证同一会话串行
+        self._session_locks: Dict[str, threading.Lock] = {}
+        # 正在处理请求的会话（会话id -> 进行中的请求数），这些会话不会被淘汰
+        self._busy: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, session_id: str) -> TravelAssistant:
+        """获取会话对应的Agent，不存在时从存储中恢复"""
+        with self._lock:
+            agent = self._get_locked(session_id)
+            self._evict_locked()
+            return agent
+
+    def _get_locked(self, session_id: str) -> TravelAssistant:
+        agent = self._agents.get(session_id)
+        if agent is None:
+            agent = TravelAssistant(
+                name=self.name,
+                client=self.client,
+                context_builder=self.context_builder,
+                session_id=session_id,
+                session_store=self.store,
+            )
+            self._agents[session_id] = agent
+        self._session_locks.setdefault(session_id, threading.Lock())
+        self._agents.move_to_end(session_id)
+        return agent
+
+    def _evict_locked(self):
+        """按LRU淘汰超出上限的空闲会话，正在处理请求的会话保留"""
+        overflow = len(self._agents) - self.max_active
+        if overflow <= 0:
+            return
+        for session_id in [sid for sid in self._agents if sid not in self._busy][:overflow]:
+            del self._agents[session_id]
+            self._session_locks.pop(session_id, None)
+
+    def _checkout(self, session_id: str) -> Tuple[TravelAssistant, threading.Lock]:
+        """取出会话的Agent和锁，并标记为忙碌，直到 _checkin"""
+        with self._lock:
+            agent = self._get_locked(session_id)
+            self._busy[session_id] = self._busy.get(session_id, 0) + 1
+            self._evict_locked()
+            return agent, self._session_locks[session_id]
+
+    def _checkin(self, session_id: str):
+        with self._lock:
+            remaining = self._busy[session_id] - 1
+            if remaining:
+                self._busy[session_id] = remaining
+            else:
+                del self._busy[session_id]
+            self._evict_locked()
+
+    def chat(self, session_id: str, user_message: str) -> str:
+        """在指定会话中聊天（同一会话的请求串行执行）"""
+        agent, lock = self._checkout(session_id)
+        try:
+            with lock:
+                return agent.chat(user_message)
+        finally:
+            self._checkin(session_id)
+
+    async def achat(self, session_id: str, user_message: str) -> str:
+        """在指定会话中异步聊天（同一会话的请求串行执行）"""
+        agent, lock = self._checkout(session_id)
+        try:
+            await _acquire(lock)
+            try:
+                return await agent.achat(user_message)
+            finally:
+                lock.release()
+        finally:
+            self._checkin(session_id)
+
+    def reset(self, session_id: str):
+        """重置会话（等待该会话进行中的请求结束）"""
+        agent, lock = self._checkout(session_id)
+        try:
+            with lock:
+                agent.reset()
+        finally:
+            self._checkin(session_id)
+
+    def active_sessions(self) -> int:
+        """当前缓存的活跃会话数"""
+        return len(self._agents)
+
+    def close(self):
+        """落盘并关闭存储"""
+        with self._lock:
+            for agent in self._agents.values():
+                if agent.summarizer is not None:
+                    agent.summarizer.wait()
+            self._agents.clear()
+        self.store.close()
@@ -1 +1,13 @@
-from .tools.tool_registry import ToolRegistry, Tool, ToolCategory, register_tool, tool_registry
\ No newline at end of file
+import importlib
+
+_TOOL_EXPORTS = {"ToolRegistry", "Tool", "ToolCategory", "ToolValidationError", "ToolExecutionError",
+                 "ToolTimeoutError", "ToolCancelledError", "ToolCache",
+                 "register_tool", "register_batch", "tool_registry"}
+
+
+def __getattr__(name):
+    # 按需导入工具注册表，导入 src.core.llm_client 等子模块时不会连带加载
+    if name in _TOOL_EXPORTS:
+        module = importlib.import_module(".tools.tool_registry", __name__)
+        return getattr(module, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,101 @@
+"""
+按token预算构建对话上下文
+"""
+
+import functools
+import os
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+def estimate_tokens(text: str) -> int:
+    """粗略估算token数：中日韩字符按1个token计，其余字符按4个字符1个token计"""
+    cjk = sum(1 for ch in text if '\u2e80' <= ch <= '\u9fff' or '\uac00' <= ch <= '\ud7af')
+    other = len(text) - cjk
+    return cjk + (other + 3) // 4
+
+
+def tiktoken_tokenizer(encoding_name: str = "cl100k_base") -> Callable[[str], int]:
+    """基于tiktoken的精确计数器（首次使用可能需要下载编码文件）"""
+    try:
+        import tiktoken
+    except ImportError:
+        raise ImportError("请安装tiktoken包: pip install tiktoken")
+    encoding = tiktoken.get_encoding(encoding_name)
+    return lambda text: len(encoding.encode(text, disallowed_special=()))
+
+
+class ContextBuilder:
+    """按token预算从最新消息开始填充上下文窗口"""
+
+    def __init__(self,
+                 max_context_tokens: Optional[int] = None,
+                 reserve_output_tokens: int = 2000,
+                 tokenizer: Optional[Callable[[str], int]] = None,
+                 per_message_overhead: int = 4,
+                 cache_size: int = 4096):
+        """
+        Args:
+            max_context_tokens: 模型上下文窗口大小（默认读取LLM_CONTEXT_TOKENS，否则8192）
+            reserve_output_tokens: 为模型输出（max_tokens）预留的token数
+            tokenizer: 文本 -> token数 的计数函数，默认使用estimate_tokens
+            per_message_overhead: 每条消息的格式开销（角色标记等）
+            cache_size: 消息token数缓存的大小
+        """
+        self.max_context_tokens = max_context_tokens or int(os.getenv('LLM_CONTEXT_TOKENS', 8192))
+        self.reserve_output_tokens = reserve_output_tokens
+        self.per_message_overhead = per_message_overhead
+        # 相同内容只计数一次
+        self._count_text = functools.lru_cache(maxsize=cache_size)(tokenizer or estimate_tokens)
+
+    @property
+    def prompt_budget(self) -> int:
+        """可用于提示词的token数"""
+        return max(self.max_context_tokens - self.reserve_output_tokens, 0)
+
+    def count_message(self, message: Dict[str, str]) -> int:
+        """计算单条消息的token数"""
+        return self._count_text(message.get("content") or "") + self.per_message_overhead
+
+    def count_messages(self, messages: List[Dict[str, str]]) -> int:
+        """计算消息列表的token数"""
+        return sum(self.count_message(msg) for msg in messages)
+
+    def select_history(self,
+                       history: List[Dict[str, str]],
+                       budget: int) -> Tuple[List[Dict[str, str]], List[Dict[str, str]]]:
+        """
+        从最新消息开始，选出预算内能放下的历史
+
+        只在用户消息处截断，避免保留缺少提问的助手回复；
+        被截掉的用户消息与其回复一起作为较早消息返回。
+
+        Returns:
+            (保留的消息, 放不下的较早消息)
+        """
+        used = 0
+        start = len(history)
+        for i in range(len(history) - 1, -1, -1):
+            cost = self.count_message(history[i])
+            if used + cost > budget:
+                break
+            used += cost
+            start = i
+        while start < len(history) and history[start].get("role") != "user":
+            start += 1
+        return history[start:], history[:start]
+
+    def build(self,
+              system_messages: List[Dict[str, str]],
+              history: List[Dict[str, str]],
+              user_message: Dict[str, str]) -> List[Dict[str, str]]:
+        """
+        构建消息列表：系统消息 + 预算内的最新历史 + 当前用户消息
+
+        Args:
+            system_messages: 固定放在开头的消息（系统提示词等）
+            history: 对话历史（从旧到新）
+            user_message: 当前用户消息
+        """
+        budget = self.prompt_budget - self.count_messages(system_messages) - self.count_message(user_message)
+        selected, _ = self.select_history(history, budget)
+        return [*system_messages, *selected, user_message]
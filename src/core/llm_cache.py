@@ -0,0 +1,285 @@
+"""
+LLM响应缓存
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
+
+
+class ResponseCache:
+    """LLM响应缓存：内存LRU（带TTL）+ 可选的SQLite持久化二级缓存"""
+
+    def __init__(self,
+                 max_entries: int = 1024,
+                 ttl: Optional[float] = 3600,
+                 db_path: Optional[str] = None,
+                 max_temperature: float = 0.0):
+        """
+        Args:
+            max_entries: 内存中最多缓存的条目数
+            ttl: 过期时间（秒），None表示永不过期
+            db_path: SQLite文件路径，提供时启用磁盘二级缓存（重启后仍有效）
+            max_temperature: 只缓存温度不高于该值的调用
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_temperature = max_temperature
+
+        self._memory: "OrderedDict[str, Tuple[str, Optional[float]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses "
+                "(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL)"
+            )
+            self._db.commit()
+
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+
+    @staticmethod
+    def make_key(provider: str,
+                 model: str,
+                 temperature: Optional[float],
+                 messages: List[Dict[str, str]],
+                 options: Optional[Dict[str, Any]] = None) -> str:
+        """
+        根据 (provider, model, temperature, 归一化消息列表, 调用参数) 计算缓存键
+
+        消息中的工具调用按 (工具名, 参数) 归一化，不含每次随机生成的调用id；
+        options 为调用时附带的参数（如工具schema），必须可以序列化为JSON。
+        """
+        normalized = []
+        for msg in messages:
+            if isinstance(msg, dict):
+                role, content = msg.get("role", ""), msg.get("content", "")
+                tool_calls = msg.get("tool_calls")
+            elif isinstance(msg, (tuple, list)):
+                (role, content), tool_calls = msg, None
+            else:
+                role, content = getattr(msg, "type", ""), getattr(msg, "content", "")
+                tool_calls = getattr(msg, "tool_calls", None)
+            entry = [str(role).strip().lower(), " ".join(str(content).split())]
+            if tool_calls:
+                entry.append([[call.get("name"), call.get("args")] for call in tool_calls])
+            normalized.append(entry)
+        key = [provider, model, temperature, normalized]
+        if options:
+            key.append(options)
+        payload = json.dumps(key, ensure_ascii=False, separators=(",", ":"), sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def is_cacheable(self, temperature: Optional[float]) -> bool:
+        """判断该温度下的调用是否应该缓存"""
+        return temperature is not None and temperature <= self.max_temperature
+
+    def get(self, key: str) -> Optional[str]:
+        """读取缓存，未命中返回None"""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at is None or expires_at > now:
+                    self._memory.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._memory[key]
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT value, expires_at FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    value, expires_at = row
+                    if expires_at is None or expires_at > now:
+                        self._put_memory(key, value, expires_at)
+                        self.hits += 1
+                        self.disk_hits += 1
+                        return value
+                    self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    self._db.commit()
+
+            self.misses += 1
+            return None
+
+    def set(self, key: str, value: str):
+        """写入缓存"""
+        expires_at = time.time() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            self._put_memory(key, value, expires_at)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO responses (key, value, expires_at) VALUES (?, ?, ?)",
+                    (key, value, expires_at),
+                )
+                self._db.commit()
+
+    def _put_memory(self, key: str, value: str, expires_at: Optional[float]):
+        self._memory[key] = (value, expires_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        """命中统计"""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "disk_hits": self.disk_hits,
+            "size": len(self._memory),
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
+
+    def clear(self):
+        """清空缓存（包括磁盘）"""
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM responses")
+                self._db.commit()
+
+    def close(self):
+        """关闭磁盘连接"""
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+
+class CachedChatModel:
+    """带响应缓存的聊天模型包装器，接口与LangChain聊天模型一致"""
+
+    def __init__(self, client: Any, cache: ResponseCache, provider: str = ""):
+        self.client = client
+        self.cache = cache
+        self.provider = provider or type(client).__name__
+
+    def __getattr__(self, name: str) -> Any:
+        # 其余属性（model_name、bind_tools等）直接转发给底层客户端
+        if name.startswith("__") or name == "client":
+            raise AttributeError(name)
+        return getattr(self.client, name)
+
+    def _cache_key(self, messages: List[Any], kwargs: Dict[str, Any]) -> Optional[str]:
+        """计算缓存键，不可缓存时返回None
+
+        调用参数（如工具调用循环传入的 tools schema）计入缓存键，工具集合变化时不会命中旧回复；
+        参数无法序列化（如回调对象）时不缓存。
+        """
+        temperature = getattr(self.client, "temperature", None)
+        if not self.cache.is_cacheable(temperature):
+            return None
+        model = getattr(self.client, "model_name", None) or getattr(self.client, "model", "")
+        try:
+            return self.cache.make_key(self.provider, model, temperature, messages, kwargs)
+        except (TypeError, ValueError):
+            return None
+
+    @staticmethod
+    def _message(content: str, chunk: bool = False):
+        from langchain_core.messages import AIMessage, AIMessageChunk
+        return AIMessageChunk(content=content) if chunk else AIMessage(content=content)
+
+    @staticmethod
+    def _cacheable_message(message: Any) -> bool:
+        """只缓存纯文本回复（带工具调用的回复不缓存）"""
+        return (isinstance(message.content, str)
+                and not getattr(message, "tool_calls", None)
+                and not getattr(message, "tool_call_chunks", None))
+
+    def invoke(self, messages: List[Any], **kwargs) -> Any:
+        key = self._cache_key(messages, kwargs)
+        if key is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return self._message(cached)
+
+        response = self.client.invoke(messages, **kwargs)
+        if key is not None and self._cacheable_message(response):
+            self.cache.set(key, response.content)
+        return response
+
+    async def ainvoke(self, messages: List[Any], **kwargs) -> Any:
+        key = self._cache_key(messages, kwargs)
+        if key is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return self._message(cached)
+
+        response = await self.client.ainvoke(messages, **kwargs)
+        if key is not None and self._cacheable_message(response):
+            self.cache.set(key, response.content)
+        return response
+
+    def stream(self, messages: List[Any], **kwargs) -> Iterator[Any]:
+        key = self._cache_key(messages, kwargs)
+        if key is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                yield self._message(cached, chunk=True)
+                return
+
+        parts = []
+        for chunk in self.client.stream(messages, **kwargs):
+            if not self._cacheable_message(chunk):
+                key = None
+            elif key is not None:
+                parts.append(chunk.content)
+            yield chunk
+        if key is not None:
+            self.cache.set(key, "".join(parts))
+
+    async def astream(self, messages: List[Any], **kwargs) -> AsyncIterator[Any]:
+        key = self._cache_key(messages, kwargs)
+        if key is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                yield self._message(cached, chunk=True)
+                return
+
+        parts = []
+        async for chunk in self.client.astream(messages, **kwargs):
+            if not self._cacheable_message(chunk):
+                key = None
+            elif key is not None:
+                parts.append(chunk.content)
+            yield chunk
+        if key is not None:
+            self.cache.set(key, "".join(parts))
+
+
+_shared_caches: Dict[Tuple, ResponseCache] = {}
+_shared_lock = threading.Lock()
+
+
+def default_response_cache() -> Optional[ResponseCache]:
+    """
+    按环境变量创建（并在进程内共享）响应缓存
+
+    LLM_CACHE_SIZE 内存条目数，未设置或为0时不启用缓存；
+    LLM_CACHE_TTL 过期时间（秒），0表示永不过期；
+    LLM_CACHE_PATH SQLite文件路径，设置时启用磁盘二级缓存。
+    """
+    max_entries = int(os.getenv('LLM_CACHE_SIZE') or 0)
+    if max_entries <= 0:
+        return None
+    ttl = float(os.getenv('LLM_CACHE_TTL') or 3600) or None
+    db_path = os.getenv('LLM_CACHE_PATH') or None
+
+    # 同一配置共用一个实例，避免每个客户端各开一个SQLite连接
+    key = (max_entries, ttl, db_path)
+    with _shared_lock:
+        cache = _shared_caches.get(key)
+        if cache is None:
+            cache = _shared_caches[key] = ResponseCache(max_entries=max_entries, ttl=ttl, db_path=db_path)
+        return cache
@@ -1,10 +1,209 @@
 # 创建文件 src/core/llm_client.py
+import asyncio
 import os
+import threading
+import weakref
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Tuple
 from dotenv import load_dotenv
 
+if TYPE_CHECKING:
+    from src.core.llm_cache import ResponseCache
+    from src.core.retry import RetryPolicy
+
 load_dotenv()
 
 
+def _loop_local_async_client(limits, timeout):
+    """
+    创建按事件循环分别持有连接池的 httpx.AsyncClient
+
+    异步连接绑定在创建它的事件循环上，不能跨 asyncio.run() 复用；
+    该客户端对外是一个实例（可以在创建ChatOpenAI时传入），实际请求转发给当前事件循环专属的客户端。
+    """
+    import httpx
+
+    class LoopLocalAsyncClient(httpx.AsyncClient):
+        def __init__(self):
+            super().__init__(limits=limits, timeout=timeout)
+            self._per_loop: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = \
+                weakref.WeakKeyDictionary()
+            self._per_loop_lock = threading.Lock()
+
+        def for_current_loop(self) -> httpx.AsyncClient:
+            """当前事件循环专属的客户端（首次使用时创建）"""
+            loop = asyncio.get_running_loop()
+            with self._per_loop_lock:
+                client = self._per_loop.get(loop)
+                if client is None or client.is_closed:
+                    client = httpx.AsyncClient(limits=limits, timeout=timeout)
+                    self._per_loop[loop] = client
+                return client
+
+        async def send(self, request, **kwargs):
+            return await self.for_current_loop().send(request, **kwargs)
+
+        async def aclose(self):
+            with self._per_loop_lock:
+                client = self._per_loop.pop(asyncio.get_running_loop(), None)
+            if client is not None:
+                await client.aclose()
+            await super().aclose()
+
+    return LoopLocalAsyncClient()
+
+
+class _SharedHTTP:
+    """一代共享的httpx客户端
+
+    使用它的LLM客户端通过 bind() 登记；连接池被重置后这一代即“退役”，
+    等所有登记的客户端都被回收（不再有人持有）后才真正关闭，避免仍在使用的客户端报 "client has been closed"。
+    """
+
+    def __init__(self, limits, timeout: float):
+        import httpx
+        self.sync = httpx.Client(limits=limits, timeout=timeout)
+        self.async_ = _loop_local_async_client(limits, timeout)
+        self.users = 0
+        self.retired = False
+        self._lock = threading.Lock()
+
+    def bind(self, client: Any):
+        with self._lock:
+            self.users += 1
+        weakref.finalize(client, self._release)
+
+    def _release(self):
+        with self._lock:
+            self.users -= 1
+            done = self.retired and self.users == 0
+        if done:
+            self.close()
+
+    def retire(self):
+        with self._lock:
+            self.retired = True
+            done = self.users == 0
+        if done:
+            self.close()
+
+    def close(self):
+        self.sync.close()
+        # 异步客户端需要在各自的事件循环中关闭，这里只释放引用
+
+
+class ClientPool:
+    """进程级LLM客户端池
+
+    按 (provider, model, base_url, temperature, max_tokens, timeout) 复用同一个
+    ChatOpenAI/ChatOllama 实例，并让所有OpenAI兼容客户端共享同一组httpx连接池，
+    避免每个助手实例都重新建立连接和TLS握手。
+    """
+
+    def __init__(self,
+                 max_connections: Optional[int] = None,
+                 max_keepalive_connections: Optional[int] = None,
+                 keepalive_expiry: Optional[float] = None):
+        self.max_connections = max_connections or int(os.getenv('LLM_POOL_MAX_CONNECTIONS', 100))
+        self.max_keepalive_connections = max_keepalive_connections or int(os.getenv('LLM_POOL_MAX_KEEPALIVE', 20))
+        self.keepalive_expiry = keepalive_expiry or float(os.getenv('LLM_POOL_KEEPALIVE_EXPIRY', 30))
+
+        self._clients: Dict[Tuple, Any] = {}
+        # 可重入：路由客户端的factory内部还会创建各提供商的客户端
+        self._lock = threading.RLock()
+        self._http: Optional[_SharedHTTP] = None
+        self.hits = 0
+        self.misses = 0
+
+    def configure(self,
+                  max_connections: Optional[int] = None,
+                  max_keepalive_connections: Optional[int] = None,
+                  keepalive_expiry: Optional[float] = None):
+        """调整连接池上限（之后创建的客户端使用新的共享HTTP客户端，旧的在不再被使用后关闭）"""
+        with self._lock:
+            if max_connections is not None:
+                self.max_connections = max_connections
+            if max_keepalive_connections is not None:
+                self.max_keepalive_connections = max_keepalive_connections
+            if keepalive_expiry is not None:
+                self.keepalive_expiry = keepalive_expiry
+            self._reset_locked()
+
+    def get_or_create(self, key: Tuple, factory: Callable[[], Any]) -> Any:
+        """获取键对应的客户端，不存在时调用factory创建"""
+        client = self._clients.get(key)
+        if client is not None:
+            self.hits += 1
+            return client
+
+        with self._lock:
+            # 双重检查，避免并发时重复创建
+            client = self._clients.get(key)
+            if client is None:
+                client = factory()
+                self._clients[key] = client
+                self.misses += 1
+            else:
+                self.hits += 1
+            return client
+
+    def _limits(self):
+        import httpx
+        return httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+            keepalive_expiry=self.keepalive_expiry,
+        )
+
+    def _shared_http(self, timeout: float) -> _SharedHTTP:
+        with self._lock:
+            if self._http is None:
+                self._http = _SharedHTTP(self._limits(), timeout)
+            return self._http
+
+    def http_client(self, timeout: float):
+        """共享的同步httpx客户端（保持长连接）"""
+        return self._shared_http(timeout).sync
+
+    def async_http_client(self, timeout: float):
+        """共享的异步httpx客户端（保持长连接，每个事件循环各用一组连接）"""
+        return self._shared_http(timeout).async_
+
+    def bind_http(self, client: Any) -> Any:
+        """登记使用了共享HTTP客户端的LLM客户端，连接池重置后等它被回收才关闭连接"""
+        with self._lock:
+            if self._http is not None:
+                self._http.bind(client)
+        return client
+
+    def http_client_kwargs(self) -> Dict[str, Any]:
+        """传给Ollama底层httpx客户端的连接池参数"""
+        return {"limits": self._limits()}
+
+    def stats(self) -> Dict[str, int]:
+        """连接池统计"""
+        return {
+            "clients": len(self._clients),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+    def clear(self):
+        """清空客户端池；共享连接在不再被任何客户端使用后关闭"""
+        with self._lock:
+            self._reset_locked()
+
+    def _reset_locked(self):
+        # 先移出全部池化客户端，再让共享HTTP客户端退役
+        self._clients.clear()
+        if self._http is not None:
+            self._http.retire()
+            self._http = None
+
+
+# 创建全局客户端池实例
+client_pool = ClientPool()
+
+
 class LLMClient:
     """统一的LLM客户端，支持多种模型提供商"""
     
@@ -12,21 +211,94 @@ class LLMClient:
                  provider:str = "ollama", 
                  temperature:float=0, 
                  max_tokens:int=2000, 
-                 timeout:int=30):
+                 timeout:int=30,
+                 pool: Optional[ClientPool] = None,
+                 cache: Optional["ResponseCache"] = None,
+                 fallback_providers: Optional[List[str]] = None,
+                 hedge_after_ms: Optional[float] = None,
+                 retry_policy: Optional["RetryPolicy"] = None):
         
         self.provider = provider or os.getenv('LLM_PROVIDER', 'ollama').lower()
         self.temperature = temperature
         self.max_tokens = max_tokens
         self.timeout = timeout
+        self.pool = pool or client_pool
+        
+        # 响应缓存，未传入时读取 LLM_CACHE_SIZE / LLM_CACHE_TTL / LLM_CACHE_PATH
+        if cache is None:
+            from src.core.llm_cache import default_response_cache
+            cache = default_response_cache()
+        self.cache = cache
+        
+        # 备用提供商（按顺序故障转移），默认读取 LLM_FALLBACK_PROVIDERS=zhipu,ollama
+        if fallback_providers is None:
+            fallback_providers = [p.strip().lower() for p in os.getenv('LLM_FALLBACK_PROVIDERS', '').split(',') if p.strip()]
+        self.fallback_providers = [p for p in fallback_providers if p != self.provider]
+        if hedge_after_ms is None and os.getenv('LLM_HEDGE_AFTER_MS'):
+            hedge_after_ms = float(os.getenv('LLM_HEDGE_AFTER_MS'))
+        self.hedge_after_ms = hedge_after_ms
+        self.retry_policy = retry_policy
     
     def get_clients(self):
-        """根据配置初始化客户端"""
-        if self.provider == 'zhipu':
-            return self._setup_zhipu()
-        elif self.provider == 'ollama':
-            return self._setup_ollama()
+        """根据配置获取客户端（同一配置在进程内复用同一实例）"""
+        if self.fallback_providers:
+            providers = [self.provider] + self.fallback_providers
+            key = ("router", tuple(providers), self.temperature, self.max_tokens, self.timeout, self.hedge_after_ms)
+            client = self.pool.get_or_create(key, lambda: self._setup_router(providers))
+        else:
+            client = self._get_provider_client(self.provider)
+        
+        # 重试（指数退避 + 抖动 + 总截止时间），默认读取 LLM_MAX_ATTEMPTS / LLM_RETRY_DEADLINE
+        from src.core.retry import RetryingChatModel, RetryPolicy
+        policy = self.retry_policy or RetryPolicy(
+            max_attempts=int(os.getenv('LLM_MAX_ATTEMPTS', 3)),
+            deadline=float(os.getenv('LLM_RETRY_DEADLINE', 60)),
+        )
+        if policy.max_attempts > 1:
+            client = RetryingChatModel(client, policy)
+        
+        # 配置了响应缓存时，用缓存包装器包一层
+        if self.cache is not None:
+            from src.core.llm_cache import CachedChatModel
+            client = CachedChatModel(client, self.cache, provider=self.provider)
+        return client
+    
+    def _setup_router(self, providers: List[str]):
+        """初始化多提供商路由（健康状态在进程内共享）
+
+        主提供商必须可用；未配置（缺少环境变量或依赖包）的备用提供商会被跳过，不影响主提供商。
+        """
+        from src.core.llm_router import RouterChatModel
+        clients = [(providers[0], self._get_provider_client(providers[0]))]
+        for provider in providers[1:]:
+            try:
+                clients.append((provider, self._get_provider_client(provider)))
+            except (ValueError, ImportError) as e:
+                print(f"⚠️ 跳过未配置的备用LLM提供商 {provider}: {e}")
+        if len(clients) == 1:
+            return clients[0][1]
+        print(f"✓ 已初始化LLM路由，提供商顺序: {' → '.join(name for name, _ in clients)}")
+        return RouterChatModel(
+            clients,
+            hedge_after_ms=self.hedge_after_ms,
+            attempt_timeout=self.timeout,
+        )
+    
+    def _get_provider_client(self, provider: str):
+        """获取单个提供商的客户端"""
+        if provider == 'zhipu':
+            model_name = os.getenv('ZHIPU_MODEL_NAME')
+            base_url = os.getenv('ZHIPU_BASEURL')
+            factory = self._setup_zhipu
+        elif provider == 'ollama':
+            model_name = os.getenv('OLLAMA_MODEL_NAME')
+            base_url = os.getenv('OLLAMA_BASEURL')
+            factory = self._setup_ollama
         else:
-            raise ValueError(f"不支持的LLM提供商: {self.provider}")
+            raise ValueError(f"不支持的LLM提供商: {provider}")
+
+        key = (provider, model_name, base_url, self.temperature, self.max_tokens, self.timeout)
+        return self.pool.get_or_create(key, factory)
     
     def _setup_zhipu(self):
         """初始化智普客户端"""
@@ -40,14 +312,17 @@ class LLMClient:
             
             print(f"✓ 已初始化OpenAI客户端，使用模型: {model_name}")
             
-            return ChatOpenAI(
+            return self.pool.bind_http(ChatOpenAI(
             model=model_name,
             temperature=self.temperature,
             max_tokens=self.max_tokens,
             timeout=self.timeout,
             api_key=api_key,
             base_url=base_url,
-        )
+            max_retries=0,  # 重试由RetryPolicy统一处理
+            http_client=self.pool.http_client(self.timeout),
+            http_async_client=self.pool.async_http_client(self.timeout),
+        ))
             
         except ImportError:
             raise ImportError("请安装openai包: pip install langchain_openai")
@@ -69,6 +344,7 @@ class LLMClient:
                         temperature=self.temperature,
                         max_tokens=self.max_tokens,
                         timeout=self.timeout,
+                        client_kwargs=self.pool.http_client_kwargs(),
                     )
             
         except ImportError:
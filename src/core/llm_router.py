@@ -0,0 +1,371 @@
+"""
+多提供商路由：故障转移、对冲请求与熔断
+"""
+
+import asyncio
+import threading
+import time
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
+
+
+class CircuitBreaker:
+    """单个提供商的健康状态与熔断器
+
+    连续失败达到阈值后熔断（open），在恢复时间内直接跳过该提供商；
+    恢复时间过后，第一个真正发往该提供商的请求作为试探请求（half_open），
+    试探期间其他请求继续跳过它；试探成功则恢复（closed），失败则重新熔断。
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 3, recovery_time: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.recovery_time = recovery_time
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.successes = 0
+        self.failures = 0
+        self.avg_latency: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def available(self) -> bool:
+        """是否可以尝试该提供商（只查询，不改变状态）"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN:
+                return time.monotonic() - self.opened_at >= self.recovery_time
+            return False  # 已有试探请求在进行
+
+    def acquire(self) -> Optional[bool]:
+        """
+        发送请求前申请放行
+
+        Returns:
+            None表示拒绝；True表示本次是试探请求（熔断器转为half_open）；False表示普通请求
+        """
+        with self._lock:
+            if self.state == self.CLOSED:
+                return False
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.recovery_time:
+                self.state = self.HALF_OPEN
+                return True
+            return None
+
+    def allow(self) -> bool:
+        """是否允许向该提供商发送请求（允许时占用试探名额）"""
+        return self.acquire() is not None
+
+    def release(self, probe: bool):
+        """请求没有结果（被取消或中途放弃）时归还试探名额，下一个请求可以重新试探"""
+        if not probe:
+            return
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self.state = self.OPEN
+
+    def record_success(self, latency: float):
+        with self._lock:
+            self.successes += 1
+            self.consecutive_failures = 0
+            self.state = self.CLOSED
+            # 指数滑动平均延迟
+            self.avg_latency = latency if self.avg_latency is None else 0.8 * self.avg_latency + 0.2 * latency
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self.consecutive_failures += 1
+            if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "successes": self.successes,
+            "failures": self.failures,
+            "avg_latency": round(self.avg_latency, 3) if self.avg_latency is not None else None,
+        }
+
+
+class AllProvidersFailedError(RuntimeError):
+    """所有提供商都失败或处于熔断状态，causes 为各提供商的异常（按尝试顺序）"""
+
+    def __init__(self, message: str, causes: Optional[List[BaseException]] = None):
+        super().__init__(message)
+        self.causes: List[BaseException] = list(causes or [])
+
+    @classmethod
+    def from_errors(cls, errors: List[Tuple[str, BaseException]]) -> "AllProvidersFailedError":
+        return cls("所有LLM提供商均调用失败: " + "; ".join(f"{name}: {e}" for name, e in errors),
+                   [e for _, e in errors])
+
+
+class CircuitOpenError(RuntimeError):
+    """提供商处于熔断状态，请求未发送"""
+
+
+class RouterChatModel:
+    """按顺序故障转移的多提供商聊天模型，接口与LangChain聊天模型一致
+
+    - 提供商按给定顺序尝试，超时或出错时转到下一个
+    - 异步调用可开启对冲：主提供商在hedge_after_ms内没有产出时，
+      并发请求下一个提供商，先返回者胜出，另一个被取消
+    - 每个提供商有独立的熔断器，连续失败后暂时跳过
+    """
+
+    def __init__(self,
+                 providers: List[Tuple[str, Any]],
+                 hedge_after_ms: Optional[float] = None,
+                 attempt_timeout: Optional[float] = None,
+                 failure_threshold: int = 3,
+                 recovery_time: float = 30.0):
+        """
+        Args:
+            providers: [(提供商名称, 聊天模型), ...]，按优先级排序
+            hedge_after_ms: 异步调用的对冲等待时间（毫秒），None表示不对冲
+            attempt_timeout: 异步调用中单个提供商的超时时间（秒）
+            failure_threshold: 连续失败多少次后熔断
+            recovery_time: 熔断后多久允许试探（秒）
+        """
+        if not providers:
+            raise ValueError("至少需要一个LLM提供商")
+        self.providers = providers
+        self.hedge_after_ms = hedge_after_ms
+        self.attempt_timeout = attempt_timeout
+        self.breakers: Dict[str, CircuitBreaker] = {
+            name: CircuitBreaker(failure_threshold, recovery_time) for name, _ in providers
+        }
+
+    def __getattr__(self, name: str) -> Any:
+        # 模型参数（temperature、max_tokens等）以主提供商为准
+        if name.startswith("__") or name == "providers":
+            raise AttributeError(name)
+        return getattr(self.providers[0][1], name)
+
+    def _candidates(self) -> List[Tuple[str, Any, bool]]:
+        """
+        当前可以尝试的提供商 [(名称, 客户端, 是否强制放行), ...]（只查询，不改变熔断器状态）
+
+        全部熔断且没有试探请求在进行时，仍强制尝试主提供商；
+        已有试探请求在进行时不再放行，等待试探结果。
+        """
+        available = [(name, client, False) for name, client in self.providers if self.breakers[name].available()]
+        if available:
+            return available
+        if any(breaker.state == CircuitBreaker.HALF_OPEN for breaker in self.breakers.values()):
+            return []
+        name, client = self.providers[0]
+        return [(name, client, True)]
+
+    def _admit(self, name: str, forced: bool) -> bool:
+        """真正发送请求前向熔断器申请放行，返回是否为试探请求；被拒绝时抛出CircuitOpenError"""
+        if forced:
+            return False
+        probe = self.breakers[name].acquire()
+        if probe is None:
+            raise CircuitOpenError("熔断中")
+        return probe
+
+    def health(self) -> Dict[str, Dict[str, Any]]:
+        """各提供商的健康状态"""
+        return {name: breaker.stats() for name, breaker in self.breakers.items()}
+
+    # ---------- 同步接口：顺序故障转移 ----------
+
+    def invoke(self, messages: List[Any], **kwargs) -> Any:
+        errors = []
+        for name, client, forced in self._candidates():
+            try:
+                probe = self._admit(name, forced)
+            except CircuitOpenError as e:
+                errors.append((name, e))
+                continue
+            start = time.perf_counter()
+            try:
+                response = client.invoke(messages, **kwargs)
+            except Exception as e:
+                self.breakers[name].record_failure()
+                errors.append((name, e))
+                continue
+            except BaseException:
+                self.breakers[name].release(probe)
+                raise
+            self.breakers[name].record_success(time.perf_counter() - start)
+            return response
+        raise AllProvidersFailedError.from_errors(errors)
+
+    def stream(self, messages: List[Any], **kwargs) -> Iterator[Any]:
+        errors = []
+        for name, client, forced in self._candidates():
+            try:
+                probe = self._admit(name, forced)
+            except CircuitOpenError as e:
+                errors.append((name, e))
+                continue
+            start = time.perf_counter()
+            started = False
+            try:
+                for chunk in client.stream(messages, **kwargs):
+                    started = True
+                    yield chunk
+            except Exception as e:
+                self.breakers[name].record_failure()
+                # 已经输出过内容就不能再换提供商
+                if started:
+                    raise
+                errors.append((name, e))
+                continue
+            except BaseException:
+                # 调用方中途放弃（GeneratorExit）
+                self.breakers[name].release(probe)
+                raise
+            self.breakers[name].record_success(time.perf_counter() - start)
+            return
+        raise AllProvidersFailedError.from_errors(errors)
+
+    # ---------- 异步接口：故障转移 + 对冲 ----------
+
+    async def _attempt(self, name: str, client: Any, forced: bool,
+                       messages: List[Any], kwargs: Dict[str, Any]) -> Any:
+        probe = self._admit(name, forced)
+        start = time.perf_counter()
+        try:
+            response = await asyncio.wait_for(client.ainvoke(messages, **kwargs), self.attempt_timeout)
+        except asyncio.CancelledError:
+            self.breakers[name].release(probe)
+            raise
+        except Exception:
+            self.breakers[name].record_failure()
+            raise
+        self.breakers[name].record_success(time.perf_counter() - start)
+        return response
+
+    async def ainvoke(self, messages: List[Any], **kwargs) -> Any:
+        return await self._race(
+            self._candidates(),
+            lambda name, client, forced: self._attempt(name, client, forced, messages, kwargs),
+        )
+
+    async def _open_stream(self, name: str, client: Any, forced: bool, messages: List[Any],
+                           kwargs: Dict[str, Any]) -> Tuple[str, bool, Any, AsyncIterator[Any], float]:
+        """打开流并等待第一个分段，返回 (提供商, 是否试探请求, 第一个分段, 流, 开始时间)"""
+        probe = self._admit(name, forced)
+        start = time.perf_counter()
+        stream = client.astream(messages, **kwargs).__aiter__()
+        try:
+            first = await asyncio.wait_for(stream.__anext__(), self.attempt_timeout)
+        except asyncio.CancelledError:
+            self.breakers[name].release(probe)
+            await _aclose(stream)
+            raise
+        except StopAsyncIteration:
+            first = None
+        except Exception:
+            self.breakers[name].record_failure()
+            await _aclose(stream)
+            raise
+        return name, probe, first, stream, start
+
+    async def _discard_stream(self, opened: Tuple[str, bool, Any, AsyncIterator[Any], float]):
+        name, probe, _, stream, _ = opened
+        self.breakers[name].release(probe)
+        await _aclose(stream)
+
+    async def astream(self, messages: List[Any], **kwargs) -> AsyncIterator[Any]:
+        name, probe, first, stream, start = await self._race(
+            self._candidates(),
+            lambda name, client, forced: self._open_stream(name, client, forced, messages, kwargs),
+            discard=self._discard_stream,
+        )
+        outcome = None
+        try:
+            if first is not None:
+                yield first
+            async for chunk in stream:
+                yield chunk
+            outcome = "success"
+        except Exception:
+            outcome = "failure"
+            self.breakers[name].record_failure()
+            raise
+        finally:
+            await _aclose(stream)
+            if outcome is None:
+                # 调用方中途放弃
+                self.breakers[name].release(probe)
+        self.breakers[name].record_success(time.perf_counter() - start)
+
+    async def _race(self,
+                    candidates: List[Tuple[str, Any, bool]],
+                    make_attempt,
+                    discard=None) -> Any:
+        """
+        按顺序尝试提供商；开启对冲时，当前请求在hedge_after_ms内未完成就并发启动下一个
+
+        先成功者胜出，其余请求被取消；全部失败时抛出AllProvidersFailedError
+        """
+        hedge_delay = self.hedge_after_ms / 1000 if self.hedge_after_ms is not None else None
+        pending: Dict[asyncio.Task, str] = {}
+        errors: List[Tuple[str, BaseException]] = []
+        queue = list(candidates)
+
+        def launch():
+            name, client, forced = queue.pop(0)
+            pending[asyncio.ensure_future(make_attempt(name, client, forced))] = name
+
+        if not queue:
+            raise AllProvidersFailedError("所有LLM提供商均处于熔断状态")
+        launch()
+        try:
+            while pending:
+                timeout = hedge_delay if queue and hedge_delay is not None else None
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+
+                if not done:
+                    # 对冲：主请求迟迟没有结果，启动下一个提供商
+                    launch()
+                    continue
+
+                winners = []
+                for task in done:
+                    name = pending.pop(task)
+                    if task.exception() is not None:
+                        errors.append((name, task.exception()))
+                    elif not winners:
+                        winners.append(task.result())
+                    elif discard is not None:
+                        # 同时完成的其他请求结果直接丢弃
+                        await discard(task.result())
+                if winners:
+                    return winners[0]
+
+                # 失败后立即转到下一个提供商
+                if not pending and queue:
+                    launch()
+        finally:
+            for task in pending:
+                task.cancel()
+            if pending:
+                results = await asyncio.gather(*pending, return_exceptions=True)
+                # 取消前已经完成的请求，结果同样丢弃
+                if discard is not None:
+                    for result in results:
+                        if not isinstance(result, BaseException):
+                            await discard(result)
+
+        raise AllProvidersFailedError.from_errors(errors)
+
+
+async def _aclose(stream: Any):
+    """关闭异步流（如果支持）"""
+    aclose = getattr(stream, "aclose", None)
+    if aclose is not None:
+        try:
+            await aclose()
+        except Exception:
+            pass
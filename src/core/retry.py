@@ -0,0 +1,188 @@
+"""
+LLM调用的重试策略：指数退避 + 随机抖动 + 总截止时间
+"""
+
+import asyncio
+import random
+import time
+from typing import Any, AsyncIterator, Callable, Iterator, List, Optional
+
+
+# 可重试的异常类型名（按名称匹配，避免导入各提供商的SDK）
+RETRYABLE_ERROR_NAMES = {
+    "ConnectionError", "ConnectionResetError", "ConnectionRefusedError", "TimeoutError",
+    "ConnectError", "ConnectTimeout", "ReadTimeout", "ReadError", "WriteError",
+    "RemoteProtocolError", "PoolTimeout",
+    "APIConnectionError", "APITimeoutError", "RateLimitError", "InternalServerError",
+}
+
+# 可重试的HTTP状态码
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+
+
+class DeadlineExceededError(TimeoutError):
+    """重试总耗时超过截止时间"""
+
+
+def _status_code(exc: BaseException) -> Optional[int]:
+    """从异常中提取HTTP状态码"""
+    code = getattr(exc, "status_code", None)
+    if code is None:
+        response = getattr(exc, "response", None)
+        code = getattr(response, "status_code", None)
+    return code if isinstance(code, int) else None
+
+
+class RetryPolicy:
+    """指数退避重试策略
+
+    - 第n次重试前等待 uniform(0, min(max_delay, base_delay * 2**n))（full jitter）
+    - 限流、连接重置、超时、5xx 可重试；其余错误（参数错误、鉴权失败等）直接抛出
+    - 所有尝试与等待的总时间不超过deadline
+    """
+
+    def __init__(self,
+                 max_attempts: int = 3,
+                 base_delay: float = 0.5,
+                 max_delay: float = 8.0,
+                 deadline: Optional[float] = 60.0,
+                 jitter: bool = True,
+                 sleep: Callable[[float], None] = time.sleep,
+                 rng: Callable[[], float] = random.random,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            max_attempts: 最多尝试次数（含第一次）
+            base_delay: 退避基准时间（秒）
+            max_delay: 单次等待上限（秒）
+            deadline: 总截止时间（秒），None表示不限制
+            jitter: 是否加入随机抖动
+            sleep: 同步等待函数（测试时可替换）
+            rng: [0, 1) 随机数函数（测试时可替换）
+            clock: 单调时钟（测试时可替换）
+        """
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+        self.jitter = jitter
+        self.sleep = sleep
+        self.rng = rng
+        self.clock = clock
+
+    def is_retryable(self, exc: BaseException) -> bool:
+        """判断异常是否值得重试
+
+        汇总了多个异常的错误（如路由的 AllProvidersFailedError.causes）在每个原因都可重试时才重试，
+        这样重试包在多提供商路由外层时仍然生效。
+        """
+        if isinstance(exc, DeadlineExceededError):
+            return False
+        causes = getattr(exc, "causes", None)
+        if isinstance(causes, list):
+            return bool(causes) and all(self.is_retryable(cause) for cause in causes)
+        code = _status_code(exc)
+        if code is not None:
+            return code in RETRYABLE_STATUS_CODES
+        for cls in type(exc).__mro__:
+            if cls.__name__ in RETRYABLE_ERROR_NAMES:
+                return True
+        message = str(exc).lower()
+        return "rate limit" in message or "connection reset" in message
+
+    def backoff(self, retry_index: int) -> float:
+        """第retry_index次重试前的等待时间"""
+        delay = min(self.max_delay, self.base_delay * (2 ** retry_index))
+        return delay * self.rng() if self.jitter else delay
+
+    def _remaining(self, start: float) -> Optional[float]:
+        if self.deadline is None:
+            return None
+        return self.deadline - (self.clock() - start)
+
+    def next_delay(self, attempt: int, exc: BaseException, start: float) -> float:
+        """计算下一次重试的等待时间，不应重试时重新抛出异常"""
+        if attempt + 1 >= self.max_attempts or not self.is_retryable(exc):
+            raise exc
+        delay = self.backoff(attempt)
+        remaining = self._remaining(start)
+        if remaining is not None and delay >= remaining:
+            raise DeadlineExceededError(f"重试超过截止时间 {self.deadline}s，最后一次错误: {exc}") from exc
+        return delay
+
+    def call(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """同步调用并按策略重试"""
+        start = self.clock()
+        for attempt in range(self.max_attempts):
+            try:
+                return fn(*args, **kwargs)
+            except Exception as e:
+                self.sleep(self.next_delay(attempt, e, start))
+
+    async def acall(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """异步调用并按策略重试（每次尝试也受剩余截止时间限制）"""
+        start = self.clock()
+        for attempt in range(self.max_attempts):
+            remaining = self._remaining(start)
+            try:
+                if remaining is not None and remaining <= 0:
+                    raise DeadlineExceededError(f"重试超过截止时间 {self.deadline}s")
+                return await asyncio.wait_for(fn(*args, **kwargs), remaining)
+            except DeadlineExceededError:
+                raise
+            except asyncio.TimeoutError as e:
+                if self._remaining(start) is not None and self._remaining(start) <= 0:
+                    raise DeadlineExceededError(f"请求超过截止时间 {self.deadline}s") from e
+                await asyncio.sleep(self.next_delay(attempt, e, start))
+            except Exception as e:
+                await asyncio.sleep(self.next_delay(attempt, e, start))
+
+
+class RetryingChatModel:
+    """带重试策略的聊天模型包装器，接口与LangChain聊天模型一致
+
+    流式调用只在还没有输出任何分段时重试，避免重复输出。
+    """
+
+    def __init__(self, client: Any, policy: RetryPolicy):
+        self.client = client
+        self.policy = policy
+
+    def __getattr__(self, name: str) -> Any:
+        if name.startswith("__") or name == "client":
+            raise AttributeError(name)
+        return getattr(self.client, name)
+
+    def invoke(self, messages: List[Any], **kwargs) -> Any:
+        return self.policy.call(self.client.invoke, messages, **kwargs)
+
+    async def ainvoke(self, messages: List[Any], **kwargs) -> Any:
+        return await self.policy.acall(self.client.ainvoke, messages, **kwargs)
+
+    def stream(self, messages: List[Any], **kwargs) -> Iterator[Any]:
+        start = self.policy.clock()
+        for attempt in range(self.policy.max_attempts):
+            started = False
+            try:
+                for chunk in self.client.stream(messages, **kwargs):
+                    started = True
+                    yield chunk
+                return
+            except Exception as e:
+                if started:
+                    raise
+                self.policy.sleep(self.policy.next_delay(attempt, e, start))
+
+    async def astream(self, messages: List[Any], **kwargs) -> AsyncIterator[Any]:
+        start = self.policy.clock()
+        for attempt in range(self.policy.max_attempts):
+            started = False
+            try:
+                async for chunk in self.client.astream(messages, **kwargs):
+                    started = True
+                    yield chunk
+                return
+            except Exception as e:
+                if started:
+                    raise
+                await asyncio.sleep(self.policy.next_delay(attempt, e, start))
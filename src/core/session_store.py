@@ -0,0 +1,345 @@
+"""
+会话状态存储
+"""
+
+import atexit
+import json
+import os
+import sqlite3
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Tuple
+
+
+@dataclass
+class SessionState:
+    """单个会话的持久化状态"""
+    session_id: str
+    history: List[Dict[str, str]] = field(default_factory=list)
+    summary: str = ""
+
+
+class SessionStore:
+    """会话存储基类
+
+    写操作都是增量的（追加本轮消息、丢弃最早的若干条、更新摘要），
+    每轮的写入量只与本轮消息有关，与历史总长度无关。
+    """
+
+    def load(self, session_id: str) -> SessionState:
+        """加载会话，不存在时返回空状态"""
+        raise NotImplementedError
+
+    def append(self, session_id: str, messages: List[Dict[str, str]]):
+        """追加消息"""
+        raise NotImplementedError
+
+    def drop_oldest(self, session_id: str, count: int):
+        """丢弃最早的count条消息"""
+        raise NotImplementedError
+
+    def set_summary(self, session_id: str, summary: str):
+        """更新会话摘要"""
+        raise NotImplementedError
+
+    def delete(self, session_id: str):
+        """删除会话"""
+        raise NotImplementedError
+
+    def flush(self):
+        """把缓冲的写入落盘"""
+
+    def close(self):
+        """关闭存储"""
+        self.flush()
+
+
+class InMemorySessionStore(SessionStore):
+    """内存会话存储，超过上限时淘汰最久未访问的会话"""
+
+    def __init__(self, max_sessions: int = 10000):
+        self.max_sessions = max_sessions
+        self._sessions: "OrderedDict[str, SessionState]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get(self, session_id: str) -> SessionState:
+        state = self._sessions.get(session_id)
+        if state is None:
+            state = SessionState(session_id)
+            self._sessions[session_id] = state
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        self._sessions.move_to_end(session_id)
+        return state
+
+    def load(self, session_id: str) -> SessionState:
+        with self._lock:
+            state = self._get(session_id)
+            return SessionState(session_id, list(state.history), state.summary)
+
+    def append(self, session_id: str, messages: List[Dict[str, str]]):
+        with self._lock:
+            self._get(session_id).history.extend(messages)
+
+    def drop_oldest(self, session_id: str, count: int):
+        with self._lock:
+            del self._get(session_id).history[:count]
+
+    def set_summary(self, session_id: str, summary: str):
+        with self._lock:
+            self._get(session_id).summary = summary
+
+    def delete(self, session_id: str):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+
+def _flush_periodically(ref: "weakref.ref[_BufferedStore]", stop: threading.Event, interval: float):
+    """后台定时落盘，缓冲的写入最多延迟 interval 秒（只持有存储的弱引用，存储被回收后退出）"""
+    while not stop.wait(interval):
+        store = ref()
+        if store is None:
+            return
+        try:
+            store.flush()
+        except Exception as e:
+            print(f"⚠️ 会话存储落盘失败: {e}")
+        del store
+
+
+def _close_at_exit(ref: "weakref.ref[_BufferedStore]"):
+    store = ref()
+    if store is None:
+        return
+    try:
+        store.close()
+    except Exception as e:
+        print(f"⚠️ 会话存储关闭失败: {e}")
+
+
+class _BufferedStore(SessionStore):
+    """批量写入的公共逻辑：写操作先进入缓冲区，达到批量大小或间隔后一次性落盘
+
+    除了写入时顺带检查，后台线程每隔 flush_interval 秒落盘一次，进程退出时关闭存储，
+    因此会话最后几轮的写入不会一直停留在缓冲区中。
+    """
+
+    def __init__(self, batch_size: int = 64, flush_interval: float = 0.5):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._buffer: List[Tuple[str, str, Any]] = []
+        self._dirty: set = set()
+        self._last_flush = time.monotonic()
+        self._lock = threading.RLock()
+        self._closed = False
+        self._stop = threading.Event()
+        if flush_interval > 0:
+            threading.Thread(
+                target=_flush_periodically,
+                args=(weakref.ref(self), self._stop, flush_interval),
+                name="session-store-flush",
+                daemon=True,
+            ).start()
+        atexit.register(_close_at_exit, weakref.ref(self))
+
+    def _write(self, op: str, session_id: str, payload: Any):
+        with self._lock:
+            self._buffer.append((op, session_id, payload))
+            self._dirty.add(session_id)
+            if (len(self._buffer) >= self.batch_size
+                    or time.monotonic() - self._last_flush >= self.flush_interval):
+                self.flush()
+
+    def append(self, session_id: str, messages: List[Dict[str, str]]):
+        self._write("append", session_id, messages)
+
+    def drop_oldest(self, session_id: str, count: int):
+        self._write("drop", session_id, count)
+
+    def set_summary(self, session_id: str, summary: str):
+        self._write("summary", session_id, summary)
+
+    def delete(self, session_id: str):
+        self._write("delete", session_id, None)
+
+    def load(self, session_id: str) -> SessionState:
+        with self._lock:
+            # 读之前先落盘该会话未写入的操作，保证读到自己的写入
+            if session_id in self._dirty:
+                self.flush()
+            return self._load(session_id)
+
+    def flush(self):
+        with self._lock:
+            if self._buffer:
+                batch, self._buffer = self._buffer, []
+                self._flush(batch)
+            self._dirty.clear()
+            self._last_flush = time.monotonic()
+
+    def close(self):
+        """落盘、停止后台落盘线程并释放资源（可重复调用）"""
+        with self._lock:
+            if self._closed:
+                return
+            self.flush()
+            self._closed = True
+            self._stop.set()
+            self._close()
+
+    def _flush(self, batch: List[Tuple[str, str, Any]]):
+        raise NotImplementedError
+
+    def _load(self, session_id: str) -> SessionState:
+        raise NotImplementedError
+
+    def _close(self):
+        """释放底层资源"""
+
+
+class SQLiteSessionStore(_BufferedStore):
+    """SQLite会话存储
+
+    消息按 (session_id, seq) 存储，丢弃旧消息只移动会话的起始序号，
+    加载时只读取当前窗口内的消息。
+    """
+
+    def __init__(self, db_path: str, batch_size: int = 64, flush_interval: float = 0.5):
+        super().__init__(batch_size, flush_interval)
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS sessions (
+                session_id TEXT PRIMARY KEY,
+                first_seq INTEGER NOT NULL DEFAULT 0,
+                next_seq INTEGER NOT NULL DEFAULT 0,
+                summary TEXT NOT NULL DEFAULT ''
+            );
+            CREATE TABLE IF NOT EXISTS messages (
+                session_id TEXT NOT NULL,
+                seq INTEGER NOT NULL,
+                role TEXT NOT NULL,
+                content TEXT NOT NULL,
+                PRIMARY KEY (session_id, seq)
+            );
+        """)
+        self._db.commit()
+
+    def _flush(self, batch: List[Tuple[str, str, Any]]):
+        db = self._db
+        for op, session_id, payload in batch:
+            db.execute("INSERT OR IGNORE INTO sessions (session_id) VALUES (?)", (session_id,))
+            if op == "append":
+                next_seq = db.execute(
+                    "SELECT next_seq FROM sessions WHERE session_id = ?", (session_id,)
+                ).fetchone()[0]
+                db.executemany(
+                    "INSERT INTO messages (session_id, seq, role, content) VALUES (?, ?, ?, ?)",
+                    [(session_id, next_seq + i, m["role"], m["content"]) for i, m in enumerate(payload)],
+                )
+                db.execute(
+                    "UPDATE sessions SET next_seq = ? WHERE session_id = ?",
+                    (next_seq + len(payload), session_id),
+                )
+            elif op == "drop":
+                first_seq = db.execute(
+                    "SELECT first_seq FROM sessions WHERE session_id = ?", (session_id,)
+                ).fetchone()[0]
+                db.execute(
+                    "DELETE FROM messages WHERE session_id = ? AND seq < ?",
+                    (session_id, first_seq + payload),
+                )
+                db.execute(
+                    "UPDATE sessions SET first_seq = ? WHERE session_id = ?",
+                    (first_seq + payload, session_id),
+                )
+            elif op == "summary":
+                db.execute("UPDATE sessions SET summary = ? WHERE session_id = ?", (payload, session_id))
+            elif op == "delete":
+                db.execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
+                db.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+        db.commit()
+
+    def _load(self, session_id: str) -> SessionState:
+        row = self._db.execute(
+            "SELECT first_seq, summary FROM sessions WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        if row is None:
+            return SessionState(session_id)
+        first_seq, summary = row
+        rows = self._db.execute(
+            "SELECT role, content FROM messages WHERE session_id = ? AND seq >= ? ORDER BY seq",
+            (session_id, first_seq),
+        ).fetchall()
+        return SessionState(session_id, [{"role": r, "content": c} for r, c in rows], summary)
+
+    def _close(self):
+        self._db.close()
+
+
+class AppendOnlySessionStore(_BufferedStore):
+    """追加写日志的会话存储
+
+    每个写操作以一行JSON追加到日志文件，启动时回放日志重建内存中的会话状态。
+    """
+
+    def __init__(self, log_path: str, batch_size: int = 64, flush_interval: float = 0.5):
+        super().__init__(batch_size, flush_interval)
+        self.log_path = log_path
+        self._sessions: Dict[str, SessionState] = {}
+        if os.path.exists(log_path):
+            with open(log_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        record = json.loads(line)
+                        self._apply(record["op"], record["sid"], record.get("data"))
+        self._file = open(log_path, "a", encoding="utf-8")
+
+    def _apply(self, op: str, session_id: str, payload: Any):
+        if op == "delete":
+            self._sessions.pop(session_id, None)
+            return
+        state = self._sessions.setdefault(session_id, SessionState(session_id))
+        if op == "append":
+            state.history.extend(payload)
+        elif op == "drop":
+            del state.history[:payload]
+        elif op == "summary":
+            state.summary = payload
+
+    def _flush(self, batch: List[Tuple[str, str, Any]]):
+        lines = []
+        for op, session_id, payload in batch:
+            self._apply(op, session_id, payload)
+            lines.append(json.dumps({"op": op, "sid": session_id, "data": payload}, ensure_ascii=False))
+        self._file.write("\n".join(lines) + "\n")
+        self._file.flush()
+
+    def _load(self, session_id: str) -> SessionState:
+        state = self._sessions.get(session_id)
+        if state is None:
+            return SessionState(session_id)
+        return SessionState(session_id, list(state.history), state.summary)
+
+    def compact(self):
+        """用当前状态重写日志，去掉已被丢弃或删除的记录"""
+        with self._lock:
+            self.flush()
+            self._file.close()
+            tmp_path = self.log_path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                for session_id, state in self._sessions.items():
+                    if state.history:
+                        f.write(json.dumps({"op": "append", "sid": session_id, "data": state.history},
+                                           ensure_ascii=False) + "\n")
+                    if state.summary:
+                        f.write(json.dumps({"op": "summary", "sid": session_id, "data": state.summary},
+                                           ensure_ascii=False) + "\n")
+            os.replace(tmp_path, self.log_path)
+            self._file = open(self.log_path, "a", encoding="utf-8")
+
+    def _close(self):
+        self._file.close()
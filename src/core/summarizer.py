@@ -0,0 +1,156 @@
+"""
+对话历史的增量滚动摘要
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    """所有会话共享的后台摘要线程池"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=int(os.getenv('SUMMARY_WORKERS', 2)),
+                    thread_name_prefix="summarizer",
+                )
+    return _executor
+
+
+class ConversationSummarizer:
+    """把移出上下文窗口的旧消息增量合并进一段滚动摘要
+
+    摘要在后台线程中更新，不占用用户请求的时间；每次只把
+    “已有摘要 + 新移出的消息”交给模型，不会重新摘要整段历史。
+    """
+
+    def __init__(self,
+                 client: Any,
+                 max_summary_chars: int = 500,
+                 name: str = "助手",
+                 summary: str = "",
+                 on_update: Optional[Callable[[str], None]] = None,
+                 max_retries: int = 2,
+                 retry_delay: float = 1.0):
+        """
+        Args:
+            client: 用于生成摘要的聊天模型
+            max_summary_chars: 摘要最大字数
+            name: 助手名称（摘要中的称呼）
+            summary: 已有摘要（例如从会话存储中恢复）
+            on_update: 摘要更新后的回调（例如写回会话存储）
+            max_retries: 合并失败后重试的次数，用完后丢弃这批消息
+            retry_delay: 重试前的等待时间（秒），按重试次数线性增加
+        """
+        self.client = client
+        self.max_summary_chars = max_summary_chars
+        self.name = name
+        self.summary = summary
+        self.on_update = on_update
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+
+        self._pending: List[Dict[str, str]] = []
+        self._lock = threading.Lock()
+        self._running: Optional[Future] = None
+        self._draining = False
+        self._generation = 0
+
+    def submit(self, evicted: List[Dict[str, str]]) -> Optional[Future]:
+        """提交被移出窗口的消息，后台合并进摘要"""
+        if not evicted:
+            return None
+        with self._lock:
+            self._pending.extend(evicted)
+            # 同一会话同时只有一个摘要任务，保证按顺序合并
+            if not self._draining:
+                self._draining = True
+                self._running = _get_executor().submit(self._drain)
+            return self._running
+
+    def wait(self, timeout: Optional[float] = None):
+        """等待后台摘要完成（主要用于测试和退出前落盘）"""
+        running = self._running
+        if running is not None:
+            running.result(timeout=timeout)
+
+    def as_message(self) -> Optional[Dict[str, str]]:
+        """把摘要包装成系统消息，没有摘要时返回None"""
+        if not self.summary:
+            return None
+        return {"role": "system", "content": f"之前的对话摘要：{self.summary}"}
+
+    def reset(self):
+        """清空摘要（进行中的任务结果会被丢弃）"""
+        with self._lock:
+            self._generation += 1
+            self._pending = []
+            self.summary = ""
+
+    def _drain(self):
+        failures = 0
+        while True:
+            with self._lock:
+                if not self._pending:
+                    self._draining = False
+                    return
+                batch, self._pending = self._pending, []
+                previous, generation = self.summary, self._generation
+
+            try:
+                updated = self._fold(previous, batch)
+            except Exception as e:
+                print(f"⚠️ 对话摘要更新失败: {e}")
+                with self._lock:
+                    # 把这批消息放回队首，下次与新移出的消息一起合并；期间被重置过则不再放回
+                    if generation != self._generation or failures >= self.max_retries:
+                        failures = 0
+                        continue
+                    self._pending = batch + self._pending
+                failures += 1
+                time.sleep(self.retry_delay * failures)
+                continue
+
+            failures = 0
+
+            with self._lock:
+                # 期间被重置过则丢弃结果
+                if generation != self._generation:
+                    continue
+                self.summary = updated
+
+            if self.on_update is not None:
+                # 回调失败（例如写会话存储出错）不能中断摘要循环，否则之后不会再调度摘要
+                try:
+                    self.on_update(updated)
+                except Exception as e:
+                    print(f"⚠️ 对话摘要回调失败: {e}")
+
+    def _fold(self, previous: str, batch: List[Dict[str, str]]) -> str:
+        """把一批消息合并进已有摘要"""
+        lines = []
+        for msg in batch:
+            role = "用户" if msg["role"] == "user" else self.name
+            lines.append(f"{role}: {msg['content']}")
+
+        prompt = (
+            f"已有摘要：{previous or '（无）'}\n\n"
+            "新增对话：\n" + "\n".join(lines) + "\n\n"
+            f"请把新增对话合并进已有摘要，保留目的地、日期、预算、偏好等关键信息，"
+            f"输出更新后的摘要，不超过{self.max_summary_chars}字。"
+        )
+        messages = [
+            {"role": "system", "content": "你是对话摘要助手，只输出摘要正文。"},
+            {"role": "user", "content": prompt},
+        ]
+        response = self.client.invoke(messages)
+        return response.content.strip()[:self.max_summary_chars]
@@ -0,0 +1,90 @@
+"""
+执行模型返回的工具调用（函数调用）
+"""
+
+import json
+import logging
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def get_tool_calls(message: Any) -> List[Dict[str, Any]]:
+    """取出模型回复中的工具调用（LangChain格式：name/args/id）"""
+    return list(getattr(message, "tool_calls", None) or [])
+
+
+def merge_chunks(gathered: Any, chunk: Any) -> Any:
+    """累加流式分段（LangChain的AIMessageChunk相加时会把tool_call_chunks合并为tool_calls）"""
+    if gathered is None:
+        return chunk
+    try:
+        return gathered + chunk
+    except TypeError:
+        # 不支持相加的分段：保留带工具调用的那一段
+        return chunk if get_tool_calls(chunk) else gathered
+
+
+def serialize_result(result: Any) -> str:
+    """把工具结果转换为交给模型的文本"""
+    if isinstance(result, str):
+        return result
+    return json.dumps(result, ensure_ascii=False, default=str)
+
+
+def _error_result(tool_name: str, e: Exception) -> Dict[str, Any]:
+    """工具出错时返回给模型的结构化错误，而不是中断整轮对话"""
+    to_dict = getattr(e, "to_dict", None)
+    if to_dict is not None:
+        return to_dict()
+    return {"error": "execution_error", "tool": tool_name, "message": str(e)}
+
+
+def tool_message(call: Dict[str, Any], result: Any) -> Dict[str, Any]:
+    """构造回传给模型的工具结果消息"""
+    return {
+        "role": "tool",
+        "content": serialize_result(result),
+        "tool_call_id": call.get("id") or "",
+    }
+
+
+class ToolCallRunner:
+    """执行一步中的多个工具调用
+
+    同一步里的工具调用相互独立，交给注册表的 execute_many / aexecute_many
+    并发执行（相同调用只执行一次），结果按调用顺序返回。
+    """
+
+    def __init__(self, registry: Any, on_call: Optional[Callable[[Dict[str, Any]], None]] = None):
+        """
+        Args:
+            registry: 工具注册表
+            on_call: 每个工具调用执行前的回调（例如在界面上展示），默认只写日志
+        """
+        self.registry = registry
+        self.on_call = on_call
+
+    def _log(self, calls: List[Dict[str, Any]]):
+        # 不直接打印：流式回复时输出会插进正文中间
+        for call in calls:
+            logger.info("调用工具: %s(%s)", call.get("name", ""), call.get("args") or {})
+            if self.on_call is not None:
+                self.on_call(call)
+
+    @staticmethod
+    def _messages(calls: List[Dict[str, Any]], results: List[Any]) -> List[Dict[str, Any]]:
+        return [
+            tool_message(call, _error_result(call.get("name", ""), result) if isinstance(result, Exception) else result)
+            for call, result in zip(calls, results)
+        ]
+
+    def run(self, calls: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """并发执行工具调用，返回工具结果消息列表"""
+        self._log(calls)
+        return self._messages(calls, self.registry.execute_many(calls))
+
+    async def arun(self, calls: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """并发执行工具调用（异步版本）"""
+        self._log(calls)
+        return self._messages(calls, await self.registry.aexecute_many(calls))
@@ -0,0 +1,169 @@
+"""
+批量工具调用：预先校验、去重、按工具分组
+"""
+
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Sequence, Tuple, Union
+
+from .execution import ToolCancelledError, ToolExecutionError, ToolTimeoutError
+from .result_cache import ToolCache
+
+if TYPE_CHECKING:
+    from .tool_registry import Tool, ToolRegistry
+
+
+Call = Union[Tuple[str, Dict[str, Any]], Dict[str, Any]]
+
+
+def normalize_call(call: Call) -> Tuple[str, Dict[str, Any]]:
+    """把 (name, args) 或 {"name": ..., "args": ...} 统一为 (name, args)"""
+    if isinstance(call, dict):
+        return call["name"], dict(call.get("args") or {})
+    name, args = call
+    return name, dict(args or {})
+
+
+@dataclass
+class _Group:
+    """一次执行单元：单个调用，或交给批量实现的同一工具的多个调用"""
+    tool: "Tool"
+    keys: List[str]
+    kwargs: List[Dict[str, Any]]
+
+    @property
+    def use_batch(self) -> bool:
+        # 只有一个调用时按普通调用执行（仍然应用超时等执行策略）
+        return self.tool.batch_function is not None and len(self.keys) > 1
+
+
+@dataclass
+class BatchPlan:
+    """批量调用计划
+
+    slots按输入顺序记录每个调用对应的去重键（或校验错误），
+    相同工具名+等价参数的调用共享同一个键，只执行一次。
+    """
+    slots: List[Union[str, BaseException]] = field(default_factory=list)
+    pending: Dict[str, Tuple["Tool", Dict[str, Any]]] = field(default_factory=dict)
+    results: Dict[str, Any] = field(default_factory=dict)
+
+    @classmethod
+    def build(cls, registry: "ToolRegistry", calls: Sequence[Call]) -> "BatchPlan":
+        """校验全部调用、去重并查询结果缓存（不执行任何工具）"""
+        plan = cls()
+        for call in calls:
+            try:
+                name, args = normalize_call(call)
+                tool, kwargs, _ = registry._prepare(name, args)
+            except Exception as e:
+                plan.slots.append(e)
+                continue
+            key = ToolCache.make_key(tool.name, tool.parameters, kwargs)
+            plan.slots.append(key)
+            if key in plan.results or key in plan.pending:
+                continue
+            if tool.cache is not None:
+                hit, result = tool.cache.get(key)
+                if hit:
+                    plan.results[key] = result
+                    continue
+            plan.pending[key] = (tool, kwargs)
+        return plan
+
+    def first_error(self) -> Optional[BaseException]:
+        for slot in self.slots:
+            if isinstance(slot, BaseException):
+                return slot
+        return None
+
+    def groups(self) -> List[_Group]:
+        """按工具分组：有批量实现的工具合并为一组，其余每个调用单独一组"""
+        batched: Dict[str, _Group] = {}
+        groups: List[_Group] = []
+        for key, (tool, kwargs) in self.pending.items():
+            if tool.batch_function is not None:
+                group = batched.get(tool.name)
+                if group is None:
+                    group = batched[tool.name] = _Group(tool, [], [])
+                    groups.append(group)
+                group.keys.append(key)
+                group.kwargs.append(kwargs)
+            else:
+                groups.append(_Group(tool, [key], [kwargs]))
+        return groups
+
+    def record(self, group: _Group, results: List[Any]):
+        """保存一组的执行结果，成功的结果写入工具的结果缓存"""
+        for key, result in zip(group.keys, results):
+            self.results[key] = result
+            if group.tool.cache is not None and not isinstance(result, BaseException):
+                group.tool.cache.set(key, result)
+
+    def collect(self, return_exceptions: bool) -> List[Any]:
+        """按输入顺序返回结果"""
+        output = []
+        for slot in self.slots:
+            result = slot if isinstance(slot, BaseException) else self.results[slot]
+            if isinstance(result, BaseException) and not return_exceptions:
+                raise result
+            output.append(result)
+        return output
+
+
+def _check_batch_results(tool: "Tool", results: Any, expected: int) -> List[Any]:
+    results = list(results)
+    if len(results) != expected:
+        raise ToolExecutionError(tool.name, f"批量实现返回了 {len(results)} 个结果，应为 {expected} 个")
+    # 批量实现在某个位置返回异常表示只有该调用失败，与逐个调用时一样包装为ToolExecutionError
+    for i, result in enumerate(results):
+        if isinstance(result, Exception) and not isinstance(result, ToolExecutionError):
+            error = ToolExecutionError(tool.name, str(result))
+            error.__cause__ = result
+            results[i] = error
+    return results
+
+
+def _batch_failed(group: _Group, error: Exception) -> Optional[List[Any]]:
+    """批量实现出错时的处理：超时/取消按整组返回错误，其余错误返回None表示改为逐个调用"""
+    if isinstance(error, (ToolTimeoutError, ToolCancelledError)):
+        return [error] * len(group.keys)
+    # 例如某一个调用的参数在批量实现中不合法：逐个调用，只让出错的调用失败
+    return None
+
+
+def run_group(group: _Group) -> List[Any]:
+    """执行一组调用，错误按位置返回"""
+    if group.use_batch:
+        try:
+            results = group.tool.runner.call_batch(group.tool.batch_function, group.kwargs)
+            return _check_batch_results(group.tool, results, len(group.keys))
+        except Exception as e:
+            failed = _batch_failed(group, e)
+            if failed is not None:
+                return failed
+    results = []
+    for kwargs in group.kwargs:
+        try:
+            results.append(group.tool.runner(kwargs))
+        except Exception as e:
+            results.append(e)
+    return results
+
+
+async def arun_group(group: _Group) -> List[Any]:
+    """执行一组调用（异步版本），同步的批量实现交给工具线程池"""
+    if group.use_batch:
+        try:
+            results = await group.tool.runner.acall_batch(group.tool.batch_function, group.kwargs)
+            return _check_batch_results(group.tool, results, len(group.keys))
+        except Exception as e:
+            failed = _batch_failed(group, e)
+            if failed is not None:
+                return failed
+    results = []
+    for kwargs in group.kwargs:
+        try:
+            results.append(await group.tool.runner.acall(kwargs))
+        except Exception as e:
+            results.append(e)
+    return results
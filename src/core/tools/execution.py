@@ -0,0 +1,258 @@
+"""
+工具执行策略：超时、并发限制与执行器选择
+"""
+
+import importlib
+import inspect
+import multiprocessing
+import os
+import threading
+from concurrent.futures import CancelledError, Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+EXECUTORS = ("inline", "thread", "process")
+
+
+class ToolExecutionError(RuntimeError):
+    """工具执行失败（包含结构化的错误信息）"""
+
+    code = "execution_error"
+
+    def __init__(self, tool_name: str, message: str):
+        self.tool_name = tool_name
+        self.message = message
+        super().__init__(f"执行工具 '{tool_name}' 时出错: {message}")
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为可返回给模型的结构化错误"""
+        return {"error": self.code, "tool": self.tool_name, "message": self.message}
+
+
+class ToolTimeoutError(ToolExecutionError, TimeoutError):
+    """工具执行（或等待并发名额）超时"""
+
+    code = "timeout"
+
+
+class ToolCancelledError(ToolExecutionError):
+    """工具调用在执行前被取消"""
+
+    code = "cancelled"
+
+
+@dataclass(frozen=True)
+class ExecutionPolicy:
+    """单个工具的执行策略"""
+    timeout: Optional[float] = None          # 超时时间（秒），None表示不限制
+    max_concurrency: Optional[int] = None    # 同时执行的最大调用数，None表示不限制
+    executor: str = "inline"                 # inline / thread / process
+
+    def __post_init__(self):
+        if self.executor not in EXECUTORS:
+            raise ValueError(f"executor 应为 {EXECUTORS} 之一，实际为 {self.executor!r}")
+        if self.max_concurrency is not None and self.max_concurrency < 1:
+            raise ValueError("max_concurrency 至少为1")
+
+    @property
+    def effective_executor(self) -> str:
+        # 在调用线程中执行无法中断，设置了超时的inline工具改为在线程池中执行
+        if self.executor == "inline" and self.timeout is not None:
+            return "thread"
+        return self.executor
+
+
+_thread_pool: Optional[ThreadPoolExecutor] = None
+_process_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _get_thread_pool() -> ThreadPoolExecutor:
+    """executor="thread" 的工具共享的线程池"""
+    global _thread_pool
+    if _thread_pool is None:
+        with _pool_lock:
+            if _thread_pool is None:
+                _thread_pool = ThreadPoolExecutor(
+                    max_workers=int(os.getenv('TOOL_THREAD_WORKERS', 8)),
+                    thread_name_prefix="tool-exec",
+                )
+    return _thread_pool
+
+
+def _get_process_pool() -> ProcessPoolExecutor:
+    """executor="process" 的工具（CPU密集型）共享的进程池"""
+    global _process_pool
+    if _process_pool is None:
+        with _pool_lock:
+            if _process_pool is None:
+                workers = os.getenv('TOOL_PROCESS_WORKERS')
+                # 使用spawn启动子进程：主进程里已有线程池和锁，fork可能复制到被持有的锁而死锁
+                _process_pool = ProcessPoolExecutor(
+                    max_workers=int(workers) if workers else None,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+    return _process_pool
+
+
+def _call_by_name(module_name: str, qualname: str, args: Tuple[Any, ...], kwargs: Dict[str, Any]) -> Any:
+    """在子进程中按模块路径找到工具函数并调用（注册后的函数本身无法直接pickle）"""
+    target: Any = importlib.import_module(module_name)
+    for part in qualname.split("."):
+        target = getattr(target, part)
+    return target(*args, **kwargs)
+
+
+class ToolExecutor:
+    """按执行策略调用单个工具
+
+    同步工具在同步代码中按策略执行；在异步代码中总是交给有界线程池（或进程池），
+    不阻塞事件循环。异步工具（async def）直接在当前事件循环中执行。
+    """
+
+    def __init__(self, tool_name: str, function: Callable, policy: ExecutionPolicy):
+        self.tool_name = tool_name
+        self.function = function
+        self.policy = policy
+        self.is_async = inspect.iscoroutinefunction(function)
+        if self.is_async and policy.executor != "inline":
+            raise ValueError(f"异步工具 '{tool_name}' 只能在事件循环中执行，不支持 executor={policy.executor!r}")
+        self._semaphore = (threading.BoundedSemaphore(policy.max_concurrency)
+                           if policy.max_concurrency is not None else None)
+
+    def _submit(self, function: Callable, args: Tuple[Any, ...], kwargs: Dict[str, Any]) -> Future:
+        executor = self.policy.effective_executor
+        if executor == "process":
+            pool: Executor = _get_process_pool()
+            return pool.submit(_call_by_name, function.__module__, function.__qualname__, args, kwargs)
+        return _get_thread_pool().submit(function, *args, **kwargs)
+
+    def _acquire(self):
+        if self._semaphore is not None:
+            if not self._semaphore.acquire(timeout=self.policy.timeout):
+                raise ToolTimeoutError(self.tool_name, f"等待并发名额超过 {self.policy.timeout}s")
+
+    async def _aacquire(self):
+        if self._semaphore is None or self._semaphore.acquire(blocking=False):
+            return
+        # 名额已满时在线程中等待，不阻塞事件循环。
+        # 等待方被取消后线程仍可能拿到名额：由线程或取消处理中后到的一方归还，避免名额泄漏
+        import asyncio
+        handoff = threading.Lock()
+        state = {"abandoned": False, "acquired": False}
+
+        def wait_for_slot():
+            self._acquire()
+            with handoff:
+                if state["abandoned"]:
+                    self._release()
+                else:
+                    state["acquired"] = True
+
+        try:
+            await asyncio.to_thread(wait_for_slot)
+        except asyncio.CancelledError:
+            with handoff:
+                state["abandoned"] = True
+                acquired = state["acquired"]
+            if acquired:
+                self._release()
+            raise
+
+    def _release(self, *_):
+        if self._semaphore is not None:
+            self._semaphore.release()
+
+    def __call__(self, kwargs: Dict[str, Any]) -> Any:
+        """执行工具，超时抛出ToolTimeoutError，取消抛出ToolCancelledError，其余错误抛出ToolExecutionError"""
+        return self._run(self.function, (), kwargs)
+
+    def call_batch(self, batch_function: Callable, calls: List[Dict[str, Any]]) -> Any:
+        """按同一执行策略调用工具的批量实现：整批占用一个并发名额，超时时间作用于整批"""
+        return self._run(batch_function, (calls,), {})
+
+    async def acall(self, kwargs: Dict[str, Any]) -> Any:
+        """执行工具（异步版本），错误类型与同步版本一致；调用方取消时CancelledError照常向上传播"""
+        return await self._arun(self.function, (), kwargs)
+
+    async def acall_batch(self, batch_function: Callable, calls: List[Dict[str, Any]]) -> Any:
+        """调用工具的批量实现（异步版本）"""
+        return await self._arun(batch_function, (calls,), {})
+
+    def _run(self, function: Callable, args: Tuple[Any, ...], kwargs: Dict[str, Any]) -> Any:
+        if inspect.iscoroutinefunction(function):
+            import asyncio
+            try:
+                asyncio.get_running_loop()
+            except RuntimeError:
+                return asyncio.run(self._arun(function, args, kwargs))
+            raise ToolExecutionError(self.tool_name, "异步工具不能在事件循环中同步调用，请使用aexecute")
+
+        self._acquire()
+
+        if self.policy.effective_executor == "inline":
+            try:
+                return function(*args, **kwargs)
+            except Exception as e:
+                raise ToolExecutionError(self.tool_name, str(e)) from e
+            finally:
+                self._release()
+
+        try:
+            future = self._submit(function, args, kwargs)
+        except Exception:
+            self._release()
+            raise
+        # 名额在任务真正结束时才释放，超时后仍在运行的调用继续占用名额
+        future.add_done_callback(self._release)
+
+        try:
+            return future.result(timeout=self.policy.timeout)
+        except FutureTimeoutError as e:
+            # 尚未开始的任务可以取消；已在运行的线程/进程无法强制中断
+            future.cancel()
+            raise ToolTimeoutError(self.tool_name, f"执行超过 {self.policy.timeout}s") from e
+        except CancelledError as e:
+            raise ToolCancelledError(self.tool_name, "调用已被取消") from e
+        except Exception as e:
+            raise ToolExecutionError(self.tool_name, str(e)) from e
+
+    async def _arun(self, function: Callable, args: Tuple[Any, ...], kwargs: Dict[str, Any]) -> Any:
+        import asyncio
+
+        await self._aacquire()
+        if inspect.iscoroutinefunction(function):
+            try:
+                return await asyncio.wait_for(function(*args, **kwargs), self.policy.timeout)
+            except ToolExecutionError:
+                raise
+            except asyncio.TimeoutError as e:
+                raise ToolTimeoutError(self.tool_name, f"执行超过 {self.policy.timeout}s") from e
+            except Exception as e:
+                raise ToolExecutionError(self.tool_name, str(e)) from e
+            finally:
+                self._release()
+
+        try:
+            future = self._submit(function, args, kwargs)
+        except Exception:
+            self._release()
+            raise
+        future.add_done_callback(self._release)
+
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), self.policy.timeout)
+        except asyncio.TimeoutError as e:
+            future.cancel()
+            raise ToolTimeoutError(self.tool_name, f"执行超过 {self.policy.timeout}s") from e
+        except asyncio.CancelledError:
+            task = asyncio.current_task()
+            if task is not None and task.cancelling():
+                # 调用方取消：尽量取消尚未开始的任务，并照常传播
+                future.cancel()
+                raise
+            raise ToolCancelledError(self.tool_name, "调用已被取消")
+        except Exception as e:
+            raise ToolExecutionError(self.tool_name, str(e)) from e
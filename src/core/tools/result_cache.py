@@ -0,0 +1,117 @@
+"""
+确定性工具的结果缓存
+"""
+
+import copy
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple, Union
+
+
+_IMMUTABLE_TYPES = (str, int, float, bool, bytes, type(None))
+
+
+def _copy(value: Any) -> Any:
+    """返回缓存值的副本，避免调用方修改缓存中的字典/列表"""
+    if isinstance(value, _IMMUTABLE_TYPES):
+        return value
+    return copy.deepcopy(value)
+
+
+class ToolCache:
+    """带TTL的LRU结果缓存（线程安全）
+
+    缓存键由工具名和校验后的参数（补全默认值、按参数顺序）构成，
+    因此 f(3, "东京") 与 f(days=3, destination="东京", travelers=1) 命中同一条目。
+    """
+
+    def __init__(self, ttl: Optional[float] = 3600.0, max_entries: int = 1024,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            ttl: 过期时间（秒），None表示不过期
+            max_entries: 最多缓存条目数，超出后淘汰最久未使用的条目
+            clock: 单调时钟（测试时可替换）
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.clock = clock
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(tool_name: str, parameters: Any, kwargs: Dict[str, Any]) -> str:
+        """
+        规范化的缓存键
+
+        Args:
+            tool_name: 工具名称
+            parameters: ParameterSchema列表（用于补全默认值并固定顺序）
+            kwargs: 校验后的参数
+        """
+        values = [kwargs.get(p.name, p.default) for p in parameters]
+        return tool_name + ":" + json.dumps(values, ensure_ascii=False, sort_keys=True, default=str)
+
+    def get(self, key: Hashable) -> Tuple[bool, Any]:
+        """查询缓存，返回 (是否命中, 结果副本)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at >= self.clock():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return True, _copy(value)
+                del self._entries[key]
+            self.misses += 1
+            return False, None
+
+    def set(self, key: Hashable, value: Any):
+        """写入缓存"""
+        expires_at = self.clock() + self.ttl if self.ttl is not None else float("inf")
+        with self._lock:
+            self._entries[key] = (expires_at, _copy(value))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self._entries),
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+        }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+CacheOption = Union[None, bool, Dict[str, Any], ToolCache]
+
+
+def make_tool_cache(option: CacheOption) -> Optional[ToolCache]:
+    """
+    把register_tool的cache参数转换为缓存实例
+
+    Args:
+        option: None/False不缓存；True使用默认设置；
+            字典如 {"ttl": 600, "max_entries": 256}；或直接传入ToolCache实例
+    """
+    if option is None or option is False:
+        return None
+    if option is True:
+        return ToolCache()
+    if isinstance(option, dict):
+        return ToolCache(**option)
+    if isinstance(option, ToolCache):
+        return option
+    raise TypeError(f"不支持的cache参数: {option!r}")
@@ -0,0 +1,142 @@
+"""
+把Python类型注解转换为JSON Schema（用于OpenAI/Ollama函数调用）
+"""
+
+import enum
+import types
+import typing
+from typing import Any, Dict, List, Union, get_args, get_origin
+
+
+_SCALAR_TYPES = {
+    str: "string",
+    int: "integer",
+    float: "number",
+    bool: "boolean",
+}
+
+
+def _is_union(tp: Any) -> bool:
+    origin = get_origin(tp)
+    return origin is Union or origin is types.UnionType
+
+
+def type_name(tp: Any) -> str:
+    """类型的可读名称，支持 Optional[int]、Dict[str, float] 等泛型"""
+    if tp is type(None):
+        return "None"
+    if _is_union(tp):
+        args = get_args(tp)
+        non_none = [a for a in args if a is not type(None)]
+        if len(non_none) == 1 and len(args) == 2:
+            return f"Optional[{type_name(non_none[0])}]"
+        return f"Union[{', '.join(type_name(a) for a in args)}]"
+    origin = get_origin(tp)
+    if origin is not None:
+        args = get_args(tp)
+        # typing.Dict[...] 保留 "Dict"，内置 dict[...] 使用 "dict"
+        base = getattr(tp, "_name", None) or getattr(origin, "__name__", str(origin).replace("typing.", ""))
+        if origin is typing.Literal:
+            return f"Literal[{', '.join(repr(a) for a in args)}]"
+        return f"{base}[{', '.join(type_name(a) for a in args)}]" if args else base
+    return getattr(tp, "__name__", str(tp).replace("typing.", ""))
+
+
+def json_schema_for_type(tp: Any) -> Dict[str, Any]:
+    """把类型注解转换为JSON Schema片段"""
+    if tp is Any:
+        return {}
+
+    if _is_union(tp):
+        non_none = [a for a in get_args(tp) if a is not type(None)]
+        if len(non_none) == 1:
+            # Optional[X]：是否必填由required列表表达
+            return json_schema_for_type(non_none[0])
+        return {"anyOf": [json_schema_for_type(a) for a in non_none]}
+
+    origin = get_origin(tp)
+    args = get_args(tp)
+
+    if origin is typing.Literal:
+        schema = {"enum": list(args)}
+        kinds = {_SCALAR_TYPES.get(type(a)) for a in args}
+        if len(kinds) == 1 and None not in kinds:
+            schema["type"] = kinds.pop()
+        return schema
+
+    if origin in (list, List, tuple, set, frozenset) or tp in (list, tuple, set):
+        schema: Dict[str, Any] = {"type": "array"}
+        if args:
+            schema["items"] = json_schema_for_type(args[0])
+        return schema
+
+    if origin is dict or tp is dict:
+        schema = {"type": "object"}
+        if len(args) == 2:
+            schema["additionalProperties"] = json_schema_for_type(args[1])
+        return schema
+
+    if isinstance(tp, type) and issubclass(tp, enum.Enum):
+        values = [m.value for m in tp]
+        schema = {"enum": values}
+        kinds = {_SCALAR_TYPES.get(type(v)) for v in values}
+        if len(kinds) == 1 and None not in kinds:
+            schema["type"] = kinds.pop()
+        return schema
+
+    if tp in _SCALAR_TYPES:
+        return {"type": _SCALAR_TYPES[tp]}
+
+    return {"type": "object"}
+
+
+def _json_default(value: Any) -> Any:
+    """默认值转换为JSON可表示的形式，无法表示时返回None"""
+    if isinstance(value, enum.Enum):
+        value = value.value
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    if isinstance(value, (list, tuple)) and all(isinstance(v, (str, int, float, bool)) for v in value):
+        return list(value)
+    return None
+
+
+def function_schema(name: str, description: str, parameters: List[Any]) -> Dict[str, Any]:
+    """
+    生成OpenAI/Ollama兼容的函数调用schema
+
+    Args:
+        name: 工具名称
+        description: 工具描述
+        parameters: ParameterSchema列表
+    """
+    properties: Dict[str, Any] = {}
+    required: List[str] = []
+    for param in parameters:
+        prop = json_schema_for_type(param.type)
+        if param.description:
+            prop["description"] = param.description
+        if param.choices:
+            if prop.get("type") == "array":
+                prop["items"] = {**prop.get("items", {}), "enum": list(param.choices)}
+            else:
+                prop["enum"] = list(param.choices)
+        default = _json_default(param.default)
+        if not param.required and default is not None:
+            prop["default"] = default
+        properties[param.name] = prop
+        if param.required:
+            required.append(param.name)
+
+    return {
+        "type": "function",
+        "function": {
+            "name": name,
+            "description": description.strip(),
+            "parameters": {
+                "type": "object",
+                "properties": properties,
+                "required": required,
+            },
+        },
+    }
@@ -4,10 +4,18 @@
 
 import inspect
 import functools
-from typing import Dict, List, Any, Callable, Optional, get_type_hints
-from dataclasses import dataclass
+import json
+import os
+from typing import Dict, List, Any, Callable, Optional, Sequence, Tuple, get_type_hints
+from dataclasses import dataclass, field
 from enum import Enum
 
+from .batch import BatchPlan, Call, arun_group, run_group
+from .execution import ExecutionPolicy, ToolExecutor
+from .result_cache import CacheOption, ToolCache, make_tool_cache
+from .schema import function_schema, type_name
+from .validators import ToolValidationError, compile_validator
+
 
 class ToolCategory(Enum):
     """工具分类"""
@@ -28,6 +36,7 @@ class ParameterSchema:
     description: str
     required: bool = True
     default: Any = None
+    choices: Optional[List[Any]] = None
 
 
 @dataclass
@@ -40,11 +49,28 @@ class Tool:
     parameters: List[ParameterSchema]
     return_type: type
     return_description: str
+    validator: Optional[Callable[[Dict[str, Any]], Dict[str, Any]]] = field(default=None, repr=False, compare=False)
+    cache: Optional[ToolCache] = field(default=None, repr=False, compare=False)
+    policy: ExecutionPolicy = field(default_factory=ExecutionPolicy, compare=False)
+    runner: Optional[ToolExecutor] = field(default=None, repr=False, compare=False)
+    batch_function: Optional[Callable[[List[Dict[str, Any]]], List[Any]]] = field(default=None, repr=False, compare=False)
+    
+    def __post_init__(self):
+        # 注册时预编译参数校验器
+        if self.validator is None:
+            self.validator = compile_validator(self.name, self.parameters)
+        if self.runner is None:
+            self.runner = ToolExecutor(self.name, self.function, self.policy)
     
     def __call__(self, *args, **kwargs) -> Any:
-        """调用工具"""
+        """调用工具（异步工具返回协程）"""
         return self.function(*args, **kwargs)
     
+    @property
+    def is_async(self) -> bool:
+        """是否为异步工具（async def）"""
+        return self.runner.is_async
+    
     def get_schema(self) -> Dict[str, Any]:
         """获取工具的JSON Schema描述"""
         schema = {
@@ -54,7 +80,7 @@ class Tool:
             "parameters": [
                 {
                     "name": param.name,
-                    "type": param.type.__name__,
+                    "type": type_name(param.type),
                     "description": param.description,
                     "required": param.required,
                     "default": param.default
@@ -62,34 +88,27 @@ class Tool:
                 for param in self.parameters
             ],
             "returns": {
-                "type": self.return_type.__name__,
+                "type": type_name(self.return_type),
                 "description": self.return_description
             }
         }
         return schema
     
+    def to_function_schema(self) -> Dict[str, Any]:
+        """获取OpenAI/Ollama函数调用格式的schema"""
+        return function_schema(self.name, self.description, self.parameters)
+    
     def validate_arguments(self, **kwargs) -> bool:
         """验证参数"""
-        for param in self.parameters:
-            if param.required and param.name not in kwargs:
-                return False
-            if param.name in kwargs:
-                # 简单的类型检查
-                value = kwargs[param.name]
-                if not isinstance(value, param.type):
-                    try:
-                        # 尝试类型转换
-                        if param.type == str:
-                            kwargs[param.name] = str(value)
-                        elif param.type == int:
-                            kwargs[param.name] = int(value)
-                        elif param.type == float:
-                            kwargs[param.name] = float(value)
-                        elif param.type == bool:
-                            kwargs[param.name] = bool(value)
-                    except (ValueError, TypeError):
-                        return False
+        try:
+            self.validator(kwargs)
+        except ToolValidationError:
+            return False
         return True
+    
+    def coerce_arguments(self, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        """校验并转换参数，失败时抛出ToolValidationError"""
+        return self.validator(kwargs)
 
 
 class ToolRegistry:
@@ -100,12 +119,35 @@ class ToolRegistry:
         self._categories: Dict[ToolCategory, List[str]] = {
             category: [] for category in ToolCategory
         }
+        # schema缓存，注册表版本变化（注册/清空）时失效
+        self._version = 0
+        self._schema_cache: Dict[Any, Any] = {}
+        self._schema_cache_version = 0
+    
+    @property
+    def version(self) -> int:
+        """注册表版本号，每次注册或清空时递增"""
+        return self._version
+    
+    def _cached(self, key: Any, build: Callable[[], Any]) -> Any:
+        """按注册表版本缓存计算结果"""
+        if self._schema_cache_version != self._version:
+            self._schema_cache = {}
+            self._schema_cache_version = self._version
+        if key not in self._schema_cache:
+            self._schema_cache[key] = build()
+        return self._schema_cache[key]
     
     def register(self, 
                 name: Optional[str] = None,
                 description: str = "",
                 category: ToolCategory = ToolCategory.UTILITY,
-                return_description: str = "") -> Callable:
+                return_description: str = "",
+                choices: Optional[Dict[str, List[Any]]] = None,
+                cache: CacheOption = None,
+                timeout: Optional[float] = None,
+                max_concurrency: Optional[int] = None,
+                executor: str = "inline") -> Callable:
         """
         工具注册装饰器
         
@@ -114,7 +156,16 @@ class ToolRegistry:
             description: 工具描述
             category: 工具分类
             return_description: 返回结果描述
+            choices: 参数的可选值，如 {"budget_level": ["经济", "中等", "豪华"]}
+            cache: 结果缓存（只用于结果仅取决于参数的工具），True使用默认设置，
+                或传入 {"ttl": 秒, "max_entries": 条数}、ToolCache实例
+            timeout: 执行超时时间（秒），超时抛出ToolTimeoutError
+            max_concurrency: 同时执行的最大调用数
+            executor: 执行方式，"inline"（调用线程）、"thread"（线程池）
+                或 "process"（进程池，用于CPU密集型工具，函数须定义在模块顶层）
         """
+        policy = ExecutionPolicy(timeout=timeout, max_concurrency=max_concurrency, executor=executor)
+        
         def decorator(func: Callable) -> Callable:
             # 获取工具名称
             tool_name = name or func.__name__
@@ -144,7 +195,8 @@ class ToolRegistry:
                     type=param_type,
                     description=param_desc,
                     required=(param.default == inspect.Parameter.empty),
-                    default=param.default if param.default != inspect.Parameter.empty else None
+                    default=param.default if param.default != inspect.Parameter.empty else None,
+                    choices=(choices or {}).get(param_name)
                 )
                 parameters.append(param_schema)
             
@@ -159,17 +211,26 @@ class ToolRegistry:
                 category=category,
                 parameters=parameters,
                 return_type=return_type,
-                return_description=return_description
+                return_description=return_description,
+                cache=make_tool_cache(cache),
+                policy=policy
             )
             
             # 注册工具
             self._tools[tool_name] = tool
-            self._categories[category].append(tool_name)
+            if tool_name not in self._categories[category]:
+                self._categories[category].append(tool_name)
+            self._version += 1
             
-            # 保留原始函数
-            @functools.wraps(func)
-            def wrapper(*args, **kwargs):
-                return func(*args, **kwargs)
+            # 保留原始函数（异步工具的包装器也是异步函数）
+            if tool.is_async:
+                @functools.wraps(func)
+                async def wrapper(*args, **kwargs):
+                    return await func(*args, **kwargs)
+            else:
+                @functools.wraps(func)
+                def wrapper(*args, **kwargs):
+                    return func(*args, **kwargs)
             
             # 添加工具属性
             wrapper.tool = tool
@@ -178,42 +239,198 @@ class ToolRegistry:
         
         return decorator
     
+    def register_batch(self, tool_name: str) -> Callable:
+        """
+        为已注册的工具提供批量（向量化）实现的装饰器
+        
+        批量实现接收校验后的参数字典列表，按相同顺序返回结果列表（某个调用失败时在对应位置返回异常）；
+        execute_many 中同一工具有多个调用时会用它一次算完。
+        
+        Args:
+            tool_name: 工具名称
+        """
+        def decorator(func: Callable) -> Callable:
+            tool = self.get_tool(tool_name)
+            if not tool:
+                raise ValueError(f"工具 '{tool_name}' 不存在")
+            tool.batch_function = func
+            return func
+        
+        return decorator
+    
     def get_tool(self, name: str) -> Optional[Tool]:
         """获取工具"""
         return self._tools.get(name)
     
     def list_tools(self) -> List[Dict[str, Any]]:
-        """列出所有工具"""
-        return [tool.get_schema() for tool in self._tools.values()]
+        """列出所有工具（schema按注册表版本缓存，请勿修改返回的字典）"""
+        return list(self._cached("list_tools", lambda: [tool.get_schema() for tool in self._tools.values()]))
     
     def list_tools_by_category(self, category: ToolCategory) -> List[Dict[str, Any]]:
         """按分类列出工具"""
-        tool_names = self._categories.get(category, [])
-        return [
-            self._tools[name].get_schema() 
-            for name in tool_names 
-            if name in self._tools
-        ]
+        def build():
+            tool_names = self._categories.get(category, [])
+            return [
+                self._tools[name].get_schema() 
+                for name in tool_names 
+                if name in self._tools
+            ]
+        return list(self._cached(("category", category), build))
     
-    def execute(self, tool_name: str, **kwargs) -> Any:
-        """执行工具"""
+    def function_schemas(self, names: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """
+        获取OpenAI/Ollama函数调用格式的工具schema
+        
+        Args:
+            names: 只返回这些工具，默认返回全部
+        """
+        by_name = self._cached(
+            "function_schemas",
+            lambda: {name: tool.to_function_schema() for name, tool in self._tools.items()},
+        )
+        if names is None:
+            return list(by_name.values())
+        return [by_name[name] for name in names if name in by_name]
+    
+    def function_schemas_json(self) -> bytes:
+        """预先序列化好的全部工具schema（UTF-8 JSON），可直接放进请求体"""
+        return self._cached(
+            "function_schemas_json",
+            lambda: json.dumps(self.function_schemas(), ensure_ascii=False, separators=(",", ":")).encode("utf-8"),
+        )
+    
+    def _prepare(self, tool_name: str, kwargs: Dict[str, Any]) -> Tuple[Tool, Dict[str, Any], Optional[str]]:
+        """查找工具并校验参数，返回 (工具, 转换后的参数, 缓存键)"""
         tool = self.get_tool(tool_name)
         if not tool:
             raise ValueError(f"工具 '{tool_name}' 不存在")
         
-        if not tool.validate_arguments(**kwargs):
-            raise ValueError(f"工具 '{tool_name}' 参数验证失败")
+        # 使用预编译的校验器，并用转换后的参数调用工具
+        kwargs = tool.coerce_arguments(kwargs)
+        key = ToolCache.make_key(tool.name, tool.parameters, kwargs) if tool.cache is not None else None
+        return tool, kwargs, key
+    
+    def execute(self, tool_name: str, **kwargs) -> Any:
+        """
+        执行工具
         
-        try:
-            return tool(**kwargs)
-        except Exception as e:
-            raise RuntimeError(f"执行工具 '{tool_name}' 时出错: {e}")
+        Raises:
+            ValueError: 工具不存在
+            ToolValidationError: 参数校验失败
+            ToolTimeoutError / ToolCancelledError / ToolExecutionError: 执行超时、被取消或出错
+        """
+        tool, kwargs, key = self._prepare(tool_name, kwargs)
+        
+        # 确定性工具先查结果缓存（所有会话共享）
+        if key is not None:
+            hit, result = tool.cache.get(key)
+            if hit:
+                return result
+        
+        # 按工具的执行策略调用（超时/取消/出错时抛出对应的ToolExecutionError）
+        result = tool.runner(kwargs)
+        
+        if key is not None:
+            tool.cache.set(key, result)
+        return result
+    
+    async def aexecute(self, tool_name: str, **kwargs) -> Any:
+        """
+        异步执行工具
+        
+        异步工具直接在当前事件循环中执行；同步工具交给有界线程池（或进程池），不阻塞事件循环。
+        """
+        tool, kwargs, key = self._prepare(tool_name, kwargs)
+        
+        if key is not None:
+            hit, result = tool.cache.get(key)
+            if hit:
+                return result
+        
+        result = await tool.runner.acall(kwargs)
+        
+        if key is not None:
+            tool.cache.set(key, result)
+        return result
+    
+    def execute_many(self,
+                     calls: Sequence[Call],
+                     max_workers: Optional[int] = None,
+                     return_exceptions: bool = True) -> List[Any]:
+        """
+        批量执行工具调用，结果按输入顺序返回
+        
+        先校验全部调用，再对相同工具名+等价参数的调用去重；有批量实现的工具一次算完，
+        其余调用在线程池中并发执行。
+        
+        Args:
+            calls: [(工具名, 参数字典), ...] 或 [{"name": 工具名, "args": 参数字典}, ...]
+            max_workers: 最大并发数，默认读取环境变量 TOOL_BATCH_WORKERS（8）
+            return_exceptions: True时出错的调用在对应位置返回异常对象；
+                False时有参数错误则不执行任何调用，直接抛出第一个错误
+        """
+        plan = BatchPlan.build(self, calls)
+        if not return_exceptions and plan.first_error() is not None:
+            raise plan.first_error()
+        
+        groups = plan.groups()
+        workers = max_workers or int(os.getenv('TOOL_BATCH_WORKERS', 8))
+        if len(groups) <= 1 or workers <= 1:
+            for group in groups:
+                plan.record(group, run_group(group))
+        else:
+            from concurrent.futures import ThreadPoolExecutor
+            with ThreadPoolExecutor(max_workers=min(workers, len(groups)), thread_name_prefix="tool-batch") as pool:
+                for group, results in zip(groups, pool.map(run_group, groups)):
+                    plan.record(group, results)
+        return plan.collect(return_exceptions)
+    
+    async def aexecute_many(self,
+                            calls: Sequence[Call],
+                            max_concurrency: Optional[int] = None,
+                            return_exceptions: bool = True) -> List[Any]:
+        """
+        并发执行多个工具调用（异步版本），校验、去重与批量实现同 execute_many
+        
+        Args:
+            calls: [(工具名, 参数字典), ...] 或 [{"name": 工具名, "args": 参数字典}, ...]
+            max_concurrency: 同时执行的最大调用组数，None表示不限制
+            return_exceptions: True时出错的调用在对应位置返回异常对象，False时抛出第一个错误
+        """
+        import asyncio
+        plan = BatchPlan.build(self, calls)
+        if not return_exceptions and plan.first_error() is not None:
+            raise plan.first_error()
+        
+        semaphore = asyncio.Semaphore(max_concurrency) if max_concurrency else None
+        
+        async def run(group):
+            if semaphore is None:
+                return await arun_group(group)
+            async with semaphore:
+                return await arun_group(group)
+        
+        groups = plan.groups()
+        for group, results in zip(groups, await asyncio.gather(*(run(g) for g in groups))):
+            plan.record(group, results)
+        return plan.collect(return_exceptions)
+    
+    def cache_stats(self) -> Dict[str, Dict[str, Any]]:
+        """各个启用了缓存的工具的命中统计"""
+        return {name: tool.cache.stats() for name, tool in self._tools.items() if tool.cache is not None}
+    
+    def clear_cache(self):
+        """清空所有工具的结果缓存"""
+        for tool in self._tools.values():
+            if tool.cache is not None:
+                tool.cache.clear()
     
     def clear(self):
         """清空注册表"""
         self._tools.clear()
         for category in self._categories:
             self._categories[category].clear()
+        self._version += 1
 
 
 # 创建全局工具注册表实例
@@ -222,6 +439,7 @@ tool_registry = ToolRegistry()
 
 # 方便的装饰器别名
 register_tool = tool_registry.register
+register_batch = tool_registry.register_batch
 
 
 def test_tool_registry():
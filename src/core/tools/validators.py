@@ -0,0 +1,290 @@
+"""
+工具参数校验器
+
+在注册工具时根据参数模式预编译校验/转换函数，调用时只做一次线性遍历，
+不再每次反射类型。
+"""
+
+import enum
+import types
+import typing
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union, get_args, get_origin
+
+
+_MISSING = object()
+
+
+class ToolValidationError(ValueError):
+    """工具参数校验失败（包含结构化的错误列表）"""
+
+    def __init__(self, tool_name: str, errors: List[Dict[str, Any]]):
+        self.tool_name = tool_name
+        self.errors = errors
+        detail = "; ".join(f"{e['param']}: {e['message']}" for e in errors)
+        super().__init__(f"工具 '{tool_name}' 参数验证失败: {detail}")
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为可返回给模型的结构化错误"""
+        return {"error": "validation_error", "tool": self.tool_name, "details": self.errors}
+
+
+class _CoercionError(Exception):
+    """单个值转换失败（内部使用）"""
+
+    def __init__(self, code: str, message: str):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+
+
+Coercer = Callable[[Any], Any]
+
+
+def _coerce_str(value: Any) -> str:
+    if isinstance(value, str):
+        return value
+    if isinstance(value, (int, float, bool)):
+        return str(value)
+    raise _CoercionError("type_error", f"应为字符串，实际为 {type(value).__name__}")
+
+
+def _coerce_int(value: Any) -> int:
+    if type(value) is int:
+        return value
+    if isinstance(value, bool):
+        raise _CoercionError("type_error", "应为整数，实际为布尔值")
+    if isinstance(value, float):
+        if value.is_integer():
+            return int(value)
+        raise _CoercionError("type_error", f"应为整数，实际为 {value}")
+    if isinstance(value, str):
+        try:
+            return int(value.strip())
+        except ValueError:
+            pass
+    raise _CoercionError("type_error", f"应为整数，实际为 {value!r}")
+
+
+def _coerce_float(value: Any) -> float:
+    if type(value) is float:
+        return value
+    if isinstance(value, bool):
+        raise _CoercionError("type_error", "应为数字，实际为布尔值")
+    if isinstance(value, int):
+        return float(value)
+    if isinstance(value, str):
+        try:
+            return float(value.strip())
+        except ValueError:
+            pass
+    raise _CoercionError("type_error", f"应为数字，实际为 {value!r}")
+
+
+_TRUE_STRINGS = {"true", "1", "yes", "y", "是"}
+_FALSE_STRINGS = {"false", "0", "no", "n", "否"}
+
+
+def _coerce_bool(value: Any) -> bool:
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, int) and value in (0, 1):
+        return bool(value)
+    if isinstance(value, str):
+        lowered = value.strip().lower()
+        if lowered in _TRUE_STRINGS:
+            return True
+        if lowered in _FALSE_STRINGS:
+            return False
+    raise _CoercionError("type_error", f"应为布尔值，实际为 {value!r}")
+
+
+_SCALAR_COERCERS: Dict[type, Coercer] = {
+    str: _coerce_str,
+    int: _coerce_int,
+    float: _coerce_float,
+    bool: _coerce_bool,
+}
+
+
+def _choices_coercer(choices: Tuple[Any, ...], convert: Optional[Callable[[Any], Any]] = None) -> Coercer:
+    """枚举类取值（Literal或Enum）"""
+    allowed = {c: c for c in choices}
+    # 允许按字符串形式匹配（例如模型把 3 传成 "3"）
+    by_str = {str(c): c for c in choices}
+
+    def coerce(value: Any) -> Any:
+        if isinstance(value, enum.Enum):
+            value = value.value
+        try:
+            if value in allowed:
+                result = allowed[value]
+                return convert(result) if convert else result
+        except TypeError:
+            pass
+        if str(value) in by_str:
+            result = by_str[str(value)]
+            return convert(result) if convert else result
+        raise _CoercionError("invalid_choice", f"取值应为 {list(choices)} 之一，实际为 {value!r}")
+
+    return coerce
+
+
+def _list_coercer(item: Coercer) -> Coercer:
+    def coerce(value: Any) -> List[Any]:
+        if isinstance(value, (str, bytes, dict)) or not hasattr(value, "__iter__"):
+            raise _CoercionError("type_error", f"应为列表，实际为 {type(value).__name__}")
+        result = []
+        for i, v in enumerate(value):
+            try:
+                result.append(item(v))
+            except _CoercionError as e:
+                raise _CoercionError(e.code, f"第{i}项{e.message}")
+        return result
+
+    return coerce
+
+
+def _dict_coercer(key: Coercer, val: Coercer) -> Coercer:
+    def coerce(value: Any) -> Dict[Any, Any]:
+        if not isinstance(value, dict):
+            raise _CoercionError("type_error", f"应为字典，实际为 {type(value).__name__}")
+        result = {}
+        for k, v in value.items():
+            try:
+                result[key(k)] = val(v)
+            except _CoercionError as e:
+                raise _CoercionError(e.code, f"键 {k!r} {e.message}")
+        return result
+
+    return coerce
+
+
+def _isinstance_coercer(expected: type) -> Coercer:
+    def coerce(value: Any) -> Any:
+        if isinstance(value, expected):
+            return value
+        raise _CoercionError("type_error", f"应为 {expected.__name__}，实际为 {type(value).__name__}")
+
+    return coerce
+
+
+def _passthrough(value: Any) -> Any:
+    return value
+
+
+def compile_type(tp: Any) -> Tuple[Coercer, bool]:
+    """
+    把类型注解编译成转换函数
+
+    Returns:
+        (转换函数, 是否允许None)
+    """
+    if tp is Any or tp is None or tp is type(None):
+        return _passthrough, True
+
+    origin = get_origin(tp)
+    args = get_args(tp)
+
+    if origin is Union or origin is types.UnionType:
+        non_none = [a for a in args if a is not type(None)]
+        nullable = len(non_none) < len(args)
+        if len(non_none) == 1:
+            coercer, _ = compile_type(non_none[0])
+            return coercer, nullable
+        # 多类型联合：依次尝试
+        coercers = [compile_type(a)[0] for a in non_none]
+
+        def coerce_union(value: Any) -> Any:
+            for c in coercers:
+                try:
+                    return c(value)
+                except _CoercionError:
+                    continue
+            raise _CoercionError("type_error", f"不符合类型 {tp}")
+
+        return coerce_union, nullable
+
+    if origin is typing.Literal:
+        return _choices_coercer(args), type(None) in args or None in args
+
+    if origin in (list, List, tuple, set, frozenset):
+        item = compile_type(args[0])[0] if args else _passthrough
+        return _list_coercer(item), False
+
+    if origin in (dict, Dict):
+        key = compile_type(args[0])[0] if args else _passthrough
+        val = compile_type(args[1])[0] if len(args) > 1 else _passthrough
+        return _dict_coercer(key, val), False
+
+    if isinstance(tp, type) and issubclass(tp, enum.Enum):
+        return _choices_coercer(tuple(m.value for m in tp), convert=tp), False
+
+    if tp in _SCALAR_COERCERS:
+        return _SCALAR_COERCERS[tp], False
+    if tp is list:
+        return _list_coercer(_passthrough), False
+    if tp is dict:
+        return _dict_coercer(_passthrough, _passthrough), False
+    if isinstance(tp, type):
+        return _isinstance_coercer(tp), False
+    return _passthrough, True
+
+
+def compile_validator(tool_name: str, parameters: List[Any]) -> Callable[[Dict[str, Any]], Dict[str, Any]]:
+    """
+    根据参数模式列表预编译校验/转换函数
+
+    Args:
+        tool_name: 工具名称（用于错误信息）
+        parameters: ParameterSchema列表
+
+    Returns:
+        validate(kwargs) -> 转换后的kwargs，失败时抛出ToolValidationError
+    """
+    compiled = []
+    for param in parameters:
+        coercer, nullable = compile_type(param.type)
+        choices = getattr(param, "choices", None)
+        if choices:
+            choice_coercer = _choices_coercer(tuple(choices))
+            # 列表参数的可选值约束每一项
+            each_choice = _list_coercer(choice_coercer)
+            base = coercer
+
+            def coercer(value, _base=base, _choices=choice_coercer, _each=each_choice):
+                value = _base(value)
+                return _each(value) if isinstance(value, list) else _choices(value)
+        # 默认值为None的参数也允许显式传None
+        nullable = nullable or (not param.required and param.default is None)
+        compiled.append((param.name, param.required, nullable, coercer))
+    known = {name for name, _, _, _ in compiled}
+
+    def validate(kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        result: Dict[str, Any] = {}
+        errors: List[Dict[str, Any]] = []
+        for name, required, nullable, coercer in compiled:
+            value = kwargs.get(name, _MISSING)
+            if value is _MISSING:
+                if required:
+                    errors.append({"param": name, "code": "missing", "message": "缺少必需参数"})
+                continue
+            if value is None:
+                if nullable:
+                    result[name] = None
+                else:
+                    errors.append({"param": name, "code": "null", "message": "不能为空"})
+                continue
+            try:
+                result[name] = coercer(value)
+            except _CoercionError as e:
+                errors.append({"param": name, "code": e.code, "message": e.message})
+
+        for name in kwargs:
+            if name not in known:
+                errors.append({"param": name, "code": "unexpected", "message": "未知参数"})
+
+        if errors:
+            raise ToolValidationError(tool_name, errors)
+        return result
+
+    return validate
@@ -0,0 +1,24 @@
+"""
+目的地知识检索（RAG）：语料分块、向量化、磁盘向量索引、BM25倒排索引、增量导入与检索
+"""
+
+import importlib
+
+_EXPORTS = {
+    "Chunk": ".chunking", "chunk_text": ".chunking", "load_corpus": ".chunking",
+    "Embedder": ".embedders", "HashingEmbedder": ".embedders", "LangChainEmbedder": ".embedders",
+    "get_embedder": ".embedders",
+    "VectorIndex": ".vector_index", "IndexMismatchError": ".vector_index",
+    "BM25Index": ".bm25",
+    "Ingestor": ".ingest", "IngestReport": ".ingest",
+    "Retriever": ".retriever", "build_index": ".retriever", "format_passages": ".retriever",
+    "reciprocal_rank_fusion": ".retriever", "get_retriever": ".retriever",
+}
+
+
+def __getattr__(name):
+    # 按需导入子模块，`python -m src.rag.ingest` 不会被包初始化提前导入
+    if name in _EXPORTS:
+        module = importlib.import_module(_EXPORTS[name], __name__)
+        return getattr(module, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,176 @@
+"""
+BM25倒排索引：中文按字符n-gram切分，倒排表以CSR数组紧凑存放
+"""
+
+import hashlib
+import re
+from functools import lru_cache
+from typing import Any, Optional, Sequence, Tuple
+
+from src.rag.embedders import _numpy
+
+
+# 中日韩字符（按字符n-gram切分），其余连续的字母数字按整词切分
+_CJK_RANGES = ((0x3040, 0x30FF), (0x3400, 0x4DBF), (0x4E00, 0x9FFF), (0xAC00, 0xD7AF), (0xF900, 0xFAFF))
+_CJK_CLASS = "".join(f"\\u{lo:04x}-\\u{hi:04x}" for lo, hi in _CJK_RANGES)
+_WORD = re.compile(f"[^\\W_{_CJK_CLASS}]+")
+
+# 词项键：n-gram为码位的 _CODE_SPACE 进制组合（n≤3，不同n的取值范围互不重叠），
+# 整词为64位哈希并置第62位，与n-gram不冲突
+_CODE_SPACE = 0x110000
+_WORD_FLAG = 1 << 62
+_MAX_NGRAM = 3
+
+
+@lru_cache(maxsize=65536)
+def _word_key(word: str) -> int:
+    digest = int.from_bytes(hashlib.blake2b(word.encode("utf-8"), digest_size=8).digest(), "little")
+    return (digest & (_WORD_FLAG - 1)) | _WORD_FLAG
+
+
+def tokenize_keys(texts: Sequence[str], ngram_range: Tuple[int, int] = (1, 2)) -> Tuple[Any, Any]:
+    """
+    把一批文本切分为整数词项键
+
+    所有文本拼接成一个码位数组，中日韩字符的n-gram用数组运算一次算出（不会跨越文本边界），
+    英文和数字按整词哈希。
+
+    Returns:
+        (keys, doc_ids)：int64词项键及其所属文本的下标
+    """
+    np = _numpy()
+    low, high = ngram_range
+    if not 1 <= low <= high <= _MAX_NGRAM:
+        raise ValueError(f"ngram_range应在1-{_MAX_NGRAM}之间")
+    lowered = [text.lower() for text in texts]
+    lengths = np.fromiter((len(t) + 1 for t in lowered), dtype=np.intp, count=len(lowered))
+    # 用换行分隔文本，换行不是中日韩字符，n-gram不会跨越文本
+    codes = np.frombuffer("\n".join(lowered).encode("utf-32-le"), dtype=np.uint32).astype(np.int64)
+    owners = np.repeat(np.arange(len(lowered), dtype=np.int32), lengths)[:len(codes)]
+
+    cjk = np.zeros(len(codes), dtype=bool)
+    for lo, hi in _CJK_RANGES:
+        cjk |= (codes >= lo) & (codes <= hi)
+
+    keys, docs = [], []
+    for n in range(low, high + 1):
+        count = len(codes) - n + 1
+        if count <= 0:
+            break
+        key = codes[:count].copy()
+        valid = cjk[:count].copy()
+        for k in range(1, n):
+            key = key * _CODE_SPACE + codes[k:k + count]
+            valid &= cjk[k:k + count]
+        keys.append(key[valid])
+        docs.append(owners[:count][valid])
+
+    words = [(_word_key(w), i) for i, text in enumerate(lowered) for w in _WORD.findall(text)]
+    if words:
+        keys.append(np.fromiter((k for k, _ in words), dtype=np.int64, count=len(words)))
+        docs.append(np.fromiter((i for _, i in words), dtype=np.int32, count=len(words)))
+    if not keys:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int32)
+    return np.concatenate(keys), np.concatenate(docs)
+
+
+class BM25Index:
+    """BM25倒排索引
+
+    - 词表：排好序的int64词项键数组，查询时用二分查找定位词项
+    - 倒排表（CSR）：indptr[t]:indptr[t+1] 是词项t的文档号（int32）和词频（uint16）
+    - 每个文档的长度归一化项 k1·(1-b+b·len/avgdl) 预先算好，检索时只做数组加法
+    整个索引由几个numpy数组组成，不为每个词项或文档创建Python对象。
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75, ngram_range: Tuple[int, int] = (1, 2)):
+        np = _numpy()
+        self.k1 = k1
+        self.b = b
+        self.ngram_range = ngram_range
+        self.vocab = np.empty(0, dtype=np.int64)
+        self.indptr = np.zeros(1, dtype=np.int64)
+        self.postings = np.empty(0, dtype=np.int32)
+        self.frequencies = np.empty(0, dtype=np.uint16)
+        self.idf = np.empty(0, dtype=np.float32)
+        self.doc_lengths = np.empty(0, dtype=np.int32)
+        self._norms = np.empty(0, dtype=np.float32)
+
+    @classmethod
+    def build(cls, texts: Sequence[str], **kwargs) -> "BM25Index":
+        """对一批文本建立索引，文档号即文本在序列中的下标"""
+        np = _numpy()
+        index = cls(**kwargs)
+        n = len(texts)
+        keys, docs = tokenize_keys(texts, index.ngram_range)
+
+        vocab, term_ids = np.unique(keys, return_inverse=True)
+        pairs, counts = np.unique(term_ids.astype(np.int64) * max(n, 1) + docs, return_counts=True)
+        terms = pairs // max(n, 1)
+
+        index.vocab = vocab
+        index.indptr = np.concatenate([[0], np.cumsum(np.bincount(terms, minlength=len(vocab)))]).astype(np.int64)
+        index.postings = (pairs % max(n, 1)).astype(np.int32)
+        index.frequencies = np.minimum(counts, np.iinfo(np.uint16).max).astype(np.uint16)
+        index.doc_lengths = np.bincount(docs, minlength=n).astype(np.int32)
+
+        df = np.diff(index.indptr).astype(np.float64)
+        index.idf = np.log1p((n - df + 0.5) / (df + 0.5)).astype(np.float32)
+        avgdl = index.doc_lengths.mean() if n else 0.0
+        index._norms = (index.k1 * (1 - index.b + index.b * index.doc_lengths / (avgdl or 1.0))).astype(np.float32)
+        return index
+
+    def __len__(self) -> int:
+        return len(self.doc_lengths)
+
+    @property
+    def nbytes(self) -> int:
+        """索引数组占用的字节数"""
+        return sum(a.nbytes for a in (self.vocab, self.indptr, self.postings, self.frequencies,
+                                      self.idf, self.doc_lengths, self._norms))
+
+    def scores(self, query: str) -> Any:
+        """查询对全部文档的BM25得分（float32数组）"""
+        np = _numpy()
+        n = len(self)
+        keys, _ = tokenize_keys([query], self.ngram_range)
+        keys = np.unique(keys)
+        positions = np.searchsorted(self.vocab, keys)
+        found = positions < len(self.vocab)
+        found[found] = self.vocab[positions[found]] == keys[found]
+        terms = positions[found]
+        if not len(terms):
+            return np.zeros(n, dtype=np.float32)
+
+        starts, ends = self.indptr[terms], self.indptr[terms + 1]
+        spans = np.concatenate([np.arange(s, e) for s, e in zip(starts.tolist(), ends.tolist())])
+        docs = self.postings[spans]
+        tf = self.frequencies[spans].astype(np.float32)
+        weights = np.repeat(self.idf[terms], ends - starts)
+        contributions = weights * tf * (self.k1 + 1) / (tf + self._norms[docs])
+        return np.bincount(docs, weights=contributions, minlength=n).astype(np.float32)
+
+    def search(self, query: str, k: int = 5, alive: Optional[Any] = None) -> Tuple[Any, Any]:
+        """
+        top-k检索
+
+        Args:
+            query: 查询文本
+            k: 返回的结果数
+            alive: 布尔数组，False的文档（已删除）不返回
+
+        Returns:
+            (indices, scores)，只包含得分大于0的文档，按得分降序
+        """
+        np = _numpy()
+        if k <= 0:
+            return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.float32)
+        scores = self.scores(query)
+        if alive is not None:
+            scores[~alive] = 0
+        candidates = np.flatnonzero(scores > 0)
+        if len(candidates) > k:
+            candidates = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+        order = np.argsort(-scores[candidates], kind="stable")
+        candidates = candidates[order]
+        return candidates, scores[candidates]
@@ -0,0 +1,142 @@
+"""
+目的地指南语料的读取与分块
+"""
+
+import hashlib
+import os
+import re
+from dataclasses import dataclass
+from itertools import groupby
+from operator import itemgetter
+from typing import Iterable, Iterator, List, Tuple
+
+
+CORPUS_EXTENSIONS = (".md", ".txt")
+
+# 句末标点之后或换行处断句
+_SENTENCE_END = re.compile(r"(?<=[。！？!?；;])|\n")
+_HEADING = re.compile(r"^(#{1,6})\s+(.*)$")
+
+
+@dataclass(frozen=True)
+class Chunk:
+    """语料中的一个片段"""
+    chunk_id: str   # "来源#序号"
+    source: str     # 来源文件（相对语料目录）
+    heading: str    # 所在章节，如 "东京旅行指南 > 交通"
+    text: str
+
+    @property
+    def passage(self) -> str:
+        """带章节标题的完整片段，用于向量化和注入上下文"""
+        return f"{self.heading}\n{self.text}" if self.heading else self.text
+
+    @property
+    def content_hash(self) -> str:
+        """片段内容（含章节标题）的SHA-256，用于去重和增量更新"""
+        return hashlib.sha256(self.passage.encode("utf-8")).hexdigest()
+
+    def to_dict(self) -> dict:
+        return {"chunk_id": self.chunk_id, "source": self.source, "heading": self.heading, "text": self.text}
+
+
+def split_sentences(text: str) -> List[str]:
+    """按中英文句末标点和换行断句，丢弃空白句"""
+    return [s.strip() for s in _SENTENCE_END.split(text) if s and s.strip()]
+
+
+def _pack(sentences: Iterable[str], max_chars: int, overlap: int) -> Iterator[str]:
+    """把句子贪心地装进不超过max_chars的片段，相邻片段重叠末尾不超过overlap个字符的句子"""
+    current: List[str] = []
+    size = 0
+    for sentence in sentences:
+        # 超长句子按字符硬切
+        while len(sentence) > max_chars:
+            head, sentence = sentence[:max_chars], sentence[max_chars:]
+            if current:
+                yield "".join(current)
+            yield head
+            current, size = [], 0
+        if current and size + len(sentence) > max_chars:
+            yield "".join(current)
+            carry: List[str] = []
+            carried = 0
+            for previous in reversed(current):
+                if carried + len(previous) > overlap:
+                    break
+                carry.insert(0, previous)
+                carried += len(previous)
+            current, size = carry, carried
+        current.append(sentence)
+        size += len(sentence)
+    if current:
+        yield "".join(current)
+
+
+def iter_sentences(lines: Iterable[str]) -> Iterator[Tuple[str, str]]:
+    """
+    逐行读取Markdown/纯文本，按标题维护章节路径并断句
+
+    Yields:
+        (章节路径, 句子)，章节路径形如 "东京旅行指南 > 交通"
+    """
+    path: List[str] = []
+    for line in lines:
+        match = _HEADING.match(line.strip())
+        if match:
+            level = len(match.group(1))
+            path = path[:level - 1] + [match.group(2).strip()]
+            continue
+        heading = " > ".join(path)
+        for sentence in split_sentences(line):
+            yield heading, sentence
+
+
+def iter_chunks(lines: Iterable[str], source: str = "", max_chars: int = 300, overlap: int = 60) -> Iterator[Chunk]:
+    """
+    流式分块：逐行读入，章节内按句子装箱，不跨章节；内存占用只与单个片段大小有关
+
+    Args:
+        lines: 文档的行（可以是打开的文件对象）
+        source: 来源名称，用于生成片段ID
+        max_chars: 每个片段的最大字符数（不含章节标题）
+        overlap: 相邻片段重叠的最大字符数
+    """
+    if max_chars <= 0 or overlap < 0:
+        raise ValueError("max_chars必须为正数，overlap不能为负数")
+    ordinal = 0
+    for heading, group in groupby(iter_sentences(lines), key=itemgetter(0)):
+        for piece in _pack((sentence for _, sentence in group), max_chars, overlap):
+            yield Chunk(f"{source}#{ordinal}", source, heading, piece)
+            ordinal += 1
+
+
+def chunk_text(text: str, source: str = "", max_chars: int = 300, overlap: int = 60) -> List[Chunk]:
+    """把一篇文档切成片段（iter_chunks 的列表版本）"""
+    return list(iter_chunks(text.splitlines(), source, max_chars, overlap))
+
+
+def iter_corpus_files(corpus_dir: str) -> Iterator[str]:
+    """按文件名顺序遍历语料目录（含子目录）中的文本文件"""
+    for root, dirs, files in os.walk(corpus_dir):
+        dirs.sort()
+        for name in sorted(files):
+            if name.endswith(CORPUS_EXTENSIONS):
+                yield os.path.join(root, name)
+
+
+def source_name(path: str, corpus_dir: str) -> str:
+    """文件相对语料目录的路径（统一使用/分隔）"""
+    return os.path.relpath(path, corpus_dir).replace(os.sep, "/")
+
+
+def iter_corpus_chunks(corpus_dir: str, max_chars: int = 300, overlap: int = 60) -> Iterator[Chunk]:
+    """逐个文件、逐行读取语料目录并流式分块"""
+    for path in iter_corpus_files(corpus_dir):
+        with open(path, encoding="utf-8") as f:
+            yield from iter_chunks(f, source_name(path, corpus_dir), max_chars, overlap)
+
+
+def load_corpus(corpus_dir: str, max_chars: int = 300, overlap: int = 60) -> List[Chunk]:
+    """读取语料目录下的全部文档并分块"""
+    return list(iter_corpus_chunks(corpus_dir, max_chars, overlap))
@@ -0,0 +1,149 @@
+"""
+文本向量化：可替换的Embedder接口与离线的哈希向量器
+"""
+
+import os
+import re
+from typing import Any, Optional, Sequence, Tuple
+
+
+# 非字母数字字符（标点、空白）统一替换为空格，n-gram不跨越它们
+_NON_WORD = re.compile(r"[^\w]+")
+
+# 64位乘法哈希的常数（splitmix64）
+_MIX_1 = 0xBF58476D1CE4E5B9
+_MIX_2 = 0x94D049BB133111EB
+_GOLDEN = 0x9E3779B97F4A7C15
+_MASK = (1 << 64) - 1
+
+
+class Embedder:
+    """向量化接口
+
+    子类实现 embed_batch，返回形状为 (len(texts), dim)、逐行L2归一化的float32数组；
+    name 写入索引元数据，打开索引时用于检查向量是否由同一个向量器生成。
+    """
+
+    name: str = "embedder"
+    dim: int = 0
+
+    def embed_batch(self, texts: Sequence[str]) -> Any:
+        raise NotImplementedError
+
+    def embed(self, text: str) -> Any:
+        """单条文本的向量（一维数组）"""
+        return self.embed_batch([text])[0]
+
+
+class HashingEmbedder(Embedder):
+    """确定性的本地哈希向量器（无需模型和网络）
+
+    文本按字符n-gram（默认1-2元，适合中文；英文按词内字符切分）提取特征，
+    用固定的64位哈希映射到dim个桶并带±1符号（哈希技巧），n元特征按n²加权，
+    词频取 sign·log(1+|x|) 后做L2归一化，相同输入在任何进程中得到相同向量。
+    全部计算在numpy数组上完成，不逐个n-gram调用Python函数。
+    """
+
+    def __init__(self, dim: int = 512, ngram_range: tuple = (1, 2)):
+        """
+        Args:
+            dim: 向量维度（哈希桶数）
+            ngram_range: 字符n-gram的最小和最大长度
+        """
+        low, high = ngram_range
+        if dim <= 0 or low < 1 or high < low:
+            raise ValueError("dim必须为正数，ngram_range应为 (最小长度, 最大长度)")
+        self.dim = dim
+        self.ngram_range = (low, high)
+        self.name = f"hashing-{dim}-{low}{high}"
+
+    def _features(self, text: str) -> Tuple[Any, Any]:
+        """文本 -> (全部n-gram的64位哈希值, 权重)，n元特征的权重为n²，单字的区分度最低"""
+        np = _numpy()
+        normalized = _NON_WORD.sub(" ", text.lower())
+        codes = np.frombuffer(normalized.encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+        is_space = codes == ord(" ")
+        hashes, weights = [], []
+        for n in range(self.ngram_range[0], self.ngram_range[1] + 1):
+            count = len(codes) - n + 1
+            if count <= 0:
+                break
+            h = np.full(count, (n * _GOLDEN) & _MASK, dtype=np.uint64)
+            valid = np.ones(count, dtype=bool)
+            for k in range(n):
+                h = (h ^ codes[k:k + count]) * np.uint64(_MIX_1)
+                valid &= ~is_space[k:k + count]
+            h = h[valid]
+            hashes.append(h)
+            weights.append(np.full(len(h), float(n * n)))
+        if not hashes:
+            return np.empty(0, dtype=np.uint64), np.empty(0)
+        h = np.concatenate(hashes)
+        h ^= h >> np.uint64(31)
+        h *= np.uint64(_MIX_2)
+        h ^= h >> np.uint64(29)
+        return h, np.concatenate(weights)
+
+    def embed_batch(self, texts: Sequence[str]) -> Any:
+        np = _numpy()
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        dim = np.uint64(self.dim)
+        for i, text in enumerate(texts):
+            h, weights = self._features(text)
+            if not len(h):
+                continue
+            buckets = (h % dim).astype(np.intp)
+            signed = np.where(h >> np.uint64(63), -weights, weights)
+            counts = np.bincount(buckets, weights=signed, minlength=self.dim)
+            row = np.sign(counts) * np.log1p(np.abs(counts))
+            norm = np.linalg.norm(row)
+            if norm > 0:
+                out[i] = row / norm
+        return out
+
+
+class LangChainEmbedder(Embedder):
+    """包装LangChain的Embeddings对象（如OpenAIEmbeddings），结果转换为归一化的float32数组"""
+
+    def __init__(self, embeddings: Any, name: Optional[str] = None, dim: Optional[int] = None):
+        self.embeddings = embeddings
+        self.name = name or f"langchain-{type(embeddings).__name__}"
+        self.dim = dim or 0
+
+    def embed_batch(self, texts: Sequence[str]) -> Any:
+        np = _numpy()
+        vectors = np.asarray(self.embeddings.embed_documents(list(texts)), dtype=np.float32)
+        if vectors.ndim != 2:
+            vectors = vectors.reshape(len(texts), -1)
+        if not self.dim:
+            self.dim = vectors.shape[1]
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.where(norms > 0, norms, 1.0)
+
+
+def get_embedder(name: Optional[str] = None) -> Embedder:
+    """
+    按名称创建向量器
+
+    Args:
+        name: "hashing"（默认，读取环境变量 RAG_EMBEDDER）或 "openai"
+    """
+    name = (name or os.getenv('RAG_EMBEDDER') or "hashing").lower()
+    if name == "hashing":
+        return HashingEmbedder(dim=int(os.getenv('RAG_EMBEDDING_DIM', 512)))
+    if name == "openai":
+        try:
+            from langchain_openai import OpenAIEmbeddings
+        except ImportError:
+            raise ImportError("请安装langchain-openai包: pip install langchain-openai")
+        model = os.getenv('RAG_EMBEDDING_MODEL', "text-embedding-3-small")
+        return LangChainEmbedder(OpenAIEmbeddings(model=model), name=f"openai-{model}")
+    raise ValueError(f"不支持的向量器: {name}，可选: hashing, openai")
+
+
+def _numpy():
+    try:
+        import numpy as np
+    except ImportError:
+        raise ImportError("知识检索需要numpy，请安装: pip install numpy")
+    return np
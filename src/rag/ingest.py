@@ -0,0 +1,281 @@
+"""
+知识库增量导入：流式读取语料，按内容哈希去重，只向量化新增的片段
+
+用法:
+    python -m src.rag.ingest            # 增量更新（索引不存在时全量构建）
+    python -m src.rag.ingest --full     # 全量重建
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Set
+
+from src.rag.chunking import Chunk, iter_chunks, iter_corpus_files, source_name
+from src.rag.embedders import Embedder, get_embedder
+from src.rag.vector_index import IndexMismatchError, VectorIndex, _write_json
+
+
+MANIFEST_FILE = "manifest.json"
+MANIFEST_VERSION = 1
+LOCK_FILE = "ingest.lock"
+
+
+def file_digest(path: str, block_size: int = 1 << 16) -> str:
+    """分块读取文件计算SHA-256，不把整个文件读入内存"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+@contextmanager
+def ingest_lock(index_dir: str) -> Iterator[None]:
+    """
+    跨进程互斥：同一索引目录同时只运行一个导入，其余进程（或线程）等待
+
+    使用操作系统的文件锁，持有锁的进程崩溃时自动释放，不会留下失效的锁文件。
+    """
+    os.makedirs(index_dir, exist_ok=True)
+    with open(os.path.join(index_dir, LOCK_FILE), "a+b") as f:
+        if os.name == "nt":
+            import msvcrt
+            f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue  # LK_LOCK 重试约10秒仍拿不到锁时报错，继续等待
+            try:
+                yield
+            finally:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+@dataclass
+class IngestReport:
+    """一次导入的统计"""
+    mode: str                                          # "full" 或 "incremental"
+    files: int = 0                                     # 语料文件数
+    changed: List[str] = field(default_factory=list)   # 新增或修改的文件
+    removed: List[str] = field(default_factory=list)   # 已删除的文件
+    chunks: int = 0                                    # 变更文件切出的片段数
+    embedded: int = 0                                  # 新向量化的片段数
+    reused: int = 0                                    # 内容未变、沿用已有向量的片段数
+    tombstoned: int = 0                                # 新标记删除的行数
+    compacted: bool = False                            # 是否压缩了索引
+    elapsed: float = 0.0                               # 耗时（秒）
+
+    def summary(self) -> str:
+        return (f"{'全量' if self.mode == 'full' else '增量'}导入: {self.files} 个文件，"
+                f"变更 {len(self.changed)} 个、删除 {len(self.removed)} 个；"
+                f"片段 {self.chunks} 个，新向量化 {self.embedded} 个，复用 {self.reused} 个，"
+                f"删除 {self.tombstoned} 行{'，已压缩' if self.compacted else ''}，耗时 {self.elapsed:.2f}s")
+
+
+class Ingestor:
+    """增量导入流水线
+
+    语料文件 → 文件哈希比对（未变化的文件不读取）→ 逐行流式分块 → 片段内容哈希去重
+    → 分批向量化并追加到索引 → 更新清单 → 不再被引用的行记录墓碑 → 墓碑过多时压缩。
+
+    清单（manifest.json）记录每个文件的哈希及其片段的内容哈希；行与内容哈希的对应关系
+    保存在索引自身的片段元数据中，因此压缩索引不需要改写清单。
+    任何一步中断后重新运行都能恢复一致：未提交的追加数据会被截掉，
+    没有被清单引用的行会在下一次运行时记录墓碑。
+    """
+
+    def __init__(self,
+                 corpus_dir: Optional[str] = None,
+                 index_dir: Optional[str] = None,
+                 embedder: Optional[Embedder] = None,
+                 max_chars: int = 300,
+                 overlap: int = 60,
+                 batch_size: int = 64,
+                 compact_ratio: float = 0.3):
+        """
+        Args:
+            corpus_dir: 语料目录，默认读取环境变量 RAG_CORPUS_DIR，否则使用内置目的地指南
+            index_dir: 索引目录，默认读取环境变量 RAG_INDEX_DIR，否则为项目根目录下的 .rag_index
+            embedder: 向量器，默认由 get_embedder() 创建
+            max_chars: 每个片段的最大字符数
+            overlap: 相邻片段重叠的最大字符数
+            batch_size: 每次调用向量器的片段数
+            compact_ratio: 墓碑行占比超过该值时压缩索引
+        """
+        from src.rag.retriever import corpus_dir_from_env, index_dir_from_env
+        self.corpus_dir = corpus_dir or corpus_dir_from_env()
+        self.index_dir = index_dir or index_dir_from_env()
+        self.embedder = embedder or get_embedder()
+        self.max_chars = max_chars
+        self.overlap = overlap
+        self.batch_size = batch_size
+        self.compact_ratio = compact_ratio
+
+    @property
+    def manifest_path(self) -> str:
+        return os.path.join(self.index_dir, MANIFEST_FILE)
+
+    def _settings(self) -> Dict[str, Any]:
+        """影响片段内容和向量的设置，任何一项变化都需要全量重建"""
+        return {"embedder": self.embedder.name, "max_chars": self.max_chars, "overlap": self.overlap}
+
+    def _load_manifest(self) -> Optional[Dict[str, Any]]:
+        """读取清单；清单缺失、设置变化或索引与向量器不匹配时返回None"""
+        if not (os.path.exists(self.manifest_path) and VectorIndex.exists(self.index_dir)):
+            return None
+        with open(self.manifest_path, encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("version") != MANIFEST_VERSION or manifest.get("settings") != self._settings():
+            return None
+        try:
+            VectorIndex(self.index_dir).check_embedder(self.embedder)
+        except IndexMismatchError:
+            return None
+        return manifest
+
+    def run(self, full: bool = False) -> IngestReport:
+        """
+        运行导入（同一索引目录的多个导入按顺序执行，后运行的只处理期间新的变更）
+
+        索引有变化时丢弃打开该索引的全局检索器和检索工具的结果缓存，下次检索读取新索引。
+
+        Args:
+            full: 忽略清单，重新向量化全部片段并写成新一代索引
+        """
+        from src.rag.retriever import invalidate_retriever
+        with ingest_lock(self.index_dir):
+            report = self._run(full)
+        if report.mode == "full" or report.changed or report.removed or report.tombstoned:
+            invalidate_retriever(self.index_dir)
+        return report
+
+    def _run(self, full: bool) -> IngestReport:
+        start = time.perf_counter()
+        manifest = None if full else self._load_manifest()
+        report = IngestReport(mode="incremental" if manifest else "full")
+        files: Dict[str, Dict[str, Any]] = manifest["files"] if manifest else {}
+
+        # 已有的行：内容哈希 -> 行号（墓碑行和重复行不算）
+        rows: Dict[str, int] = {}
+        if manifest:
+            index = VectorIndex(self.index_dir)
+            alive = index.alive_mask()
+            for row, content_hash in enumerate(index.row_hashes()):
+                if alive[row] and content_hash:
+                    rows.setdefault(content_hash, row)
+
+        new_chunks = self._changed_chunks(files, rows, report)
+        if manifest:
+            VectorIndex.append(self.index_dir, new_chunks, self.embedder, self.batch_size)
+        else:
+            VectorIndex.build(self.index_dir, new_chunks, self.embedder, self.batch_size)
+
+        _write_json(self.manifest_path, {
+            "version": MANIFEST_VERSION,
+            "settings": self._settings(),
+            "files": files,
+        })
+        self._tombstone_unreferenced(files, report)
+        report.elapsed = time.perf_counter() - start
+        return report
+
+    def _changed_chunks(self, files: Dict[str, Dict[str, Any]], rows: Dict[str, int],
+                        report: IngestReport) -> Iterator[Chunk]:
+        """
+        遍历语料，产出需要向量化的新片段（生成器，由索引边消费边分批向量化）
+
+        未变化的文件只计算文件哈希；变更文件逐行分块，内容哈希已存在的片段直接复用。
+        遍历过程中同步更新清单中的文件条目。
+        """
+        seen: Set[str] = set()
+        pending: Set[str] = set()
+        for path in iter_corpus_files(self.corpus_dir):
+            source = source_name(path, self.corpus_dir)
+            seen.add(source)
+            report.files += 1
+            digest = file_digest(path)
+            entry = files.get(source)
+            if entry is not None and entry["digest"] == digest and all(h in rows for h in entry["chunks"]):
+                continue
+
+            report.changed.append(source)
+            hashes: List[str] = []
+            with open(path, encoding="utf-8") as f:
+                for chunk in iter_chunks(f, source, self.max_chars, self.overlap):
+                    content_hash = chunk.content_hash
+                    hashes.append(content_hash)
+                    report.chunks += 1
+                    if content_hash in rows or content_hash in pending:
+                        report.reused += 1
+                        continue
+                    pending.add(content_hash)
+                    report.embedded += 1
+                    yield chunk
+            files[source] = {"digest": digest, "chunks": hashes}
+
+        for source in [s for s in files if s not in seen]:
+            del files[source]
+            report.removed.append(source)
+
+    def _tombstone_unreferenced(self, files: Dict[str, Dict[str, Any]], report: IngestReport):
+        """清单中不再引用的行（修改前的旧片段、已删除文件的片段、中断留下的重复行）记录墓碑"""
+        index = VectorIndex(self.index_dir)
+        referenced = {h for entry in files.values() for h in entry["chunks"]}
+        alive = index.alive_mask()
+        kept: Set[str] = set()
+        dead: List[int] = []
+        for row, content_hash in enumerate(index.row_hashes()):
+            if not alive[row]:
+                continue
+            if content_hash in referenced and content_hash not in kept:
+                kept.add(content_hash)
+            else:
+                dead.append(row)
+        if dead:
+            index = VectorIndex.delete(self.index_dir, dead)
+            report.tombstoned = len(dead)
+        if len(index) and len(index.deleted) / len(index) > self.compact_ratio:
+            VectorIndex.compact(self.index_dir)
+            report.compacted = True
+
+
+def main(argv: Optional[List[str]] = None) -> IngestReport:
+    """命令行入口：增量更新或全量重建知识索引"""
+    parser = argparse.ArgumentParser(description="导入目的地指南语料，构建/更新知识检索索引")
+    parser.add_argument("--full", action="store_true", help="全量重建（重新向量化全部片段）")
+    parser.add_argument("--corpus", help="语料目录（默认 RAG_CORPUS_DIR 或内置指南）")
+    parser.add_argument("--index", help="索引目录（默认 RAG_INDEX_DIR 或 .rag_index）")
+    parser.add_argument("--embedder", help="向量器：hashing 或 openai（默认 RAG_EMBEDDER）")
+    parser.add_argument("--batch-size", type=int, default=64, help="每次向量化的片段数")
+    args = parser.parse_args(argv)
+
+    ingestor = Ingestor(
+        corpus_dir=args.corpus,
+        index_dir=args.index,
+        embedder=get_embedder(args.embedder),
+        batch_size=args.batch_size,
+    )
+    report = ingestor.run(full=args.full)
+    print(f"📚 {report.summary()}")
+    index = VectorIndex(ingestor.index_dir)
+    print(f"   索引: {ingestor.index_dir}（有效片段 {index.live_count} 个，共 {len(index)} 行）")
+    return report
+
+
+if __name__ == "__main__":
+    main()
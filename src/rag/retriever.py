@@ -0,0 +1,242 @@
+"""
+目的地知识检索：构建索引、检索片段并格式化为可注入上下文的参考资料
+"""
+
+import os
+import threading
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from src.rag.bm25 import BM25Index
+from src.rag.embedders import Embedder
+from src.rag.vector_index import VectorIndex
+
+
+_PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+DEFAULT_CORPUS_DIR = os.path.join(_PACKAGE_DIR, "data", "guides")
+DEFAULT_INDEX_DIR = os.path.join(os.path.dirname(os.path.dirname(_PACKAGE_DIR)), ".rag_index")
+
+# 检索模式：向量检索、BM25关键词检索、两者按倒数排名融合
+RETRIEVAL_MODES = ("vector", "bm25", "hybrid")
+
+
+def corpus_dir_from_env() -> str:
+    return os.getenv('RAG_CORPUS_DIR') or DEFAULT_CORPUS_DIR
+
+
+def index_dir_from_env() -> str:
+    return os.getenv('RAG_INDEX_DIR') or DEFAULT_INDEX_DIR
+
+
+def build_index(corpus_dir: Optional[str] = None,
+                index_dir: Optional[str] = None,
+                embedder: Optional[Embedder] = None,
+                max_chars: int = 300,
+                overlap: int = 60,
+                full: bool = True) -> VectorIndex:
+    """
+    读取语料、分块、向量化并写入索引目录
+
+    Args:
+        corpus_dir: 语料目录，默认读取环境变量 RAG_CORPUS_DIR，否则使用内置目的地指南
+        index_dir: 索引目录，默认读取环境变量 RAG_INDEX_DIR，否则为项目根目录下的 .rag_index
+        embedder: 向量器，默认由 get_embedder() 创建
+        max_chars: 每个片段的最大字符数
+        overlap: 相邻片段重叠的最大字符数
+        full: True时全量重建，False时只导入变更的文件
+    """
+    from src.rag.ingest import Ingestor
+    ingestor = Ingestor(corpus_dir, index_dir, embedder, max_chars, overlap)
+    ingestor.run(full=full)
+    return VectorIndex(ingestor.index_dir)
+
+
+def format_passages(passages: Sequence[Dict[str, Any]]) -> str:
+    """把检索结果格式化为带编号和出处的参考资料"""
+    lines = []
+    for i, passage in enumerate(passages, 1):
+        title = passage["heading"] or passage["source"]
+        lines.append(f"[{i}] {title}（来源: {passage['source']}）\n{passage['text']}")
+    return "\n\n".join(lines)
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[int]], k: int = 60) -> List[Tuple[int, float]]:
+    """
+    倒数排名融合（RRF）：文档得分为 Σ 1/(k + 在各列表中的名次)
+
+    Args:
+        rankings: 多个按相关度降序的文档号列表
+        k: 平滑常数，越大名次差异的影响越小
+
+    Returns:
+        [(文档号, 融合得分), ...]，按得分降序（同分时先出现的在前）
+    """
+    fused: Dict[int, float] = {}
+    for ranking in rankings:
+        for rank, doc in enumerate(ranking, 1):
+            fused[doc] = fused.get(doc, 0.0) + 1.0 / (k + rank)
+    return sorted(fused.items(), key=lambda item: -item[1])
+
+
+class Retriever:
+    """知识检索器
+
+    - vector：查询向量化后在向量索引中取相似度最高的片段
+    - bm25：在同一批片段上建立的BM25倒排索引中按关键词检索，擅长地名等专有名词
+    - hybrid：两路各取 candidates 个候选，按倒数排名融合
+    BM25索引在首次使用时从向量索引的片段构建，文档号与向量索引的行号一致。
+    """
+
+    def __init__(self,
+                 index: VectorIndex,
+                 embedder: Embedder,
+                 top_k: int = 3,
+                 min_score: float = 0.0,
+                 mode: str = "vector",
+                 candidates: int = 20,
+                 rrf_k: int = 60):
+        """
+        Args:
+            index: 向量索引
+            embedder: 与构建索引时相同的向量器
+            top_k: 默认返回的片段数
+            min_score: 向量检索中相似度低于该值的片段不返回
+            mode: 默认检索模式，vector/bm25/hybrid
+            candidates: 混合检索时每一路取的候选数
+            rrf_k: 倒数排名融合的平滑常数
+        """
+        index.check_embedder(embedder)
+        self.index = index
+        self.embedder = embedder
+        self.top_k = top_k
+        self.min_score = min_score
+        self.mode = self._check_mode(mode)
+        self.candidates = candidates
+        self.rrf_k = rrf_k
+        self._bm25: Optional[BM25Index] = None
+        self._alive = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _check_mode(mode: str) -> str:
+        if mode not in RETRIEVAL_MODES:
+            raise ValueError(f"不支持的检索模式: {mode}，可选: {', '.join(RETRIEVAL_MODES)}")
+        return mode
+
+    @property
+    def bm25(self) -> BM25Index:
+        """BM25倒排索引（首次使用时构建）"""
+        if self._bm25 is None:
+            with self._lock:
+                if self._bm25 is None:
+                    self._alive = self.index.alive_mask()
+                    self._bm25 = BM25Index.build([self.index.chunk(i).passage for i in range(len(self.index))])
+        return self._bm25
+
+    def _vector_hits(self, queries: Sequence[str], k: int) -> List[List[Tuple[int, float]]]:
+        vectors = self.embedder.embed_batch(list(queries))
+        indices, scores = self.index.search(vectors, k)
+        return [
+            [(i, score) for i, score in zip(row_idx, row_scores) if score >= self.min_score]
+            for row_idx, row_scores in zip(indices.tolist(), scores.tolist())
+        ]
+
+    def _bm25_hits(self, query: str, k: int) -> List[Tuple[int, float]]:
+        bm25 = self.bm25
+        indices, scores = bm25.search(query, k, alive=self._alive)
+        return list(zip(indices.tolist(), scores.tolist()))
+
+    def retrieve_many(self,
+                      queries: Sequence[str],
+                      top_k: Optional[int] = None,
+                      mode: Optional[str] = None) -> List[List[Dict[str, Any]]]:
+        """批量检索：向量检索一次向量化全部查询，一次矩阵乘法得到全部结果"""
+        if not queries:
+            return []
+        top_k = top_k or self.top_k
+        mode = self._check_mode(mode or self.mode)
+        if mode == "vector":
+            hits = self._vector_hits(queries, top_k)
+        elif mode == "bm25":
+            hits = [self._bm25_hits(query, top_k) for query in queries]
+        else:
+            pool = max(self.candidates, top_k)
+            vector_hits = self._vector_hits(queries, pool)
+            hits = [
+                reciprocal_rank_fusion([[i for i, _ in dense], [i for i, _ in self._bm25_hits(query, pool)]],
+                                       self.rrf_k)[:top_k]
+                for query, dense in zip(queries, vector_hits)
+            ]
+
+        results = []
+        for row in hits:
+            passages = []
+            for i, score in row:
+                passage = self.index.chunk(i).to_dict()
+                passage["score"] = round(score, 4)
+                passages.append(passage)
+            results.append(passages)
+        return results
+
+    def retrieve(self, query: str, top_k: Optional[int] = None, mode: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        检索与查询最相关的片段
+
+        Args:
+            query: 查询文本
+            top_k: 返回的片段数，默认使用构造时的 top_k
+            mode: 检索模式 vector/bm25/hybrid，默认使用构造时的 mode
+
+        Returns:
+            [{"chunk_id", "source", "heading", "text", "score"}, ...]，按相关度降序；
+            score 在三种模式下分别为余弦相似度、BM25得分和RRF融合得分
+        """
+        return self.retrieve_many([query], top_k, mode)[0]
+
+    def context(self, query: str, top_k: Optional[int] = None, mode: Optional[str] = None) -> str:
+        """检索并格式化为参考资料文本，没有相关片段时返回空字符串"""
+        return format_passages(self.retrieve(query, top_k, mode))
+
+
+# 全局检索器（首次使用时增量导入语料：索引不存在或与向量器不匹配时全量构建，否则只处理变更的文件）
+_retriever: Optional[Retriever] = None
+# 可重入：get_retriever 中的导入完成后会调用 invalidate_retriever
+_retriever_lock = threading.RLock()
+
+
+def get_retriever() -> Retriever:
+    """获取全局检索器"""
+    global _retriever
+    retriever = _retriever
+    if retriever is None:
+        with _retriever_lock:
+            if _retriever is None:
+                from src.rag.ingest import Ingestor
+                ingestor = Ingestor()
+                report = ingestor.run()
+                if report.changed or report.removed:
+                    print(f"📚 {report.summary()}")
+                _retriever = Retriever(VectorIndex(ingestor.index_dir), ingestor.embedder,
+                                       top_k=int(os.getenv('RAG_TOP_K', 3)),
+                                       mode=os.getenv('RAG_MODE', "hybrid"))
+            retriever = _retriever
+    return retriever
+
+
+def invalidate_retriever(index_dir: str):
+    """
+    索引目录重新导入后调用：丢弃打开该索引的全局检索器，并清空检索工具的结果缓存
+
+    其他索引目录（例如测试用的临时目录）不受影响。
+    """
+    global _retriever
+    with _retriever_lock:
+        current = _retriever
+        opened = current.index.index_dir if current is not None else index_dir_from_env()
+        if os.path.abspath(index_dir) != os.path.abspath(opened):
+            return
+        _retriever = None
+    from src.core.tools.tool_registry import tool_registry
+    tool = tool_registry.get_tool("search_travel_guides")
+    if tool is not None and tool.cache is not None:
+        tool.cache.clear()
@@ -0,0 +1,313 @@
+"""
+磁盘向量索引：内存映射的float32矩阵 + 分块矩阵乘法的top-k检索
+"""
+
+import json
+import os
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from src.rag.chunking import Chunk
+from src.rag.embedders import Embedder, _numpy
+
+
+META_FILE = "meta.json"
+VECTORS_FILE = "vectors.f32"
+CHUNKS_FILE = "chunks.jsonl"
+
+INDEX_VERSION = 2
+
+_CHUNK_FIELDS = ("chunk_id", "source", "heading", "text")
+
+
+class IndexMismatchError(ValueError):
+    """索引由另一个向量器（或另一种维度）生成"""
+
+
+class VectorIndex:
+    """向量索引
+
+    目录结构：
+        meta.json           当前生效的数据文件、向量器名称、维度、行数和已删除的行（墓碑）
+        vectors.<代>.f32    行优先的float32矩阵（逐行L2归一化），以内存映射方式只读打开
+        chunks.<代>.jsonl   与矩阵逐行对应的片段元数据（含内容哈希）
+
+    写入只追加：新片段追加到数据文件末尾，删除只记录墓碑，meta.json 原子替换后才对读者可见；
+    压缩和全量重建写入新一代文件，切换 meta.json 后再删除旧文件。
+
+    检索时查询向量组成 (m, dim) 矩阵，与索引矩阵按 block_rows 行分块做矩阵乘法，
+    墓碑行的得分置为 -inf，每块用 argpartition 取候选再与之前的结果合并；内存占用与索引大小无关。
+    """
+
+    def __init__(self, index_dir: str, block_rows: int = 65536):
+        """
+        打开已构建的索引
+
+        Args:
+            index_dir: 索引目录
+            block_rows: 检索时每次参与矩阵乘法的行数
+        """
+        np = _numpy()
+        self.index_dir = index_dir
+        self.block_rows = block_rows
+        self.meta = _read_meta(index_dir)
+        self.embedder_name: str = self.meta["embedder"]
+        self.dim: int = self.meta["dim"]
+        count: int = self.meta["count"]
+
+        with open(os.path.join(index_dir, self.meta["chunks"]), encoding="utf-8") as f:
+            self._records: List[Dict[str, Any]] = [json.loads(line) for line in islice(f, count)]
+        if count:
+            self.vectors = np.memmap(os.path.join(index_dir, self.meta["vectors"]), dtype=np.float32,
+                                     mode="r", shape=(count, self.dim))
+        else:
+            self.vectors = np.zeros((0, self.dim), dtype=np.float32)
+        self.deleted = np.array(sorted(self.meta.get("deleted", [])), dtype=np.intp)
+
+    # ---------- 写入 ----------
+
+    @classmethod
+    def build(cls,
+              index_dir: str,
+              chunks: Iterable[Chunk],
+              embedder: Embedder,
+              batch_size: int = 256,
+              **kwargs) -> "VectorIndex":
+        """
+        对片段分批向量化，写成新一代索引（替换已有索引）
+        """
+        os.makedirs(index_dir, exist_ok=True)
+        old = _read_meta(index_dir) if cls.exists(index_dir) else None
+        meta = _new_generation(old, embedder.name, embedder.dim)
+        meta = _append_rows(index_dir, meta, chunks, embedder, batch_size)
+        _commit(index_dir, meta, old)
+        return cls(index_dir, **kwargs)
+
+    @classmethod
+    def append(cls,
+               index_dir: str,
+               chunks: Iterable[Chunk],
+               embedder: Embedder,
+               batch_size: int = 256,
+               **kwargs) -> "VectorIndex":
+        """
+        把新片段分批向量化后追加到索引末尾（chunks 可以是生成器，边读边写）
+
+        上次写入中断留下的未提交数据会先被截掉。
+        """
+        meta = _read_meta(index_dir)
+        _check_embedder(meta, embedder)
+        meta = _append_rows(index_dir, meta, chunks, embedder, batch_size)
+        _write_json(os.path.join(index_dir, META_FILE), meta)
+        return cls(index_dir, **kwargs)
+
+    @classmethod
+    def delete(cls, index_dir: str, rows: Iterable[int], **kwargs) -> "VectorIndex":
+        """为行记录墓碑，检索不再返回它们（数据留在文件中，压缩时才移除）"""
+        meta = _read_meta(index_dir)
+        deleted = set(meta.get("deleted", []))
+        deleted.update(int(r) for r in rows if 0 <= int(r) < meta["count"])
+        meta["deleted"] = sorted(deleted)
+        _write_json(os.path.join(index_dir, META_FILE), meta)
+        return cls(index_dir, **kwargs)
+
+    @classmethod
+    def compact(cls, index_dir: str, **kwargs) -> "VectorIndex":
+        """只保留未删除的行，写成新一代文件（不重新向量化）"""
+        np = _numpy()
+        index = cls(index_dir)
+        live = np.flatnonzero(index.alive_mask())
+        meta = _new_generation(index.meta, index.embedder_name, index.dim)
+        with open(os.path.join(index_dir, meta["vectors"]), "wb") as vf, \
+                open(os.path.join(index_dir, meta["chunks"]), "wb") as cf:
+            for start in range(0, len(live), index.block_rows):
+                rows = live[start:start + index.block_rows]
+                np.ascontiguousarray(index.vectors[rows]).tofile(vf)
+                for i in rows.tolist():
+                    cf.write(_record_line(index._records[i]))
+            meta.update(count=len(live), chunks_bytes=cf.tell())
+        _commit(index_dir, meta, index.meta)
+        return cls(index_dir, **kwargs)
+
+    # ---------- 读取 ----------
+
+    @staticmethod
+    def exists(index_dir: str) -> bool:
+        return os.path.exists(os.path.join(index_dir, META_FILE))
+
+    def check_embedder(self, embedder: Embedder):
+        """确认索引与向量器匹配"""
+        _check_embedder(self.meta, embedder)
+
+    def __len__(self) -> int:
+        """行数（包括已删除的行）"""
+        return len(self._records)
+
+    @property
+    def live_count(self) -> int:
+        return len(self._records) - len(self.deleted)
+
+    def alive_mask(self) -> Any:
+        np = _numpy()
+        mask = np.ones(len(self), dtype=bool)
+        mask[self.deleted] = False
+        return mask
+
+    def chunk(self, i: int) -> Chunk:
+        record = self._records[i]
+        return Chunk(*(record[field] for field in _CHUNK_FIELDS))
+
+    def row_hashes(self) -> List[Optional[str]]:
+        """每行片段的内容哈希"""
+        return [record.get("hash") for record in self._records]
+
+    def search(self, queries: Any, k: int = 5) -> Tuple[Any, Any]:
+        """
+        批量top-k检索（余弦相似度）
+
+        Args:
+            queries: (m, dim) 或 (dim,) 的查询向量（应已归一化）
+            k: 每个查询返回的结果数
+
+        Returns:
+            (indices, scores)，形状均为 (m, min(k, 有效片段数))，按相似度降序
+        """
+        np = _numpy()
+        q = np.asarray(queries, dtype=np.float32)
+        if q.ndim == 1:
+            q = q[None, :]
+        if q.shape[1] != self.dim:
+            raise IndexMismatchError(f"查询向量为 {q.shape[1]} 维，索引为 {self.dim} 维")
+        m, n = q.shape[0], len(self)
+        k = min(k, self.live_count)
+        if k <= 0:
+            return np.empty((m, 0), dtype=np.intp), np.empty((m, 0), dtype=np.float32)
+
+        best_idx = np.empty((m, 0), dtype=np.intp)
+        best_scores = np.empty((m, 0), dtype=np.float32)
+        qt = np.ascontiguousarray(q.T)
+        for start in range(0, n, self.block_rows):
+            block = np.asarray(self.vectors[start:start + self.block_rows])
+            scores = (block @ qt).T  # (m, 块行数)
+            end = start + block.shape[0]
+            lo, hi = np.searchsorted(self.deleted, [start, end])
+            if hi > lo:
+                scores[:, self.deleted[lo:hi] - start] = -np.inf
+            idx = np.broadcast_to(np.arange(start, end, dtype=np.intp), scores.shape)
+            scores = np.concatenate([best_scores, scores], axis=1)
+            idx = np.concatenate([best_idx, idx], axis=1)
+            if scores.shape[1] > k:
+                top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+                scores = np.take_along_axis(scores, top, axis=1)
+                idx = np.take_along_axis(idx, top, axis=1)
+            best_scores, best_idx = scores, idx
+
+        order = np.argsort(-best_scores, axis=1, kind="stable")
+        return np.take_along_axis(best_idx, order, axis=1), np.take_along_axis(best_scores, order, axis=1)
+
+
+def _read_meta(index_dir: str) -> Dict[str, Any]:
+    with open(os.path.join(index_dir, META_FILE), encoding="utf-8") as f:
+        meta = json.load(f)
+    # 第1版索引使用固定文件名，一次写完
+    meta.setdefault("vectors", VECTORS_FILE)
+    meta.setdefault("chunks", CHUNKS_FILE)
+    meta.setdefault("generation", 0)
+    meta.setdefault("deleted", [])
+    if "chunks_bytes" not in meta:
+        meta["chunks_bytes"] = os.path.getsize(os.path.join(index_dir, meta["chunks"]))
+    return meta
+
+
+def _check_embedder(meta: Dict[str, Any], embedder: Embedder):
+    if embedder.name != meta["embedder"] or (embedder.dim and meta["dim"] and embedder.dim != meta["dim"]):
+        raise IndexMismatchError(
+            f"索引由 {meta['embedder']}（{meta['dim']}维）生成，与向量器 {embedder.name} 不匹配，请重建索引"
+        )
+
+
+def _new_generation(old: Optional[Dict[str, Any]], embedder_name: str, dim: int) -> Dict[str, Any]:
+    generation = old["generation"] + 1 if old else 0
+    return {
+        "version": INDEX_VERSION,
+        "embedder": embedder_name,
+        "dim": dim,
+        "count": 0,
+        "generation": generation,
+        "vectors": f"vectors.{generation}.f32",
+        "chunks": f"chunks.{generation}.jsonl",
+        "chunks_bytes": 0,
+        "deleted": [],
+    }
+
+
+def _batched(items: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    iterator = iter(items)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def _record_line(record: Dict[str, Any]) -> bytes:
+    return (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+
+
+def _append_rows(index_dir: str, meta: Dict[str, Any], chunks: Iterable[Chunk],
+                 embedder: Embedder, batch_size: int) -> Dict[str, Any]:
+    """分批向量化并追加到数据文件，返回新的meta（调用方写入meta后才生效）"""
+    np = _numpy()
+    vectors_path = os.path.join(index_dir, meta["vectors"])
+    chunks_path = os.path.join(index_dir, meta["chunks"])
+    count, dim = meta["count"], meta["dim"]
+    for path in (vectors_path, chunks_path):
+        if not os.path.exists(path):
+            open(path, "wb").close()
+
+    with open(vectors_path, "r+b") as vf, open(chunks_path, "r+b") as cf:
+        # 截掉上次中断时写了一半、未提交到meta的数据
+        vf.truncate(count * dim * np.dtype(np.float32).itemsize)
+        vf.seek(0, os.SEEK_END)
+        cf.truncate(meta["chunks_bytes"])
+        cf.seek(0, os.SEEK_END)
+        for batch in _batched(chunks, batch_size):
+            vectors = _as_matrix(embedder.embed_batch([c.passage for c in batch]))
+            if not dim:
+                dim = vectors.shape[1]
+            elif vectors.shape[1] != dim:
+                raise IndexMismatchError(f"向量器返回 {vectors.shape[1]} 维向量，索引为 {dim} 维")
+            vectors.tofile(vf)
+            for chunk in batch:
+                cf.write(_record_line({**chunk.to_dict(), "hash": chunk.content_hash}))
+            count += len(batch)
+        chunks_bytes = cf.tell()
+    return {**meta, "dim": dim, "count": count, "chunks_bytes": chunks_bytes}
+
+
+def _commit(index_dir: str, meta: Dict[str, Any], old: Optional[Dict[str, Any]]):
+    """替换meta.json切换到新一代文件，再删除旧文件"""
+    _write_json(os.path.join(index_dir, META_FILE), meta)
+    if old:
+        for key in ("vectors", "chunks"):
+            if old[key] != meta[key]:
+                try:
+                    os.remove(os.path.join(index_dir, old[key]))
+                except FileNotFoundError:
+                    pass
+
+
+def _as_matrix(vectors: Any) -> Any:
+    np = _numpy()
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    if vectors.ndim != 2:
+        raise ValueError("向量器应返回二维数组")
+    return vectors
+
+
+def _write_json(path: str, data: Any):
+    """先写临时文件再替换，读者不会看到写了一半的文件"""
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp, path)
@@ -3,7 +3,6 @@ Aria旅行助手 - 命令行界面
 """
 
 import sys
-import time
 from typing import Optional
 
 # 添加src目录到Python路径
@@ -81,6 +80,11 @@ class CommandLineInterface:
 - 助手名称: {self.assistant.name}
 - 对话历史: {len(self.assistant.conversation_history)//2} 轮对话
 - 记忆长度: {len(self.assistant.conversation_history)} 条消息
+            """
+            metrics = self.assistant.last_metrics
+            if metrics and metrics.time_to_first_token is not None:
+                status += f"""- 首字延迟: {metrics.time_to_first_token * 1000:.0f} ms
+- 生成速度: {metrics.tokens_per_second:.1f} tokens/s
             """
             print(self.color_text(status, 'SYSTEM'))
             
@@ -153,18 +157,11 @@ class CommandLineInterface:
                 # 显示用户输入
                 print(self.color_text(f"\n👤 你: {user_input}", 'USER'))
                 
-                # 显示思考提示
-                print(self.color_text("🤔 思考中", 'ASSISTANT'), end="", flush=True)
-                for _ in range(3):
-                    time.sleep(0.3)
-                    print(self.color_text(".", 'ASSISTANT'), end="", flush=True)
-                print()
-                
-                # 获取回复
-                response = self.assistant.chat(user_input)
-                
-                # 显示助手回复
-                print(self.color_text(f"🤖 {self.assistant.name}: {response}\n", 'ASSISTANT'))
+                # 流式显示助手回复
+                print(self.color_text(f"🤖 {self.assistant.name}: ", 'ASSISTANT'), end="", flush=True)
+                for delta in self.assistant.chat_stream(user_input):
+                    print(self.color_text(delta, 'ASSISTANT'), end="", flush=True)
+                print("\n")
         
         return True
     
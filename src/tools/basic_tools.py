@@ -2,51 +2,72 @@
 基础旅行工具
 """
 
-import datetime
-import random
-from typing import Dict, List, Optional, Tuple
-from src.core.tools.tool_registry import register_tool, ToolCategory
+from typing import Any, Dict, List, Optional, Tuple
+from src.core.tools.tool_registry import register_batch, register_tool, ToolCategory
+from src.tools.budget_engine import (
+    ALLOCATION,
+    BASE_PRICES,
+    DEFAULT_BASE_PRICE,
+    DEFAULT_MULTIPLIER,
+    LEVEL_MULTIPLIERS,
+    MAX_GRID_ROWS,
+    budget_dict,
+    budget_engine,
+)
+from src.tools.currency_engine import currency_engine
+from src.tools.geo_engine import UnknownCityError, city_index
+from src.tools.season_engine import season_store
+from src.tools.time_engine import current_time, world_clock
 
 
 @register_tool(
     name="get_current_time",
     description="获取当前时间和日期",
     category=ToolCategory.UTILITY,
-    return_description="当前日期时间字符串"
+    return_description="当前日期时间字符串",
+    cache=False  # 结果随时间变化，不能缓存
 )
 def get_current_time(timezone: str = "Asia/Shanghai") -> str:
     """
     获取指定时区的当前时间
     
     Args:
-        timezone: 时区名称，默认为"Asia/Shanghai"
+        timezone: 时区名称（如"Asia/Tokyo"）、UTC偏移（如"UTC+8"）或城市名，默认为"Asia/Shanghai"
         
     Returns:
         格式化的日期时间字符串
     """
-    # 注意：这里简化处理，实际应该使用时区库
-    now = datetime.datetime.now()
-    
-    # 模拟时区偏移（简化处理）
-    timezone_offsets = {
-        "Asia/Shanghai": 8,
-        "Asia/Tokyo": 9,
-        "Europe/London": 0,
-        "America/New_York": -5,
-        "America/Los_Angeles": -8
-    }
-    
-    offset = timezone_offsets.get(timezone, 8)
-    adjusted_time = now + datetime.timedelta(hours=offset)
+    # 基于zoneinfo换算（含夏令时），与服务器本地时区无关
+    return current_time(timezone)
+
+
+@register_tool(
+    name="get_world_clock",
+    description="同时获取多个时区或城市的当前时间",
+    category=ToolCategory.UTILITY,
+    return_description="每个时区的当前时间",
+    cache=False
+)
+def get_world_clock(timezones: List[str]) -> Dict[str, str]:
+    """
+    世界时钟：所有时区的时间对应同一时刻
     
-    return adjusted_time.strftime(f"%Y年%m月%d日 %H:%M:%S ({timezone} UTC{'+' if offset >= 0 else ''}{offset})")
+    Args:
+        timezones: 时区名或城市名列表，如["Asia/Tokyo", "巴黎", "UTC+8"]
+        
+    Returns:
+        {时区: 格式化的日期时间字符串}
+    """
+    return world_clock(timezones)
 
 
 @register_tool(
     name="calculate_budget",
     description="计算旅行预算",
     category=ToolCategory.CALCULATION,
-    return_description="详细的预算分析"
+    return_description="详细的预算分析",
+    choices={"budget_level": ["经济", "中等", "豪华"]},
+    cache=True
 )
 def calculate_budget(
     days: int,
@@ -66,65 +87,64 @@ def calculate_budget(
     Returns:
         包含各项预算的字典
     """
-    # 目的地基准价格（美元/天/人）
-    base_prices = {
-        "东京": 150,
-        "巴黎": 200,
-        "纽约": 250,
-        "曼谷": 80,
-        "巴厘岛": 100,
-        "悉尼": 180,
-        "伦敦": 220,
-        "新加坡": 160
-    }
-    
-    # 预算级别乘数
-    level_multipliers = {
-        "经济": 0.7,
-        "中等": 1.0,
-        "豪华": 1.8
-    }
-    
-    # 获取基准价格
-    base_price = base_prices.get(destination, 120)
-    multiplier = level_multipliers.get(budget_level, 1.0)
+    # 价格表在模块级预先构建，不在每次调用时重建
+    base_price = BASE_PRICES.get(destination, DEFAULT_BASE_PRICE)
+    multiplier = LEVEL_MULTIPLIERS.get(budget_level, DEFAULT_MULTIPLIER)
     
     # 计算各项预算
     daily_price = base_price * multiplier
-    
-    # 预算分配比例
-    allocation = {
-        "住宿": 0.35,
-        "餐饮": 0.25,
-        "交通": 0.20,
-        "景点门票": 0.15,
-        "购物其他": 0.05
-    }
-    
     total_budget = daily_price * days * travelers
+    amounts = [total_budget * ratio for ratio in ALLOCATION.values()]
     
-    detailed_budget = {
-        "目的地": destination,
-        "旅行天数": days,
-        "旅行人数": travelers,
-        "预算级别": budget_level,
-        "每人每天预算": round(daily_price, 2),
-        "总预算": round(total_budget, 2),
-        "预算详情": {}
-    }
-    
-    for category, ratio in allocation.items():
-        amount = total_budget * ratio
-        detailed_budget["预算详情"][category] = round(amount, 2)
+    return budget_dict(destination, days, travelers, budget_level, daily_price, total_budget, amounts)
+
+
+@register_batch("calculate_budget")
+def calculate_budget_batch(calls: List[Dict]) -> List[Dict]:
+    """calculate_budget 的批量实现（execute_many 中多个预算调用一次算完）"""
+    return budget_engine.compute_many(calls)
+
+
+@register_tool(
+    name="compare_budgets",
+    description="批量比较多个目的地、天数、人数和预算级别组合的旅行预算",
+    category=ToolCategory.CALCULATION,
+    return_description="紧凑的预算对比表（columns + rows）",
+    choices={"budget_levels": ["经济", "中等", "豪华"]},
+    cache=True
+)
+def compare_budgets(
+    destinations: List[str],
+    days: List[int],
+    travelers: Optional[List[int]] = None,
+    budget_levels: Optional[List[str]] = None
+) -> Dict:
+    """
+    计算所有组合的旅行预算
     
-    return detailed_budget
+    Args:
+        destinations: 目的地列表
+        days: 旅行天数列表
+        travelers: 旅行者人数列表，默认为[1]
+        budget_levels: 预算级别列表，默认为全部级别（经济/中等/豪华）
+        
+    Returns:
+        {"columns": 列名, "rows": 每个组合一行}；组合数超过上限时报错
+    """
+    travelers = travelers or [1]
+    budget_levels = budget_levels or list(LEVEL_MULTIPLIERS)
+    size = len(destinations) * len(days) * len(travelers) * len(budget_levels)
+    if size > MAX_GRID_ROWS:
+        raise ValueError(f"组合数 {size} 超过上限 {MAX_GRID_ROWS}，请减少目的地、天数、人数或预算级别")
+    return budget_engine.grid(destinations, days, travelers, budget_levels)
 
 
 @register_tool(
     name="convert_currency",
     description="货币转换",
     category=ToolCategory.CALCULATION,
-    return_description="转换后的金额"
+    return_description="转换后的金额",
+    cache={"ttl": 60}  # 与汇率文件的刷新检查间隔一致
 )
 def convert_currency(
     amount: float,
@@ -142,49 +162,107 @@ def convert_currency(
     Returns:
         转换结果
     """
-    # 模拟汇率（这里使用固定值，实际应该调用API）
-    exchange_rates = {
-        "USD": {"CNY": 7.2, "JPY": 150, "EUR": 0.92, "GBP": 0.79},
-        "CNY": {"USD": 0.14, "JPY": 21, "EUR": 0.13, "GBP": 0.11},
-        "JPY": {"USD": 0.0067, "CNY": 0.048, "EUR": 0.0061, "GBP": 0.0052},
-        "EUR": {"USD": 1.09, "CNY": 7.85, "JPY": 163, "GBP": 0.86},
-        "GBP": {"USD": 1.27, "CNY": 9.15, "JPY": 190, "EUR": 1.16}
-    }
-    
-    # 确保货币代码大写
-    from_currency = from_currency.upper()
-    to_currency = to_currency.upper()
+    # 汇率表只加载一次，交叉汇率预先计算好；不支持的货币会报错而不是按1:1换算
+    return currency_engine.convert(amount, from_currency, to_currency)
+
+
+@register_batch("convert_currency")
+def convert_currency_batch(calls: List[Dict]) -> List[Dict]:
+    """convert_currency 的批量实现（按下标从汇率矩阵中一次取出全部汇率，不支持的货币只让对应调用失败）"""
+    return currency_engine.convert_rows(
+        [c["amount"] for c in calls],
+        [c.get("from_currency", "USD") for c in calls],
+        [c.get("to_currency", "CNY") for c in calls],
+    )
+
+
+@register_tool(
+    name="convert_currency_many",
+    description="把一组金额从一种货币批量换算为另一种货币",
+    category=ToolCategory.CALCULATION,
+    return_description="换算后的金额列表"
+)
+def convert_currency_many(
+    amounts: List[float],
+    from_currency: str = "USD",
+    to_currency: str = "CNY"
+) -> Dict:
+    """
+    批量货币转换
     
-    # 获取汇率
-    if (from_currency in exchange_rates and 
-        to_currency in exchange_rates[from_currency]):
-        rate = exchange_rates[from_currency][to_currency]
-        converted_amount = amount * rate
+    Args:
+        amounts: 要转换的金额列表
+        from_currency: 源货币代码
+        to_currency: 目标货币代码
         
-        return {
-            "原始金额": amount,
-            "原始货币": from_currency,
-            "目标货币": to_currency,
-            "汇率": round(rate, 4),
-            "转换金额": round(converted_amount, 2)
-        }
-    else:
-        # 如果不支持的货币，返回近似值
-        return {
-            "原始金额": amount,
-            "原始货币": from_currency,
-            "目标货币": to_currency,
-            "汇率": 1.0,  # 默认汇率
-            "转换金额": amount,
-            "备注": "使用默认汇率，实际请查询最新汇率"
-        }
+    Returns:
+        换算结果
+    """
+    from_currency, to_currency = from_currency.upper(), to_currency.upper()
+    return {
+        "原始货币": from_currency,
+        "目标货币": to_currency,
+        "汇率": round(currency_engine.rate(from_currency, to_currency), 4),
+        "转换金额": currency_engine.convert_many(amounts, from_currency, to_currency),
+    }
+
+
+# 常用线路的实测距离（公里），比大圆距离更接近实际路程
+ROUTE_DISTANCES: Dict[Tuple[str, str], int] = {
+    ("北京", "上海"): 1318,
+    ("北京", "广州"): 2123,
+    ("上海", "广州"): 1454,
+    ("东京", "大阪"): 553,
+    ("纽约", "洛杉矶"): 3945,
+    ("伦敦", "巴黎"): 344,
+    ("北京", "东京"): 2100,
+    ("上海", "东京"): 1770,
+}
+
+# 不同交通方式的平均速度（km/h）
+TRAVEL_SPEEDS: Dict[str, float] = {
+    "飞机": 800,
+    "高铁": 300,
+    "汽车": 80,
+    "火车": 120
+}
+
+# 额外时间（小时）
+EXTRA_HOURS: Dict[str, float] = {
+    "飞机": 3.0,  # 提前到达机场+安检
+    "高铁": 1.0,
+    "汽车": 0.5,
+    "火车": 1.5
+}
+
+
+def _route_distance(origin: str, destination: str) -> int:
+    """两地距离（公里）：实测线路距离优先，否则为城市坐标间的大圆距离"""
+    for key in [(origin, destination), (destination, origin)]:
+        if key in ROUTE_DISTANCES:
+            return ROUTE_DISTANCES[key]
+    a, b = city_index.canonical_name(origin), city_index.canonical_name(destination)
+    for key in [(a, b), (b, a)]:
+        if key in ROUTE_DISTANCES:
+            return ROUTE_DISTANCES[key]
+    return round(city_index.distance(a, b))
+
+
+def _same_city(origin: str, destination: str) -> bool:
+    """出发地与目的地是否为同一城市（按别名归一化比较，如"北京"与"Beijing"）"""
+    if origin.strip() == destination.strip():
+        return True
+    return origin in city_index and destination in city_index and \
+        city_index.lookup(origin) == city_index.lookup(destination)
 
 
 @register_tool(
     name="estimate_travel_time",
-    description="估算旅行时间",
+    description="估算旅行时间（城市坐标库未收录的城市无法估算，会在结果中说明）",
     category=ToolCategory.TRANSPORTATION,
-    return_description="旅行时间估算"
+    return_description="旅行时间估算",
+    choices={"mode": ["飞机", "高铁", "汽车", "火车"]},
+    cache=True
 )
 def estimate_travel_time(
     origin: str,
@@ -200,56 +278,34 @@ def estimate_travel_time(
         mode: 交通方式（飞机/高铁/汽车）
         
     Returns:
-        时间估算结果
+        时间估算结果；同一城市或城市未收录时返回"说明"
     """
-    # 模拟距离矩阵（公里）
-    distances = {
-        ("北京", "上海"): 1318,
-        ("北京", "广州"): 2123,
-        ("上海", "广州"): 1454,
-        ("东京", "大阪"): 553,
-        ("纽约", "洛杉矶"): 3945,
-        ("伦敦", "巴黎"): 344,
-        ("北京", "东京"): 2100,
-        ("上海", "东京"): 1770,
-    }
-    
-    # 查找距离（支持两种顺序）
-    key = (origin, destination)
-    reverse_key = (destination, origin)
-    
-    distance = None
-    for k in [key, reverse_key]:
-        if k in distances:
-            distance = distances[k]
-            break
-    
-    # 如果没找到，使用随机距离
-    if distance is None:
-        distance = random.randint(500, 5000)
-    
-    # 不同交通方式的平均速度（km/h）
-    speeds = {
-        "飞机": 800,
-        "高铁": 300,
-        "汽车": 80,
-        "火车": 120
-    }
-    
-    speed = speeds.get(mode, 100)
-    
-    # 计算基础时间
-    base_hours = distance / speed
-    
-    # 添加额外时间（安检、候车等）
-    extra_time = {
-        "飞机": 3.0,  # 提前到达机场+安检
-        "高铁": 1.0,
-        "汽车": 0.5,
-        "火车": 1.5
-    }
+    if _same_city(origin, destination):
+        return {
+            "出发地": origin,
+            "目的地": destination,
+            "交通方式": mode,
+            "估算距离": "0公里",
+            "估算时间": "0分钟",
+            "总小时数": 0,
+            "说明": "出发地与目的地为同一城市，无需城际出行",
+        }
+
+    # 有实测线路距离时优先使用，否则按城市坐标计算大圆距离
+    try:
+        distance = _route_distance(origin, destination)
+    except UnknownCityError:
+        missing = [city for city in (origin, destination) if city not in city_index]
+        return {
+            "出发地": origin,
+            "目的地": destination,
+            "交通方式": mode,
+            "说明": f"城市坐标库未收录: {'、'.join(missing)}，无法估算距离和时间",
+        }
     
-    total_hours = base_hours + extra_time.get(mode, 1.0)
+    # 计算基础时间 + 额外时间（安检、候车等）
+    base_hours = distance / TRAVEL_SPEEDS.get(mode, 100)
+    total_hours = base_hours + EXTRA_HOURS.get(mode, 1.0)
     
     # 格式化输出
     if total_hours < 1:
@@ -273,11 +329,42 @@ def estimate_travel_time(
     }
 
 
+@register_tool(
+    name="travel_distance_matrix",
+    description="批量计算多个出发地到多个目的地的距离（行程规划用）",
+    category=ToolCategory.TRANSPORTATION,
+    return_description="距离矩阵（公里）",
+    cache=True
+)
+def travel_distance_matrix(
+    origins: List[str],
+    destinations: List[str]
+) -> Dict:
+    """
+    计算出发地 × 目的地的大圆距离矩阵
+    
+    Args:
+        origins: 出发地列表
+        destinations: 目的地列表
+        
+    Returns:
+        {"出发地": [...], "目的地": [...], "距离公里": 每个出发地一行}
+    """
+    matrix = city_index.distance_matrix(origins, destinations)
+    return {
+        "出发地": [city_index.canonical_name(o) for o in origins],
+        "目的地": [city_index.canonical_name(d) for d in destinations],
+        "距离公里": matrix.round().astype(int).tolist(),
+    }
+
+
 @register_tool(
     name="get_season_info",
     description="获取目的地的季节信息",
     category=ToolCategory.INFORMATION,
-    return_description="季节特点和推荐"
+    return_description="季节特点和推荐",
+    choices={"month": list(range(1, 13))},
+    cache=True
 )
 def get_season_info(
     destination: str,
@@ -293,104 +380,79 @@ def get_season_info(
     Returns:
         季节信息
     """
-    # 目的地的季节特点
-    seasons_data = {
-        "东京": {
-            "春季 (3-5月)": "樱花盛开，气候宜人，最佳旅游季节",
-            "夏季 (6-8月)": "炎热潮湿，有花火大会，适合室内活动",
-            "秋季 (9-11月)": "枫叶季节，天气凉爽，适合户外活动",
-            "冬季 (12-2月)": "寒冷干燥，可滑雪，适合温泉旅行"
-        },
-        "巴黎": {
-            "春季 (3-5月)": "气候温和，鲜花盛开，游客较少",
-            "夏季 (6-8月)": "旅游旺季，天气温暖，适合户外咖啡",
-            "秋季 (9-11月)": "天气凉爽，树叶变色，浪漫季节",
-            "冬季 (12-2月)": "寒冷但节日气氛浓厚，圣诞市场"
-        },
-        "曼谷": {
-            "凉季 (11-2月)": "最佳旅游季节，气候凉爽干燥",
-            "热季 (3-5月)": "非常炎热，注意防暑",
-            "雨季 (6-10月)": "经常下雨，但物价较低"
-        },
-        "悉尼": {
-            "夏季 (12-2月)": "海滩季节，适合水上活动",
-            "秋季 (3-5月)": "天气温和，适合户外活动",
-            "冬季 (6-8月)": "凉爽但阳光充足，适合城市游览",
-            "春季 (9-11月)": "野花盛开，气候宜人"
-        }
-    }
-    
-    # 默认目的地
-    default_seasons = {
-        "春季 (3-5月)": "气候温和，适合旅行",
-        "夏季 (6-8月)": "旅游旺季，天气温暖",
-        "秋季 (9-11月)": "天气凉爽，风景优美",
-        "冬季 (12-2月)": "寒冷季节，可能有雪"
-    }
-    
-    # 获取目的地的季节信息
-    destination_seasons = seasons_data.get(destination, default_seasons)
-    
+    # 每个目的地预先展开为12个月的查询表，按月份直接取值
     if month:
-        # 根据月份确定季节
-        if 3 <= month <= 5:
-            season = "春季"
-        elif 6 <= month <= 8:
-            season = "夏季"
-        elif 9 <= month <= 11:
-            season = "秋季"
-        else:
-            season = "冬季"
-        
-        # 查找匹配的季节信息
-        for season_key, description in destination_seasons.items():
-            if season in season_key:
-                return {
-                    "目的地": destination,
-                    "月份": f"{month}月",
-                    "季节": season_key,
-                    "特点": description,
-                    "推荐活动": _get_recommended_activities(destination, season)
-                }
+        return season_store.month_info(destination, month)
     
     # 返回所有季节信息
-    return {
-        "目的地": destination,
-        "所有季节": destination_seasons,
-        "最佳旅行时间": _get_best_time_to_visit(destination)
-    }
+    return season_store.overview(destination)
 
 
-def _get_recommended_activities(destination: str, season: str) -> str:
-    """获取推荐活动（内部函数）"""
-    activities = {
-        "东京": {
-            "春季": "赏樱花、逛公园、日式庭院游览",
-            "夏季": "花火大会、神社祭典、室内购物",
-            "秋季": "赏红叶、登山、温泉旅行",
-            "冬季": "滑雪、温泉、圣诞灯光秀"
-        },
-        "巴黎": {
-            "春季": "公园野餐、博物馆参观、塞纳河漫步",
-            "夏季": "户外咖啡、音乐节、巴黎海滩",
-            "秋季": "葡萄园游览、艺术展览、美食节",
-            "冬季": "圣诞市场、滑冰场、室内音乐会"
-        }
-    }
+@register_batch("get_season_info")
+def get_season_info_batch(calls: List[Dict]) -> List[Dict]:
+    """get_season_info 的批量实现（月份不合法时只让对应调用失败）"""
+    results: List[Any] = []
+    for c in calls:
+        try:
+            results.append(season_store.month_info(c["destination"], c["month"]) if c.get("month")
+                           else season_store.overview(c["destination"]))
+        except ValueError as e:
+            results.append(e)
+    return results
+
+
+@register_tool(
+    name="compare_seasons",
+    description="对比多个目的地在多个月份的季节、特点和推荐活动",
+    category=ToolCategory.INFORMATION,
+    return_description="紧凑的季节对比表（columns + rows）",
+    choices={"months": list(range(1, 13))},
+    cache=True
+)
+def compare_seasons(
+    destinations: List[str],
+    months: Optional[List[int]] = None
+) -> Dict:
+    """
+    批量查询目的地的季节信息
     
-    dest_activities = activities.get(destination, {})
-    return dest_activities.get(season, "城市观光、美食体验、文化探索")
+    Args:
+        destinations: 目的地列表
+        months: 月份列表（1-12），默认为全年
+        
+    Returns:
+        {"columns": 列名, "rows": 每个目的地和月份一行}
+    """
+    return season_store.table(destinations, months)
 
 
-def _get_best_time_to_visit(destination: str) -> str:
-    """获取最佳旅行时间（内部函数）"""
-    best_times = {
-        "东京": "春季（3-5月）和秋季（9-11月）",
-        "巴黎": "春季（4-6月）和秋季（9-10月）",
-        "曼谷": "凉季（11-2月）",
-        "悉尼": "春季（9-11月）和秋季（3-5月）"
-    }
-    return best_times.get(destination, "春季和秋季")
+@register_tool(
+    name="search_travel_guides",
+    description="在目的地指南知识库中检索资料。vector按语义检索，bm25按关键词检索（适合地名、景点名），hybrid融合两者",
+    category=ToolCategory.INFORMATION,
+    return_description="按相关度排序的资料片段（来源、章节、正文）",
+    choices={"mode": ["hybrid", "vector", "bm25"]},
+    cache=True
+)
+def search_travel_guides(
+    query: str,
+    mode: str = "hybrid",
+    top_k: int = 3
+) -> List[Dict]:
+    """
+    检索目的地指南
+    
+    Args:
+        query: 检索内容，如 "曼谷大皇宫着装要求"
+        mode: 检索模式（hybrid/vector/bm25）
+        top_k: 返回的片段数（1-10）
+        
+    Returns:
+        [{"source", "heading", "text"}, ...]
+    """
+    from src.rag.retriever import get_retriever
+    passages = get_retriever().retrieve(query, max(1, min(top_k, 10)), mode=mode)
+    return [{"source": p["source"], "heading": p["heading"], "text": p["text"]} for p in passages]
 
 
 def test_basic_tools():
@@ -0,0 +1,159 @@
+"""
+旅行预算计算引擎（支持批量/网格计算）
+"""
+
+import os
+import threading
+from typing import Any, Dict, List, Optional, Sequence
+
+
+# 目的地基准价格（美元/天/人）
+BASE_PRICES: Dict[str, float] = {
+    "东京": 150,
+    "巴黎": 200,
+    "纽约": 250,
+    "曼谷": 80,
+    "巴厘岛": 100,
+    "悉尼": 180,
+    "伦敦": 220,
+    "新加坡": 160,
+}
+DEFAULT_BASE_PRICE = 120
+
+# 预算级别乘数
+LEVEL_MULTIPLIERS: Dict[str, float] = {
+    "经济": 0.7,
+    "中等": 1.0,
+    "豪华": 1.8,
+}
+DEFAULT_MULTIPLIER = 1.0
+
+# 预算分配比例（顺序即输出顺序）
+ALLOCATION: Dict[str, float] = {
+    "住宿": 0.35,
+    "餐饮": 0.25,
+    "交通": 0.20,
+    "景点门票": 0.15,
+    "购物其他": 0.05,
+}
+
+# compare_budgets 一次对比的最大组合数（目的地 × 天数 × 人数 × 级别）
+MAX_GRID_ROWS = int(os.getenv('BUDGET_GRID_MAX_ROWS', 1000))
+
+TABLE_COLUMNS = ["目的地", "旅行天数", "旅行人数", "预算级别", "每人每天预算", "总预算", *ALLOCATION]
+
+
+def budget_dict(destination: str, days: int, travelers: int, budget_level: str,
+                daily_price: float, total_budget: float, amounts: Sequence[float]) -> Dict[str, Any]:
+    """组装与 calculate_budget 相同格式的预算结果"""
+    return {
+        "目的地": destination,
+        "旅行天数": days,
+        "旅行人数": travelers,
+        "预算级别": budget_level,
+        "每人每天预算": round(daily_price, 2),
+        "总预算": round(total_budget, 2),
+        "预算详情": {category: round(amount, 2) for category, amount in zip(ALLOCATION, amounts)},
+    }
+
+
+class BudgetEngine:
+    """向量化的预算计算
+
+    价格表预先转换为按下标索引的数组（最后一格为未知目的地/级别的默认值），
+    一次调用用数组运算算完所有组合；运算顺序与逐个计算一致，结果逐位相同。
+    """
+
+    def __init__(self,
+                 base_prices: Optional[Dict[str, float]] = None,
+                 level_multipliers: Optional[Dict[str, float]] = None,
+                 allocation: Optional[Dict[str, float]] = None):
+        self.base_prices = base_prices or BASE_PRICES
+        self.level_multipliers = level_multipliers or LEVEL_MULTIPLIERS
+        self.allocation = allocation or ALLOCATION
+        self._arrays = None
+        self._lock = threading.Lock()
+
+    def _tables(self):
+        """首次使用时构建索引数组（numpy按需导入）"""
+        if self._arrays is None:
+            with self._lock:
+                if self._arrays is None:
+                    try:
+                        import numpy as np
+                    except ImportError:
+                        raise ImportError("批量预算计算需要numpy，请安装: pip install numpy")
+                    dest_index = {name: i for i, name in enumerate(self.base_prices)}
+                    level_index = {name: i for i, name in enumerate(self.level_multipliers)}
+                    prices = np.array([*self.base_prices.values(), DEFAULT_BASE_PRICE], dtype=np.float64)
+                    multipliers = np.array([*self.level_multipliers.values(), DEFAULT_MULTIPLIER], dtype=np.float64)
+                    ratios = np.array(list(self.allocation.values()), dtype=np.float64)
+                    self._arrays = (np, dest_index, level_index, prices, multipliers, ratios)
+        return self._arrays
+
+    def compute(self,
+                destinations: Sequence[str],
+                days: Sequence[int],
+                travelers: Sequence[int],
+                levels: Sequence[str]) -> Dict[str, Any]:
+        """
+        逐行计算预算（四个序列等长）
+
+        Returns:
+            {"daily": (n,), "total": (n,), "breakdown": (n, 分类数)} 的numpy数组
+        """
+        np, dest_index, level_index, prices, multipliers, ratios = self._tables()
+        default_dest, default_level = len(prices) - 1, len(multipliers) - 1
+        dest_idx = np.fromiter((dest_index.get(d, default_dest) for d in destinations), dtype=np.intp, count=len(destinations))
+        level_idx = np.fromiter((level_index.get(lv, default_level) for lv in levels), dtype=np.intp, count=len(levels))
+
+        daily = prices[dest_idx] * multipliers[level_idx]
+        total = daily * np.asarray(days, dtype=np.float64) * np.asarray(travelers, dtype=np.float64)
+        breakdown = total[:, None] * ratios[None, :]
+        return {"daily": daily, "total": total, "breakdown": breakdown}
+
+    def compute_many(self, calls: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """批量计算 calculate_budget 的调用（参数为校验后的字典）"""
+        destinations = [c["destination"] for c in calls]
+        days = [c["days"] for c in calls]
+        travelers = [c.get("travelers", 1) for c in calls]
+        levels = [c.get("budget_level", "中等") for c in calls]
+        result = self.compute(destinations, days, travelers, levels)
+        return [
+            budget_dict(*row)
+            for row in zip(destinations, days, travelers, levels,
+                           result["daily"].tolist(), result["total"].tolist(), result["breakdown"].tolist())
+        ]
+
+    def grid(self,
+             destinations: Sequence[str],
+             days: Sequence[int],
+             travelers: Sequence[int],
+             levels: Sequence[str]) -> Dict[str, Any]:
+        """
+        计算 目的地 × 天数 × 人数 × 级别 的所有组合，返回紧凑表格
+
+        Returns:
+            {"columns": [...], "rows": [[...], ...]}
+        """
+        np = self._tables()[0]
+        shape = (len(destinations), len(days), len(travelers), len(levels))
+        d_i, n_i, t_i, l_i = (axis.ravel() for axis in np.indices(shape))
+        dest_col = [destinations[i] for i in d_i.tolist()]
+        days_col = np.asarray(days)[n_i].tolist()
+        travelers_col = np.asarray(travelers)[t_i].tolist()
+        level_col = [levels[i] for i in l_i.tolist()]
+
+        result = self.compute(dest_col, days_col, travelers_col, level_col)
+        daily = np.round(result["daily"], 2).tolist()
+        total = np.round(result["total"], 2).tolist()
+        breakdown = np.round(result["breakdown"], 2).tolist()
+        rows = [
+            [d, n, t, lv, p, s, *b]
+            for d, n, t, lv, p, s, b in zip(dest_col, days_col, travelers_col, level_col, daily, total, breakdown)
+        ]
+        return {"columns": TABLE_COLUMNS, "rows": rows}
+
+
+# 全局预算引擎
+budget_engine = BudgetEngine()
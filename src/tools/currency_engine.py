@@ -0,0 +1,226 @@
+"""
+汇率引擎：从本地文件加载报价，推导交叉汇率并预计算全部货币对
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+
+DEFAULT_RATES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "exchange_rates.json")
+
+
+class UnsupportedCurrencyError(ValueError):
+    """不支持的货币或无法换算的货币对"""
+
+
+class _RateTable(NamedTuple):
+    """一次加载得到的汇率表；重新加载时整体替换，读取方拿到的货币下标与矩阵总是一致"""
+    currencies: List[str]
+    index: Dict[str, int]
+    matrix: Any
+    routes: Dict[Tuple[str, str], List[str]]
+
+
+class CurrencyEngine:
+    """汇率引擎
+
+    - 报价文件只在首次使用时加载；文件修改后（按mtime检查，最多每check_interval秒一次）自动重新加载
+    - 直接报价优先；没有直接报价时按最少换算次数的路径推导交叉汇率（反向报价取倒数）
+    - 全部货币对的汇率预先计算成矩阵，只有报价内容变化时才重建
+    """
+
+    def __init__(self, path: Optional[str] = None, check_interval: float = 60.0):
+        """
+        Args:
+            path: 报价文件路径，默认读取环境变量 EXCHANGE_RATES_PATH，否则使用内置文件
+            check_interval: 检查文件是否更新的最短间隔（秒）
+        """
+        self.path = path or os.getenv('EXCHANGE_RATES_PATH') or DEFAULT_RATES_PATH
+        self.check_interval = check_interval
+        self.updated = ""
+        self._table: Optional[_RateTable] = None
+        self._digest: Optional[str] = None
+        self._mtime: Optional[float] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    # ---------- 加载与刷新 ----------
+
+    def refresh(self, force: bool = False) -> bool:
+        """
+        文件有更新时重新加载
+
+        Returns:
+            汇率表是否被重建
+        """
+        with self._lock:
+            self._checked_at = time.monotonic()
+            mtime = os.path.getmtime(self.path)
+            if not force and self._table is not None and mtime == self._mtime:
+                return False
+            self._mtime = mtime
+            with open(self.path, "rb") as f:
+                raw = f.read()
+            digest = hashlib.sha256(raw).hexdigest()
+            if not force and digest == self._digest:
+                return False
+            data = json.loads(raw)
+            self._table = self._build([(a.upper(), b.upper(), float(r)) for a, b, r in data["pairs"]])
+            self.updated = data.get("updated", "")
+            self._digest = digest
+            return True
+
+    def _loaded(self) -> _RateTable:
+        """当前汇率表（需要时先检查文件更新）；一次查询只读取一次，避免中途被重新加载替换"""
+        if self._table is None or time.monotonic() - self._checked_at >= self.check_interval:
+            self.refresh()
+        return self._table
+
+    @property
+    def currencies(self) -> List[str]:
+        """支持的货币代码"""
+        return list(self._loaded().currencies)
+
+    def _build(self, pairs: List[Tuple[str, str, float]]) -> _RateTable:
+        """根据直接报价构建全部货币对的汇率矩阵"""
+        try:
+            import numpy as np
+        except ImportError:
+            raise ImportError("汇率引擎需要numpy，请安装: pip install numpy")
+
+        currencies = sorted({c for a, b, _ in pairs for c in (a, b)})
+        index = {c: i for i, c in enumerate(currencies)}
+        n = len(currencies)
+
+        # 邻接表：直接报价，以及没有反向报价时的倒数
+        edges: Dict[str, Dict[str, float]] = {c: {} for c in currencies}
+        for a, b, rate in pairs:
+            if rate <= 0:
+                raise ValueError(f"汇率必须为正数: {a}->{b} = {rate}")
+            edges[a][b] = rate
+        for a, b, rate in pairs:
+            edges[b].setdefault(a, 1.0 / rate)
+
+        # 每个货币出发做一次BFS（换算次数最少的路径），沿路径累乘汇率
+        matrix = np.full((n, n), np.nan, dtype=np.float64)
+        routes: Dict[Tuple[str, str], List[str]] = {}
+        for source in currencies:
+            rates = {source: 1.0}
+            parents: Dict[str, Optional[str]] = {source: None}
+            queue = deque([source])
+            while queue:
+                current = queue.popleft()
+                for target, rate in edges[current].items():
+                    if target not in rates:
+                        rates[target] = rates[current] * rate
+                        parents[target] = current
+                        queue.append(target)
+            for target, rate in rates.items():
+                matrix[index[source], index[target]] = rate
+                if target != source and parents[target] != source:
+                    route = [target]
+                    while route[-1] != source:
+                        route.append(parents[route[-1]])
+                    routes[(source, target)] = route[::-1]
+
+        return _RateTable(currencies, index, matrix, routes)
+
+    # ---------- 查询 ----------
+
+    @staticmethod
+    def _pair_index(table: _RateTable, from_currency: str, to_currency: str) -> Tuple[int, int]:
+        i = table.index.get(from_currency)
+        j = table.index.get(to_currency)
+        if i is None or j is None:
+            missing = from_currency if i is None else to_currency
+            raise UnsupportedCurrencyError(f"不支持的货币: {missing}，支持: {', '.join(table.currencies)}")
+        return i, j
+
+    def _rate(self, table: _RateTable, from_currency: str, to_currency: str) -> float:
+        i, j = self._pair_index(table, from_currency, to_currency)
+        value = float(table.matrix[i, j])
+        if value != value:  # NaN：两种货币之间没有换算路径
+            raise UnsupportedCurrencyError(f"无法换算 {from_currency} -> {to_currency}")
+        return value
+
+    def rate(self, from_currency: str, to_currency: str) -> float:
+        """from_currency 兑 to_currency 的汇率"""
+        return self._rate(self._loaded(), from_currency.upper(), to_currency.upper())
+
+    def route(self, from_currency: str, to_currency: str) -> Optional[List[str]]:
+        """交叉汇率的换算路径，直接报价（或相同货币）时返回None"""
+        return self._loaded().routes.get((from_currency.upper(), to_currency.upper()))
+
+    def rates_table(self) -> Tuple[List[str], Any]:
+        """(货币列表, 全部货币对的汇率矩阵)"""
+        table = self._loaded()
+        return list(table.currencies), table.matrix.copy()
+
+    @staticmethod
+    def _result(table: _RateTable, amount: float, from_currency: str, to_currency: str,
+                rate: float, converted: float) -> Dict[str, Any]:
+        result = {
+            "原始金额": amount,
+            "原始货币": from_currency,
+            "目标货币": to_currency,
+            "汇率": round(rate, 4),
+            "转换金额": round(converted, 2),
+        }
+        route = table.routes.get((from_currency, to_currency))
+        if route:
+            result["换算路径"] = "→".join(route)
+        return result
+
+    def convert(self, amount: float, from_currency: str, to_currency: str) -> Dict[str, Any]:
+        """单笔换算，返回与 convert_currency 相同格式的结果"""
+        from_currency, to_currency = from_currency.upper(), to_currency.upper()
+        table = self._loaded()
+        rate = self._rate(table, from_currency, to_currency)
+        return self._result(table, amount, from_currency, to_currency, rate, amount * rate)
+
+    def convert_rows(self, amounts: Sequence[float], from_currencies: Sequence[str],
+                     to_currencies: Sequence[str]) -> List[Union[Dict[str, Any], UnsupportedCurrencyError]]:
+        """
+        逐行换算（每行的货币对可以不同），按下标一次从汇率矩阵中取出全部汇率
+
+        Returns:
+            与输入等长的结果列表；货币不支持或无法换算的行返回 UnsupportedCurrencyError，不影响其他行
+        """
+        import numpy as np
+        table = self._loaded()
+        from_currencies = [c.upper() for c in from_currencies]
+        to_currencies = [c.upper() for c in to_currencies]
+        results: List[Any] = [None] * len(from_currencies)
+        valid, idx = [], []
+        for k, (a, b) in enumerate(zip(from_currencies, to_currencies)):
+            try:
+                idx.append(self._pair_index(table, a, b))
+                valid.append(k)
+            except UnsupportedCurrencyError as e:
+                results[k] = e
+        rows = np.fromiter((i for i, _ in idx), dtype=np.intp, count=len(idx))
+        cols = np.fromiter((j for _, j in idx), dtype=np.intp, count=len(idx))
+        rates = table.matrix[rows, cols]
+        converted = np.asarray([amounts[k] for k in valid], dtype=np.float64) * rates
+        for k, rate, value in zip(valid, rates.tolist(), converted.tolist()):
+            a, b = from_currencies[k], to_currencies[k]
+            if rate != rate:  # NaN：两种货币之间没有换算路径
+                results[k] = UnsupportedCurrencyError(f"无法换算 {a} -> {b}")
+            else:
+                results[k] = self._result(table, amounts[k], a, b, rate, value)
+        return results
+
+    def convert_many(self, amounts: Sequence[float], from_currency: str, to_currency: str) -> List[float]:
+        """把一组金额从 from_currency 换算为 to_currency（一次数组运算）"""
+        import numpy as np
+        rate = self.rate(from_currency, to_currency)
+        return np.round(np.asarray(amounts, dtype=np.float64) * rate, 2).tolist()
+
+
+# 全局汇率引擎
+currency_engine = CurrencyEngine()
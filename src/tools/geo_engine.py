@@ -0,0 +1,161 @@
+"""
+城市坐标索引与大圆距离计算
+"""
+
+import json
+import os
+import threading
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+
+DEFAULT_CITIES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "cities.json")
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+class UnknownCityError(ValueError):
+    """城市不在坐标索引中"""
+
+
+def _normalize(name: str) -> str:
+    """别名归一化：去空白、英文小写、去掉结尾的“市”"""
+    key = name.strip().lower()
+    if len(key) > 2 and key.endswith("市"):
+        key = key[:-1]
+    return key
+
+
+class CityIndex:
+    """城市坐标索引
+
+    城市表只在首次使用时加载，坐标以弧度存放在连续的float64数组中；
+    名称和别名映射到数组下标。两城市间的距离按下标对缓存，
+    N×M 距离矩阵用广播的haversine公式一次算出。
+    """
+
+    def __init__(self, path: Optional[str] = None, cache_size: int = 65536):
+        """
+        Args:
+            path: 城市坐标文件路径，默认读取环境变量 CITIES_PATH，否则使用内置文件
+            cache_size: 缓存的城市对距离数
+        """
+        self.path = path or os.getenv('CITIES_PATH') or DEFAULT_CITIES_PATH
+        self.names: List[str] = []
+        self.countries: List[str] = []
+        self.timezones: List[str] = []
+        self._aliases: Dict[str, int] = {}
+        self._lat = None
+        self._lon = None
+        self._cos_lat = None
+        self._lock = threading.Lock()
+        self._pair_distance = lru_cache(maxsize=cache_size)(self._compute_pair)
+
+    def _ensure_loaded(self):
+        if self._lat is None:
+            with self._lock:
+                if self._lat is None:
+                    self._load()
+
+    def _load(self):
+        try:
+            import numpy as np
+        except ImportError:
+            raise ImportError("城市距离计算需要numpy，请安装: pip install numpy")
+
+        with open(self.path, encoding="utf-8") as f:
+            cities = json.load(f)["cities"]
+
+        names, countries, timezones, aliases = [], [], [], {}
+        for i, city in enumerate(cities):
+            names.append(city["name"])
+            countries.append(city.get("country", ""))
+            timezones.append(city.get("timezone", ""))
+            for alias in [city["name"], *city.get("aliases", [])]:
+                aliases.setdefault(_normalize(alias), i)
+
+        lat = np.radians(np.array([c["lat"] for c in cities], dtype=np.float64))
+        lon = np.radians(np.array([c["lon"] for c in cities], dtype=np.float64))
+        self.names, self.countries, self.timezones, self._aliases = names, countries, timezones, aliases
+        self._cos_lat = np.cos(lat)
+        self._lon = lon
+        self._lat = lat
+        self._pair_distance.cache_clear()
+
+    def __len__(self) -> int:
+        self._ensure_loaded()
+        return len(self.names)
+
+    def __contains__(self, name: str) -> bool:
+        self._ensure_loaded()
+        return _normalize(name) in self._aliases
+
+    def lookup(self, name: str) -> int:
+        """城市名或别名对应的下标"""
+        self._ensure_loaded()
+        index = self._aliases.get(_normalize(name))
+        if index is None:
+            raise UnknownCityError(f"未知城市: {name}")
+        return index
+
+    def canonical_name(self, name: str) -> str:
+        return self.names[self.lookup(name)]
+
+    def timezone(self, name: str) -> str:
+        """城市的IANA时区名"""
+        return self.timezones[self.lookup(name)]
+
+    def cities_in_timezone(self, zone: str) -> List[str]:
+        """使用该时区的城市"""
+        self._ensure_loaded()
+        return [n for n, tz in zip(self.names, self.timezones) if tz == zone]
+
+    def aliases_of(self, index: int) -> List[str]:
+        """城市的全部（归一化后的）名称与别名"""
+        self._ensure_loaded()
+        return [alias for alias, i in self._aliases.items() if i == index]
+
+    def coordinates(self, name: str) -> Tuple[float, float]:
+        """(纬度, 经度)，单位为度"""
+        import math
+        i = self.lookup(name)
+        return math.degrees(float(self._lat[i])), math.degrees(float(self._lon[i]))
+
+    def _haversine(self, i: Any, j: Any) -> Any:
+        """按下标（标量或可广播的数组）计算大圆距离（公里）"""
+        np = _numpy()
+        dlat = self._lat[j] - self._lat[i]
+        dlon = self._lon[j] - self._lon[i]
+        a = np.sin(dlat / 2) ** 2 + self._cos_lat[i] * self._cos_lat[j] * np.sin(dlon / 2) ** 2
+        return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+    def _compute_pair(self, i: int, j: int) -> float:
+        return float(self._haversine(i, j))
+
+    def distance(self, origin: str, destination: str) -> float:
+        """两城市之间的大圆距离（公里），结果按城市对缓存"""
+        i, j = self.lookup(origin), self.lookup(destination)
+        if i > j:
+            i, j = j, i
+        return self._pair_distance(i, j)
+
+    def distance_matrix(self, origins: Sequence[str], destinations: Sequence[str]) -> Any:
+        """
+        N×M 距离矩阵（公里）
+
+        Returns:
+            形状为 (len(origins), len(destinations)) 的numpy数组
+        """
+        np = _numpy()
+        rows = np.fromiter((self.lookup(o) for o in origins), dtype=np.intp, count=len(origins))
+        cols = np.fromiter((self.lookup(d) for d in destinations), dtype=np.intp, count=len(destinations))
+        return self._haversine(rows[:, None], cols[None, :])
+
+
+def _numpy():
+    import numpy as np
+    return np
+
+
+# 全局城市索引
+city_index = CityIndex()
@@ -0,0 +1,129 @@
+"""
+目的地季节知识库：按月份预先展开的季节查询表
+"""
+
+import json
+import os
+import threading
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+
+DEFAULT_SEASONS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "seasons.json")
+
+DEFAULT_KEY = "_default"
+
+SEASON_COLUMNS = ["目的地", "月份", "季节", "特点", "推荐活动"]
+
+# (季节标签, 特点, 推荐活动)
+MonthEntry = Tuple[str, str, str]
+
+
+class SeasonStore:
+    """季节知识库
+
+    数据文件只在首次使用时加载；每个目的地预先展开成12个月的
+    (季节, 特点, 推荐活动) 数组，按月份查询是一次下标访问，
+    任何季节划分（春夏秋冬、凉季/热季/雨季）都能正确匹配。
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        """
+        Args:
+            path: 季节数据文件路径，默认读取环境变量 SEASONS_PATH，否则使用内置文件
+        """
+        self.path = path or os.getenv('SEASONS_PATH') or DEFAULT_SEASONS_PATH
+        self._months: Optional[Dict[str, Tuple[MonthEntry, ...]]] = None
+        self._overview: Dict[str, Dict[str, str]] = {}
+        self._best_time: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def _ensure_loaded(self) -> Dict[str, Tuple[MonthEntry, ...]]:
+        if self._months is None:
+            with self._lock:
+                if self._months is None:
+                    self._load()
+        return self._months
+
+    def _load(self):
+        with open(self.path, encoding="utf-8") as f:
+            data = json.load(f)
+        default_activities = data.get("default_activities", "")
+
+        months: Dict[str, Tuple[MonthEntry, ...]] = {}
+        for destination, info in data["destinations"].items():
+            table: List[Optional[MonthEntry]] = [None] * 12
+            for season in info["seasons"]:
+                entry = (season["label"], season["description"], season.get("activities", default_activities))
+                for month in season["months"]:
+                    if table[month - 1] is not None:
+                        raise ValueError(f"{destination} 的 {month} 月属于多个季节")
+                    table[month - 1] = entry
+            missing = [i + 1 for i, entry in enumerate(table) if entry is None]
+            if missing:
+                raise ValueError(f"{destination} 缺少月份 {missing} 的季节数据")
+            months[destination] = tuple(table)
+            self._overview[destination] = {s["label"]: s["description"] for s in info["seasons"]}
+            self._best_time[destination] = info.get("best_time", "")
+        if DEFAULT_KEY not in months:
+            raise ValueError(f"季节数据缺少 {DEFAULT_KEY}")
+        self._months = months
+
+    def _key(self, destination: str) -> str:
+        months = self._ensure_loaded()
+        return destination if destination in months else DEFAULT_KEY
+
+    def destinations(self) -> List[str]:
+        """收录了季节数据的目的地"""
+        return [d for d in self._ensure_loaded() if d != DEFAULT_KEY]
+
+    def month_entry(self, destination: str, month: int) -> MonthEntry:
+        """某月的 (季节, 特点, 推荐活动)"""
+        if not 1 <= month <= 12:
+            raise ValueError(f"月份应为1-12，实际为 {month}")
+        return self._ensure_loaded()[self._key(destination)][month - 1]
+
+    def month_info(self, destination: str, month: int) -> Dict[str, str]:
+        """与 get_season_info 按月份查询相同格式的结果"""
+        season, description, activities = self.month_entry(destination, month)
+        return {
+            "目的地": destination,
+            "月份": f"{month}月",
+            "季节": season,
+            "特点": description,
+            "推荐活动": activities,
+        }
+
+    def overview(self, destination: str) -> Dict[str, Any]:
+        """与 get_season_info 不指定月份时相同格式的结果"""
+        key = self._key(destination)
+        return {
+            "目的地": destination,
+            "所有季节": dict(self._overview[key]),
+            "最佳旅行时间": self._best_time[key],
+        }
+
+    def lookup_many(self, destinations: Sequence[str], months: Sequence[int]) -> List[Dict[str, str]]:
+        """逐行查询（两个序列等长）"""
+        return [self.month_info(d, m) for d, m in zip(destinations, months)]
+
+    def table(self, destinations: Sequence[str], months: Optional[Sequence[int]] = None) -> Dict[str, Any]:
+        """
+        目的地 × 月份 的季节对比表
+
+        Args:
+            destinations: 目的地列表
+            months: 月份列表，默认为全年12个月
+
+        Returns:
+            {"columns": [...], "rows": [[...], ...]}
+        """
+        months = list(months) if months else list(range(1, 13))
+        rows = []
+        for destination in destinations:
+            for month in months:
+                rows.append([destination, month, *self.month_entry(destination, month)])
+        return {"columns": SEASON_COLUMNS, "rows": rows}
+
+
+# 全局季节知识库
+season_store = SeasonStore()
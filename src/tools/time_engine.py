@@ -0,0 +1,113 @@
+"""
+时区引擎：基于zoneinfo的当前时间与世界时钟
+"""
+
+import datetime
+import re
+from functools import lru_cache
+from typing import Dict, Optional, Sequence, Tuple
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from src.tools.geo_engine import UnknownCityError, city_index
+
+
+_UTC_OFFSET = re.compile(r"^(?:UTC|GMT)\s*([+-])\s*(\d{1,2})(?::?(\d{2}))?$", re.IGNORECASE)
+
+
+class UnknownTimezoneError(ValueError):
+    """无法识别的时区或城市"""
+
+
+@lru_cache(maxsize=1024)
+def resolve_zone(name: str) -> Tuple[str, datetime.tzinfo]:
+    """
+    把时区名解析为 (规范名称, tzinfo)，结果缓存
+
+    支持IANA时区名（Asia/Tokyo）、UTC/GMT固定偏移（UTC+8、GMT-05:30）
+    以及城市坐标索引中的城市名或别名（东京、Paris）。
+    """
+    key = name.strip()
+    if key.upper() in ("UTC", "GMT", "Z"):
+        return "UTC", datetime.timezone.utc
+
+    match = _UTC_OFFSET.match(key)
+    if match:
+        sign, hours, minutes = match.groups()
+        delta = datetime.timedelta(hours=int(hours), minutes=int(minutes or 0))
+        if delta > datetime.timedelta(hours=14):
+            raise UnknownTimezoneError(f"无效的UTC偏移: {name}")
+        return key.upper(), datetime.timezone(-delta if sign == "-" else delta)
+
+    if "/" in key:
+        try:
+            return key, ZoneInfo(key)
+        except (ZoneInfoNotFoundError, ValueError):
+            pass
+
+    try:
+        zone = city_index.timezone(key)
+    except UnknownCityError:
+        raise UnknownTimezoneError(f"无法识别的时区或城市: {name}")
+    return zone, ZoneInfo(zone)
+
+
+@lru_cache(maxsize=1024)
+def zone_label(zone: str) -> str:
+    """时区的中文城市标签，如 Asia/Shanghai -> 上海"""
+    cities = city_index.cities_in_timezone(zone)
+    if not cities:
+        return ""
+    # 优先选英文名与时区名一致的城市（Asia/Shanghai 选上海而不是北京）
+    zone_city = zone.rsplit("/", 1)[-1].replace("_", " ").lower()
+    for city in cities:
+        if zone_city in city_index.aliases_of(city_index.lookup(city)):
+            return city
+    return cities[0]
+
+
+def _format_offset(offset: Optional[datetime.timedelta]) -> str:
+    """UTC偏移显示为 UTC+8、UTC-3:30"""
+    total = int((offset or datetime.timedelta()).total_seconds() // 60)
+    sign = "+" if total >= 0 else "-"
+    hours, minutes = divmod(abs(total), 60)
+    return f"UTC{sign}{hours}" + (f":{minutes:02d}" if minutes else "")
+
+
+def format_time(moment: datetime.datetime, zone: str) -> str:
+    """格式化为 “2025年01月01日 08:00:00 (Asia/Shanghai 上海 UTC+8)”"""
+    label = zone_label(zone)
+    dst = moment.dst()
+    parts = [zone, label, _format_offset(moment.utcoffset())]
+    if dst:
+        parts.append("夏令时")
+    return moment.strftime("%Y年%m月%d日 %H:%M:%S") + f" ({' '.join(p for p in parts if p)})"
+
+
+def current_time(timezone: str, now: Optional[datetime.datetime] = None) -> str:
+    """
+    指定时区的当前时间
+
+    Args:
+        timezone: 时区名、UTC偏移或城市名
+        now: 当前时刻（带时区），默认读取系统时钟
+    """
+    zone, tz = resolve_zone(timezone)
+    now = now or datetime.datetime.now(datetime.timezone.utc)
+    return format_time(now.astimezone(tz), zone)
+
+
+def world_clock(timezones: Sequence[str],
+                now: Optional[datetime.datetime] = None) -> Dict[str, str]:
+    """
+    多个时区的当前时间，只读取一次时钟，所有结果对应同一时刻
+
+    Returns:
+        {输入的时区或城市名: 格式化时间}
+    """
+    now = now or datetime.datetime.now(datetime.timezone.utc)
+    result: Dict[str, str] = {}
+    for name in timezones:
+        zone, tz = resolve_zone(name)
+        result[name] = format_time(now.astimezone(tz), zone)
+    return result
+
@@ -0,0 +1,29 @@
+"""知识检索（RAG）测试共用的辅助函数"""
+
+import tempfile
+# sys.path.append('src')
+
+import numpy as np
+
+from src.rag import HashingEmbedder, Retriever, build_index
+
+
+def make_retriever(index_dir=None, **kwargs):
+    """用内置目的地指南在临时目录（或指定目录）构建索引并创建检索器"""
+    embedder = HashingEmbedder()
+    index = build_index(index_dir=index_dir or tempfile.mkdtemp(), embedder=embedder)
+    return Retriever(index, embedder, **kwargs)
+
+
+class CachedEmbedder(HashingEmbedder):
+    """合成语料只有少量不同文本，缓存向量以加快构建"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.cache = {}
+
+    def embed_batch(self, texts):
+        missing = [t for t in set(texts) if t not in self.cache]
+        if missing:
+            self.cache.update(zip(missing, HashingEmbedder.embed_batch(self, missing)))
+        return np.stack([self.cache[t] for t in texts])
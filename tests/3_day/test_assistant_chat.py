@@ -0,0 +1,194 @@
+"""助手对话路径测试（同步/异步/流式）"""
+
+import asyncio
+import sys
+import time
+from types import SimpleNamespace
+# sys.path.append('src')
+
+from src.agents.basic_agent import TravelAssistant, TurnMetrics
+
+
+class EchoModel:
+    """按收到的最后一条用户消息回复"""
+
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.calls = []
+
+    def _reply(self, messages):
+        self.calls.append(list(messages))
+        if self.fail:
+            raise ConnectionError("连接失败")
+        return "收到: " + messages[-1]["content"]
+
+    def invoke(self, messages, **kwargs):
+        return SimpleNamespace(content=self._reply(messages), tool_calls=[])
+
+    async def ainvoke(self, messages, **kwargs):
+        await asyncio.sleep(0)
+        return SimpleNamespace(content=self._reply(messages), tool_calls=[])
+
+
+class StreamingModel(EchoModel):
+    """首段延迟 first_delay 秒后逐段输出，最后一段附带用量统计"""
+
+    def __init__(self, parts=("东京", "三到", "五天"), first_delay=0.05, usage=None, fail_after=None):
+        super().__init__()
+        self.parts = parts
+        self.first_delay = first_delay
+        self.usage = usage
+        self.fail_after = fail_after
+
+    def _chunks(self):
+        for i, part in enumerate(self.parts):
+            if i == self.fail_after:
+                raise ConnectionError("连接中断")
+            last = i == len(self.parts) - 1
+            yield SimpleNamespace(content=part, usage_metadata=self.usage if last else None)
+
+    def stream(self, messages, **kwargs):
+        self.calls.append(list(messages))
+        time.sleep(self.first_delay)
+        yield from self._chunks()
+
+    async def astream(self, messages, **kwargs):
+        self.calls.append(list(messages))
+        await asyncio.sleep(self.first_delay)
+        for chunk in self._chunks():
+            yield chunk
+
+
+def make_assistant(model):
+    return TravelAssistant(client=model, summarize_history=False, use_tools=False)
+
+
+def test_achat_matches_chat():
+    """异步对话与同步对话的回复和历史一致"""
+    sync_assistant = make_assistant(EchoModel())
+    async_assistant = make_assistant(EchoModel())
+    sync_reply = sync_assistant.chat("去东京玩几天合适？")
+    async_reply = asyncio.run(async_assistant.achat("去东京玩几天合适？"))
+    assert async_reply == sync_reply == "收到: 去东京玩几天合适？"
+    assert async_assistant.conversation_history == sync_assistant.conversation_history
+    print(f"✅ achat: {async_reply}")
+
+
+def test_achat_concurrent_sessions():
+    """多个助手在同一事件循环中并发对话，互不影响"""
+    assistants = [make_assistant(EchoModel()) for _ in range(5)]
+
+    async def run():
+        return await asyncio.gather(*(a.achat(f"问题{i}") for i, a in enumerate(assistants)))
+
+    replies = asyncio.run(run())
+    assert replies == [f"收到: 问题{i}" for i in range(5)]
+    assert all(len(a.conversation_history) == 2 for a in assistants)
+    print(f"✅ {len(replies)} 个并发会话")
+
+
+def test_achat_error_is_friendly():
+    """模型异常转换为友好回复，不写入历史"""
+    assistant = make_assistant(EchoModel(fail=True))
+    reply = asyncio.run(assistant.achat("你好"))
+    assert reply.startswith("抱歉") and "连接失败" in reply
+    assert assistant.conversation_history == []
+    print(f"✅ 异常回复: {reply}")
+
+
+def test_chat_stream_records_metrics():
+    """流式回复逐段产出，拼接后写入历史，并记录首token延迟"""
+    assistant = make_assistant(StreamingModel(first_delay=0.05))
+    parts = list(assistant.chat_stream("去东京玩几天？"))
+    assert parts == ["东京", "三到", "五天"]
+    assert assistant.conversation_history[-1] == {"role": "assistant", "content": "东京三到五天"}
+
+    metrics = assistant.last_metrics
+    assert metrics.time_to_first_token >= 0.05
+    assert metrics.total_time >= metrics.time_to_first_token
+    assert metrics.output_tokens == 3, "没有用量统计时按分段数计"
+    print(f"✅ chat_stream: 首token {metrics.time_to_first_token * 1000:.0f}ms，{metrics.output_tokens} 段")
+
+
+def test_achat_stream_uses_usage_metadata():
+    """异步流式回复与同步一致，优先使用模型返回的输出token数"""
+    assistant = make_assistant(StreamingModel(first_delay=0.02, usage={"output_tokens": 12}))
+
+    async def collect():
+        return [part async for part in assistant.achat_stream("去东京玩几天？")]
+
+    assert asyncio.run(collect()) == ["东京", "三到", "五天"]
+    assert assistant.conversation_history[-1]["content"] == "东京三到五天"
+    metrics = assistant.last_metrics
+    assert metrics.output_tokens == 12 and metrics.time_to_first_token >= 0.02
+    print(f"✅ achat_stream: {metrics.output_tokens} tokens，{metrics.tokens_per_second:.0f} tokens/s")
+
+
+def test_stream_error_is_friendly():
+    """流式中途出错时产出友好回复，不写入历史，仍记录指标"""
+    assistant = make_assistant(StreamingModel(first_delay=0, fail_after=1))
+    parts = list(assistant.chat_stream("你好"))
+    assert parts[0] == "东京" and parts[-1].startswith("抱歉") and "连接中断" in parts[-1]
+    assert assistant.conversation_history == []
+    assert assistant.last_metrics is not None and assistant.last_metrics.output_tokens == 1
+    print(f"✅ 流式异常: {parts[-1]}")
+
+
+def test_turn_metrics_tokens_per_second():
+    """生成速度只统计首token之后的时间"""
+    assert TurnMetrics(time_to_first_token=0.5, total_time=2.5, output_tokens=40).tokens_per_second == 20
+    assert TurnMetrics(total_time=1.0, output_tokens=10).tokens_per_second == 0.0
+    assert TurnMetrics(time_to_first_token=1.0, total_time=1.0, output_tokens=10).tokens_per_second == 0.0
+    print("✅ TurnMetrics 生成速度")
+
+
+class BlockingRetriever:
+    """同步阻塞的检索器（模拟向量化HTTP请求）"""
+
+    def __init__(self, delay=0.3):
+        self.delay = delay
+
+    def retrieve(self, query, top_k=None, mode=None):
+        time.sleep(self.delay)
+        return [{"chunk_id": "东京.md#0", "source": "东京.md", "heading": "东京", "text": "成田机场乘Skyliner进城"}]
+
+
+def test_async_paths_do_not_block_event_loop():
+    """achat / achat_stream 的同步检索在线程中执行，事件循环照常调度其他任务"""
+    async def run(turn):
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        task = asyncio.create_task(ticker())
+        await asyncio.sleep(0)
+        await turn()
+        task.cancel()
+        return ticks
+
+    assistant = TravelAssistant(client=StreamingModel(first_delay=0), summarize_history=False,
+                                use_tools=False, retriever=BlockingRetriever())
+
+    async def stream_turn():
+        return [part async for part in assistant.achat_stream("东京机场怎么进城？")]
+
+    for turn in (lambda: assistant.achat("东京机场怎么进城？"), stream_turn):
+        ticks = asyncio.run(run(turn))
+        assert ticks >= 10, f"检索期间事件循环被阻塞（只调度了 {ticks} 次）"
+    assert "Skyliner" in assistant.client.calls[-1][1]["content"], "检索资料应注入上下文"
+    print(f"✅ 异步对话中的检索不阻塞事件循环（{ticks} 次调度）")
+
+
+if __name__ == "__main__":
+    test_achat_matches_chat()
+    test_achat_concurrent_sessions()
+    test_achat_error_is_friendly()
+    test_chat_stream_records_metrics()
+    test_achat_stream_uses_usage_metadata()
+    test_stream_error_is_friendly()
+    test_turn_metrics_tokens_per_second()
+    test_async_paths_do_not_block_event_loop()
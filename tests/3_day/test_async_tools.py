@@ -0,0 +1,153 @@
+"""异步工具测试"""
+
+import asyncio
+import inspect
+import sys
+import threading
+import time
+# sys.path.append('src')
+
+from src.core.tools.execution import ToolTimeoutError
+from src.core.tools.tool_registry import ToolRegistry
+from src.core.tools.validators import ToolValidationError
+
+
+def make_registry():
+    registry = ToolRegistry()
+
+    @registry.register(name="search_flights", description="查询航班", timeout=0.5)
+    async def search_flights(origin: str, destination: str, delay: float = 0.1) -> dict:
+        await asyncio.sleep(delay)
+        return {"航线": f"{origin}-{destination}"}
+
+    @registry.register(name="blocking_lookup", description="阻塞查询")
+    def blocking_lookup(seconds: float) -> str:
+        time.sleep(seconds)
+        return "ok"
+
+    return registry, search_flights
+
+
+def test_coroutine_detection():
+    """注册时识别异步函数，包装后仍是协程函数"""
+    registry, wrapper = make_registry()
+    assert registry.get_tool("search_flights").is_async
+    assert not registry.get_tool("blocking_lookup").is_async
+    assert inspect.iscoroutinefunction(wrapper)
+    print("✅ 识别异步工具")
+
+
+def test_async_tools_run_concurrently():
+    """多个异步工具调用在同一事件循环中并发执行"""
+    registry, _ = make_registry()
+
+    async def run():
+        calls = [("search_flights", {"origin": "北京", "destination": city}) for city in ["东京", "巴黎", "悉尼", "曼谷", "伦敦"]]
+        return await registry.aexecute_many(calls)
+
+    start = time.perf_counter()
+    results = asyncio.run(run())
+    elapsed = time.perf_counter() - start
+    assert [r["航线"] for r in results] == ["北京-东京", "北京-巴黎", "北京-悉尼", "北京-曼谷", "北京-伦敦"]
+    assert elapsed < 0.3, elapsed
+    print(f"✅ 5个异步调用耗时 {elapsed:.2f}s")
+
+
+def test_sync_tool_does_not_block_loop():
+    """同步工具在异步代码中被放到线程池执行"""
+    registry, _ = make_registry()
+    ticks = []
+
+    async def ticker():
+        for _ in range(10):
+            ticks.append(time.perf_counter())
+            await asyncio.sleep(0.02)
+
+    async def run():
+        return await asyncio.gather(registry.aexecute("blocking_lookup", seconds=0.2), ticker())
+
+    result, _ = asyncio.run(run())
+    assert result == "ok"
+    assert len(ticks) == 10 and ticks[-1] - ticks[0] < 0.35
+    print("✅ 同步工具不阻塞事件循环")
+
+
+def test_async_timeout_and_errors():
+    """异步工具超时返回结构化错误，aexecute_many按位置返回错误"""
+    registry, _ = make_registry()
+
+    async def run():
+        return await registry.aexecute_many([
+            {"name": "search_flights", "args": {"origin": "A", "destination": "B", "delay": 2}},
+            {"name": "search_flights", "args": {"origin": "A"}},
+            {"name": "search_flights", "args": {"origin": "A", "destination": "C"}},
+        ])
+
+    timeout, invalid, ok = asyncio.run(run())
+    assert isinstance(timeout, ToolTimeoutError) and timeout.to_dict()["error"] == "timeout"
+    assert isinstance(invalid, ToolValidationError)
+    assert ok == {"航线": "A-C"}
+    print("✅ 异步超时与逐项错误")
+
+
+def test_sync_execute_of_async_tool():
+    """在事件循环之外也可以同步执行异步工具"""
+    registry, _ = make_registry()
+    assert registry.execute("search_flights", origin="上海", destination="东京", delay=0) == {"航线": "上海-东京"}
+    print("✅ 同步执行异步工具")
+
+
+def test_async_tool_rejects_process_executor():
+    registry = ToolRegistry()
+    try:
+        @registry.register(name="bad", executor="process")
+        async def bad() -> str:
+            return ""
+        assert False
+    except ValueError:
+        pass
+    print("✅ 异步工具不支持进程池")
+
+
+def test_cancelled_waiter_does_not_leak_slot():
+    """等待并发名额的调用被取消后，名额不会泄漏"""
+    registry = ToolRegistry()
+    gate = threading.Event()
+
+    @registry.register(name="single_slot", description="单并发工具", max_concurrency=1)
+    def single_slot(wait: bool) -> str:
+        if wait:
+            gate.wait(timeout=2)
+        return "ok"
+
+    holder = threading.Thread(target=registry.execute, args=("single_slot",), kwargs={"wait": True})
+    holder.start()
+    time.sleep(0.05)
+
+    async def cancel_waiters():
+        waiters = [asyncio.ensure_future(registry.aexecute("single_slot", wait=False)) for _ in range(3)]
+        await asyncio.sleep(0.05)
+        for waiter in waiters:
+            waiter.cancel()
+        await asyncio.gather(*waiters, return_exceptions=True)
+
+    asyncio.run(cancel_waiters())
+    gate.set()
+    holder.join()
+    time.sleep(0.05)  # 等待线程中拿到名额的等待者归还
+
+    executor = registry.get_tool("single_slot").runner
+    assert executor._semaphore.acquire(blocking=False), "名额应已全部归还"
+    executor._semaphore.release()
+    assert asyncio.run(registry.aexecute("single_slot", wait=False)) == "ok"
+    print("✅ 取消等待名额的调用不泄漏名额")
+
+
+if __name__ == "__main__":
+    test_coroutine_detection()
+    test_async_tools_run_concurrently()
+    test_sync_tool_does_not_block_loop()
+    test_async_timeout_and_errors()
+    test_sync_execute_of_async_tool()
+    test_async_tool_rejects_process_executor()
+    test_cancelled_waiter_does_not_leak_slot()
@@ -0,0 +1,101 @@
+"""批量预算计算测试与基准"""
+
+import sys
+import time
+# sys.path.append('src')
+
+from src.tools.basic_tools import calculate_budget
+from src.tools.budget_engine import LEVEL_MULTIPLIERS, MAX_GRID_ROWS, TABLE_COLUMNS, budget_engine
+from src.core.tools.execution import ToolExecutionError
+from src.core.tools.tool_registry import tool_registry
+from src.core.tools.validators import ToolValidationError
+
+DESTINATIONS = ["东京", "巴黎", "纽约", "曼谷", "巴厘岛", "悉尼", "伦敦", "新加坡", "未知城市"]
+LEVELS = list(LEVEL_MULTIPLIERS)
+
+
+def test_batch_matches_scalar():
+    """批量结果与逐个计算逐位相同"""
+    calls = [
+        {"destination": d, "days": n, "travelers": t, "budget_level": lv}
+        for d in DESTINATIONS for n in (1, 3, 7) for t in (1, 2, 5) for lv in LEVELS
+    ]
+    assert budget_engine.compute_many(calls) == [calculate_budget(**c) for c in calls]
+    print(f"✅ {len(calls)} 个组合与标量结果一致")
+
+
+def test_execute_many_uses_batch():
+    """execute_many 中的多个预算调用走批量实现"""
+    tool_registry.clear_cache()
+    calls = [("calculate_budget", {"days": n, "destination": "东京"}) for n in range(1, 6)]
+    results = tool_registry.execute_many(calls)
+    assert [r["总预算"] for r in results] == [150.0, 300.0, 450.0, 600.0, 750.0]
+    print("✅ execute_many 使用批量实现")
+
+
+def test_compare_budgets_table():
+    """compare_budgets 返回紧凑表格"""
+    table = tool_registry.execute("compare_budgets", destinations=["东京", "曼谷"], days=[3, 5], travelers=[2])
+    assert table["columns"] == TABLE_COLUMNS
+    assert len(table["rows"]) == 2 * 2 * 1 * 3
+    first = dict(zip(table["columns"], table["rows"][0]))
+    expected = calculate_budget(days=3, destination="东京", travelers=2, budget_level="经济")
+    assert first["总预算"] == expected["总预算"] and first["住宿"] == expected["预算详情"]["住宿"]
+    print(f"✅ 预算对比表 {len(table['rows'])} 行")
+
+
+def test_compare_budgets_limits():
+    """预算级别按可选值校验，组合数超过上限时报错"""
+    schema = next(s for s in tool_registry.function_schemas() if s["function"]["name"] == "compare_budgets")
+    assert schema["function"]["parameters"]["properties"]["budget_levels"]["items"]["enum"] == LEVELS
+    try:
+        tool_registry.execute("compare_budgets", destinations=["东京"], days=[3], budget_levels=["中等", "超豪华"])
+        raise AssertionError("未知预算级别应报错")
+    except ToolValidationError as e:
+        assert e.errors[0]["param"] == "budget_levels", e.errors
+
+    days = list(range(1, MAX_GRID_ROWS // len(LEVELS) + 2))
+    try:
+        tool_registry.execute("compare_budgets", destinations=["东京"], days=days)
+        raise AssertionError("组合数超过上限应报错")
+    except ToolExecutionError as e:
+        assert "超过上限" in e.message
+    print(f"✅ 预算对比校验级别，上限 {MAX_GRID_ROWS} 个组合")
+
+
+def benchmark_grid(repeat: int = 5):
+    """基准：网格计算 vs 逐个调用 calculate_budget，同时返回两种方式的结果"""
+    days = list(range(1, 31))
+    travelers = [1, 2, 3, 4, 5]
+    combos = [(d, n, t, lv) for d in DESTINATIONS for n in days for t in travelers for lv in LEVELS]
+    budget_engine.grid(DESTINATIONS[:1], days[:1], travelers[:1], LEVELS[:1])  # 预热（构建数组）
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        scalar_results = [calculate_budget(days=n, destination=d, travelers=t, budget_level=lv) for d, n, t, lv in combos]
+    scalar = (time.perf_counter() - start) / repeat
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        table = budget_engine.grid(DESTINATIONS, days, travelers, LEVELS)
+    vectorized = (time.perf_counter() - start) / repeat
+    return scalar_results, table, scalar, vectorized
+
+
+def test_benchmark():
+    scalar_results, table, scalar, vectorized = benchmark_grid()
+    # 耗时只作参考输出（受机器负载影响），断言两种方式的结果相同
+    print(f"📊 {len(scalar_results)} 个组合: 标量循环 {scalar * 1000:.2f}ms, 向量化 {vectorized * 1000:.2f}ms, "
+          f"加速 {scalar / vectorized:.1f}x")
+    expected = [
+        [r["目的地"], r["旅行天数"], r["旅行人数"], r["预算级别"], r["每人每天预算"], r["总预算"], *r["预算详情"].values()]
+        for r in scalar_results
+    ]
+    assert table["rows"] == expected, "向量化网格应与逐个计算的结果相同"
+
+if __name__ == "__main__":
+    test_batch_matches_scalar()
+    test_execute_many_uses_batch()
+    test_compare_budgets_table()
+    test_compare_budgets_limits()
+    test_benchmark()
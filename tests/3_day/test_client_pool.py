@@ -0,0 +1,111 @@
+"""LLM客户端池测试"""
+
+import asyncio
+import gc
+import sys
+import threading
+# sys.path.append('src')
+
+from src.core.llm_client import ClientPool
+
+
+def test_pool_reuses_client_per_key():
+    """相同配置键复用同一实例，不同键创建新实例"""
+    pool = ClientPool(max_connections=10, max_keepalive_connections=5)
+    created = []
+
+    def factory():
+        created.append(object())
+        return created[-1]
+
+    key = ("ollama", "qwen", "http://localhost:11434", 0, 2000, 30)
+    first = pool.get_or_create(key, factory)
+    second = pool.get_or_create(key, factory)
+    other = pool.get_or_create(key[:3] + (0.7, 2000, 30), factory)
+
+    assert first is second, "相同配置应复用客户端"
+    assert other is not first, "不同温度应创建新客户端"
+    assert len(created) == 2
+    assert pool.stats() == {"clients": 2, "hits": 1, "misses": 2}
+    print(f"✅ 客户端池统计: {pool.stats()}")
+
+
+def test_pool_concurrent_creation():
+    """并发获取同一键只创建一次"""
+    pool = ClientPool()
+    created = []
+
+    def factory():
+        created.append(object())
+        return created[-1]
+
+    threads = [
+        threading.Thread(target=pool.get_or_create, args=(("zhipu",), factory))
+        for _ in range(20)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(created) == 1, f"预期只创建1次，实际{len(created)}次"
+    print("✅ 并发创建只发生一次")
+
+
+def test_pool_clear():
+    """清空后重新创建"""
+    pool = ClientPool()
+    pool.get_or_create(("k",), object)
+    pool.clear()
+    assert pool.stats()["clients"] == 0
+    print("✅ 客户端池已清空")
+
+
+class FakeChatModel:
+    """模拟持有共享HTTP客户端的ChatOpenAI"""
+
+    def __init__(self, http):
+        self.http = http
+
+
+def test_clear_keeps_http_open_while_in_use():
+    """重置连接池后，仍被持有的客户端可以继续使用旧连接，不再被持有时才关闭"""
+    pool = ClientPool()
+    holder = pool.get_or_create(("zhipu",), lambda: pool.bind_http(FakeChatModel(pool.http_client(5))))
+    http = holder.http
+    pool.configure(max_connections=50)
+    assert not http.is_closed, "仍被使用的HTTP客户端不应被关闭"
+    assert pool.http_client(5) is not http, "重置后应创建新的共享客户端"
+
+    del holder
+    gc.collect()
+    assert http.is_closed, "不再被使用的HTTP客户端应被关闭"
+
+    # 没有客户端使用时立即关闭
+    idle = pool.http_client(5)
+    pool.clear()
+    assert idle.is_closed
+    print("✅ 共享HTTP客户端在不再被使用后关闭")
+
+
+def test_async_http_client_per_event_loop():
+    """异步客户端在每个事件循环中各用一组连接"""
+    pool = ClientPool()
+    shared = pool.async_http_client(5)
+
+    async def current():
+        return shared.for_current_loop(), shared.for_current_loop()
+
+    first, again = asyncio.run(current())
+    second, _ = asyncio.run(current())
+    assert first is again, "同一事件循环内复用"
+    assert first is not second, "不同事件循环使用不同的连接"
+    print("✅ 异步客户端按事件循环隔离")
+
+
+if __name__ == "__main__":
+    test_pool_reuses_client_per_key()
+    test_pool_concurrent_creation()
+    test_pool_clear()
+    test_clear_keeps_http_open_while_in_use()
+    test_async_http_client_per_event_loop()
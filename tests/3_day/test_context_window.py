@@ -0,0 +1,83 @@
+"""按token预算构建上下文测试"""
+
+import sys
+# sys.path.append('src')
+
+from src.core.context_window import ContextBuilder, estimate_tokens
+
+
+def test_estimate_tokens():
+    """中文按字计数，英文按4字符计数"""
+    assert estimate_tokens("东京") == 2
+    assert estimate_tokens("abcd") == 1
+    assert estimate_tokens("") == 0
+    print("✅ token估算正确")
+
+
+def test_build_fills_newest_first():
+    """从最新消息开始填充，直到预算用完"""
+    builder = ContextBuilder(max_context_tokens=100, reserve_output_tokens=40,
+                             tokenizer=len, per_message_overhead=0)
+    system = [{"role": "system", "content": "s" * 10}]
+    history = [
+        {"role": "user", "content": "a" * 30},
+        {"role": "assistant", "content": "b" * 20},
+        {"role": "user", "content": "c" * 15},
+        {"role": "assistant", "content": "e" * 10},
+    ]
+    user = {"role": "user", "content": "d" * 5}
+
+    # 预算 60 - 10(system) - 5(user) = 45，只能放下最新的一轮对话
+    messages = builder.build(system, history, user)
+    assert messages == [system[0], history[2], history[3], user], messages
+    print(f"✅ 上下文包含 {len(messages)} 条消息，共 {builder.count_messages(messages)} tokens")
+
+
+def test_long_message_is_not_included():
+    """一条超长回复不会撑爆上下文"""
+    builder = ContextBuilder(max_context_tokens=50, reserve_output_tokens=0,
+                             tokenizer=len, per_message_overhead=0)
+    history = [{"role": "assistant", "content": "x" * 1000}]
+    kept, dropped = builder.select_history(history, builder.prompt_budget)
+    assert kept == [] and dropped == history
+    print("✅ 超长消息被排除")
+
+
+def test_cut_keeps_question_with_reply():
+    """预算落在一问一答之间时，整轮对话一起移出，不保留没有提问的回复"""
+    builder = ContextBuilder(max_context_tokens=100, reserve_output_tokens=0,
+                             tokenizer=len, per_message_overhead=0)
+    history = [
+        {"role": "user", "content": "a" * 30},
+        {"role": "assistant", "content": "b" * 20},
+        {"role": "user", "content": "c" * 15},
+        {"role": "assistant", "content": "e" * 10},
+    ]
+    # 预算 40 能放下最新的三条，但第二条是助手回复，截断点后移到下一条用户消息
+    kept, dropped = builder.select_history(history, 40)
+    assert kept == history[2:] and dropped == history[:2]
+    print("✅ 只在用户消息处截断")
+
+
+def test_counts_are_cached():
+    """同一内容只计数一次"""
+    calls = []
+
+    def tokenizer(text):
+        calls.append(text)
+        return len(text)
+
+    builder = ContextBuilder(max_context_tokens=100, tokenizer=tokenizer)
+    msg = {"role": "user", "content": "你好"}
+    for _ in range(5):
+        builder.count_message(msg)
+    assert len(calls) == 1
+    print("✅ 消息token数已缓存")
+
+
+if __name__ == "__main__":
+    test_estimate_tokens()
+    test_build_fills_newest_first()
+    test_long_message_is_not_included()
+    test_cut_keeps_question_with_reply()
+    test_counts_are_cached()
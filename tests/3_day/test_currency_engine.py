@@ -0,0 +1,161 @@
+"""汇率引擎测试"""
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+# sys.path.append('src')
+
+from src.core.tools.execution import ToolExecutionError
+from src.core.tools.tool_registry import tool_registry
+from src.tools.basic_tools import convert_currency
+from src.tools.currency_engine import DEFAULT_RATES_PATH, CurrencyEngine, UnsupportedCurrencyError
+
+
+def test_direct_and_identity_rates():
+    """直接报价保持原值，相同货币汇率为1且不带备注"""
+    result = convert_currency(1000, "USD", "CNY")
+    assert result["汇率"] == 7.2 and result["转换金额"] == 7200.0
+    same = convert_currency(100, "cny", "CNY")
+    assert same == {"原始金额": 100, "原始货币": "CNY", "目标货币": "CNY", "汇率": 1.0, "转换金额": 100}
+    print("✅ 直接报价与相同货币")
+
+
+def test_cross_rate():
+    """JPY→AUD 通过USD推导，而不是返回默认的1.0"""
+    result = convert_currency(10000, "JPY", "AUD")
+    assert result["换算路径"] == "JPY→USD→AUD", result
+    assert abs(result["汇率"] - round(0.0067 * 1.52, 4)) < 1e-9
+    assert result["转换金额"] == round(10000 * 0.0067 * 1.52, 2)
+    # 只有单向报价时取倒数
+    assert abs(CurrencyEngine().rate("AUD", "USD") - 1 / 1.52) < 1e-12
+    print(f"✅ 交叉汇率: {result}")
+
+
+def test_unsupported_currency():
+    try:
+        convert_currency(1, "XYZ", "CNY")
+        assert False
+    except UnsupportedCurrencyError as e:
+        assert "XYZ" in str(e)
+    print("✅ 不支持的货币报错")
+
+
+def test_refresh_rebuilds_only_on_change():
+    """报价文件变化时重建汇率表，内容不变时不重建"""
+    tmp = tempfile.mkdtemp()
+    try:
+        path = os.path.join(tmp, "rates.json")
+        shutil.copy(DEFAULT_RATES_PATH, path)
+        engine = CurrencyEngine(path, check_interval=0)
+        assert engine.rate("USD", "CNY") == 7.2
+        assert engine.refresh() is False
+
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        data["pairs"][0][2] = 7.1
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.utime(path, (0, 12345))
+        assert engine.rate("USD", "CNY") == 7.1
+        print("✅ 文件更新后自动重建")
+    finally:
+        shutil.rmtree(tmp)
+
+
+def test_bulk_conversion():
+    """批量换算与逐个换算一致"""
+    engine = CurrencyEngine()
+    amounts = [1, 10.5, 999.99, 12345]
+    assert engine.convert_many(amounts, "EUR", "THB") == [round(a * engine.rate("EUR", "THB"), 2) for a in amounts]
+
+    calls = [("convert_currency", {"amount": a, "from_currency": src, "to_currency": dst})
+             for a in amounts for src, dst in [("USD", "CNY"), ("JPY", "AUD"), ("GBP", "SGD")]]
+    tool_registry.clear_cache()
+    assert tool_registry.execute_many(calls) == [convert_currency(**args) for _, args in calls]
+
+    currencies, matrix = engine.rates_table()
+    assert matrix.shape == (len(currencies), len(currencies))
+    print(f"✅ 批量换算，全部 {len(currencies)}×{len(currencies)} 货币对已预计算")
+
+
+def test_mixed_batch_fails_only_bad_rows():
+    """批量换算中不支持的货币只让对应的行失败"""
+    engine = CurrencyEngine()
+    rows = engine.convert_rows([100, 5, 20], ["USD", "XYZ", "EUR"], ["JPY", "JPY", "CNY"])
+    assert rows[0] == engine.convert(100, "USD", "JPY") and rows[2] == engine.convert(20, "EUR", "CNY")
+    assert isinstance(rows[1], UnsupportedCurrencyError) and "XYZ" in str(rows[1])
+
+    tool_registry.clear_cache()
+    calls = [("convert_currency", {"amount": 100, "from_currency": "USD", "to_currency": "JPY"}),
+             ("convert_currency", {"amount": 5, "from_currency": "XYZ", "to_currency": "JPY"}),
+             ("convert_currency", {"amount": 20, "from_currency": "EUR", "to_currency": "CNY"})]
+    results = tool_registry.execute_many(calls)
+    assert results[0] == convert_currency(100, "USD", "JPY") and results[2] == convert_currency(20, "EUR", "CNY")
+    assert isinstance(results[1], ToolExecutionError) and "XYZ" in results[1].message
+    print("✅ 混合批量换算只有出错的行失败")
+
+
+def test_reload_during_reads():
+    """重新加载汇率表时，并发读取不会拿到不一致的货币下标和矩阵"""
+    tmp = tempfile.mkdtemp()
+    try:
+        path = os.path.join(tmp, "rates.json")
+        with open(DEFAULT_RATES_PATH, encoding="utf-8") as f:
+            full = json.load(f)
+        small = dict(full, pairs=[p for p in full["pairs"] if "USD" in p[:2]][:2])
+        # 只由写入线程重新加载
+        engine = CurrencyEngine(path, check_interval=3600)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(full, f)
+        engine.refresh(force=True)
+
+        stop = threading.Event()
+        errors = []
+
+        def reload():
+            for i in range(200):
+                with open(path, "w", encoding="utf-8") as f:
+                    json.dump(small if i % 2 == 0 else full, f)
+                engine.refresh(force=True)
+            stop.set()
+
+        def read():
+            # 两份报价中 USD→CNY 都是直接报价 7.2，下标与矩阵不一致时会读到别的货币对
+            while not stop.is_set():
+                try:
+                    rate = engine.rate("USD", "CNY")
+                    row = engine.convert_rows([1], ["USD"], ["CNY"])[0]
+                except Exception as e:
+                    errors.append(e)
+                    return
+                if rate != 7.2 or row["汇率"] != 7.2:
+                    errors.append((rate, row))
+                    return
+
+        interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+        try:
+            threads = [threading.Thread(target=read) for _ in range(3)] + [threading.Thread(target=reload)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+        finally:
+            sys.setswitchinterval(interval)
+        assert not errors, errors
+        print("✅ 并发重新加载与读取")
+    finally:
+        shutil.rmtree(tmp)
+
+
+if __name__ == "__main__":
+    test_direct_and_identity_rates()
+    test_cross_rate()
+    test_unsupported_currency()
+    test_refresh_rebuilds_only_on_change()
+    test_bulk_conversion()
+    test_mixed_batch_fails_only_bad_rows()
+    test_reload_during_reads()
@@ -0,0 +1,160 @@
+"""批量工具调用测试"""
+
+import asyncio
+import sys
+import threading
+import time
+# sys.path.append('src')
+
+from src.core.tools.execution import ToolExecutionError, ToolTimeoutError
+from src.core.tools.tool_registry import ToolRegistry
+from src.core.tools.validators import ToolValidationError
+
+
+def make_registry():
+    registry = ToolRegistry()
+    counts = {"slow": 0, "batch": 0, "scalar": 0}
+    lock = threading.Lock()
+
+    @registry.register(name="slow_square", description="慢速平方")
+    def slow_square(n: int) -> int:
+        with lock:
+            counts["slow"] += 1
+        time.sleep(0.1)
+        return n * n
+
+    @registry.register(name="price", description="价格", cache=True)
+    def price(days: int, level: str = "中等") -> float:
+        counts["scalar"] += 1
+        return days * {"经济": 70.0, "中等": 100.0}[level]
+
+    @registry.register_batch("price")
+    def price_batch(calls):
+        counts["batch"] += 1
+        return [c["days"] * {"经济": 70.0, "中等": 100.0}[c.get("level", "中等")] for c in calls]
+
+    return registry, counts
+
+
+def test_order_dedupe_and_parallelism():
+    """结果按输入顺序返回，重复调用只执行一次，不同调用并发执行"""
+    registry, counts = make_registry()
+    calls = [("slow_square", {"n": n}) for n in [1, 2, 3, 2, "1", 4]]
+
+    start = time.perf_counter()
+    results = registry.execute_many(calls)
+    elapsed = time.perf_counter() - start
+
+    assert results == [1, 4, 9, 4, 1, 16]
+    assert counts["slow"] == 4, counts
+    assert elapsed < 0.25, elapsed
+    print(f"✅ 6个调用去重为4个，耗时 {elapsed:.2f}s")
+
+
+def test_per_item_errors():
+    """参数错误和未知工具在对应位置返回，不影响其他调用"""
+    registry, counts = make_registry()
+    results = registry.execute_many([
+        {"name": "slow_square", "args": {"n": 3}},
+        {"name": "slow_square", "args": {"n": "x"}},
+        {"name": "missing", "args": {}},
+    ])
+    assert results[0] == 9
+    assert isinstance(results[1], ToolValidationError)
+    assert isinstance(results[2], ValueError)
+
+    try:
+        registry.execute_many([("slow_square", {"n": 5}), ("slow_square", {})], return_exceptions=False)
+        assert False
+    except ToolValidationError:
+        pass
+    assert counts["slow"] == 1, "有参数错误时不应执行任何调用"
+    print("✅ 逐项错误与预先校验")
+
+
+def test_batch_implementation():
+    """有批量实现的工具一次算完，并写入结果缓存"""
+    registry, counts = make_registry()
+    calls = [("price", {"days": d, "level": lv}) for d in range(1, 9) for lv in ["经济", "中等"]]
+    results = registry.execute_many(calls)
+    assert results[:2] == [70.0, 100.0] and results[-1] == 800.0
+    assert counts["batch"] == 1 and counts["scalar"] == 0, counts
+
+    assert registry.execute("price", days=8) == 800.0
+    assert counts["scalar"] == 0, "批量结果应写入缓存"
+    print("✅ 批量实现一次计算16个调用")
+
+
+def test_async_execute_many():
+    """异步版本同样去重并使用批量实现"""
+    registry, counts = make_registry()
+
+    async def run():
+        return await registry.aexecute_many(
+            [("slow_square", {"n": 2}), ("slow_square", {"n": 2}), ("price", {"days": 1}), ("price", {"days": 2})],
+            max_concurrency=4,
+        )
+
+    assert asyncio.run(run()) == [4, 4, 100.0, 200.0]
+    assert counts["slow"] == 1 and counts["batch"] == 1
+    print("✅ 异步批量调用")
+
+
+def test_batch_error_falls_back_to_single_calls():
+    """批量实现出错时逐个调用，只有出错的调用失败"""
+    registry, counts = make_registry()
+    results = registry.execute_many([("price", {"days": 1}), ("price", {"days": 2, "level": "豪华"}),
+                                     ("price", {"days": 3, "level": "经济"})])
+    assert results[0] == 100.0 and results[2] == 210.0, results
+    assert isinstance(results[1], ToolExecutionError)
+    assert counts["batch"] == 1 and counts["scalar"] == 3, counts
+
+    async def run():
+        return await registry.aexecute_many([("price", {"days": 4}), ("price", {"days": 5, "level": "豪华"})])
+
+    results = asyncio.run(run())
+    assert results[0] == 400.0 and isinstance(results[1], ToolExecutionError)
+    print("✅ 批量失败后逐个调用")
+
+
+def test_batch_uses_execution_policy():
+    """批量实现同样受工具的超时和并发限制约束"""
+    registry = ToolRegistry()
+    active = {"now": 0, "max": 0}
+    lock = threading.Lock()
+
+    @registry.register(name="double", description="加倍", timeout=0.2, max_concurrency=1)
+    def double(n: int) -> int:
+        return n * 2
+
+    @registry.register_batch("double")
+    def double_batch(calls):
+        with lock:
+            active["now"] += 1
+            active["max"] = max(active["max"], active["now"])
+        time.sleep(0.5 if any(c["n"] < 0 for c in calls) else 0.05)
+        with lock:
+            active["now"] -= 1
+        return [c["n"] * 2 for c in calls]
+
+    results = registry.execute_many([("double", {"n": -1}), ("double", {"n": -2})])
+    assert all(isinstance(r, ToolTimeoutError) for r in results), results
+    time.sleep(0.5)
+
+    batches = [[("double", {"n": i}), ("double", {"n": i + 100})] for i in range(3)]
+    threads = [threading.Thread(target=registry.execute_many, args=(b,)) for b in batches]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert active["max"] == 1, active
+    print("✅ 批量调用应用超时与并发限制")
+
+
+if __name__ == "__main__":
+    test_order_dedupe_and_parallelism()
+    test_per_item_errors()
+    test_batch_implementation()
+    test_async_execute_many()
+    test_batch_error_falls_back_to_single_calls()
+    test_batch_uses_execution_policy()
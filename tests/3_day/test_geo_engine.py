@@ -0,0 +1,77 @@
+"""城市坐标索引与距离计算测试"""
+
+import sys
+import time
+# sys.path.append('src')
+
+from src.tools.basic_tools import estimate_travel_time, travel_distance_matrix
+from src.tools.geo_engine import CityIndex, UnknownCityError, city_index
+
+
+def test_known_distances():
+    """大圆距离与公开数据接近，别名可以查到同一城市"""
+    assert abs(city_index.distance("伦敦", "巴黎") - 344) < 5
+    assert abs(city_index.distance("Tokyo", "sydney") - 7823) < 30
+    assert city_index.distance("北京市", "Shanghai") == city_index.distance("上海", "北京")
+    print(f"✅ 北京-上海 {city_index.distance('北京', '上海'):.0f}km")
+
+
+def test_travel_time_is_deterministic():
+    """未收录线路按坐标计算，结果确定；实测线路距离仍然优先"""
+    first = estimate_travel_time("成都", "曼谷")
+    assert first == estimate_travel_time("成都", "曼谷")
+    assert first["估算距离"] == f"{round(city_index.distance('成都', '曼谷'))}公里"
+    assert estimate_travel_time("Beijing", "Shanghai", "高铁")["估算距离"] == "1318公里"
+    print(f"✅ 成都→曼谷: {first['估算距离']} {first['估算时间']}")
+
+
+def test_travel_time_unknown_and_same_city():
+    """未收录的城市返回明确说明；同一城市（含别名）不估算3小时的飞行"""
+    unknown = estimate_travel_time("北京", "不存在的城市")
+    assert "估算距离" not in unknown and "未收录: 不存在的城市" in unknown["说明"], unknown
+    assert "未收录" in estimate_travel_time("某地", "另一地", "高铁")["说明"]
+    try:
+        city_index.distance("北京", "不存在的城市")
+        assert False
+    except UnknownCityError:
+        pass
+
+    for origin, destination in [("北京", "北京"), ("北京", "Beijing"), ("不存在的城市", "不存在的城市")]:
+        same = estimate_travel_time(origin, destination)
+        assert same["估算距离"] == "0公里" and same["总小时数"] == 0, same
+    print(f"✅ 未收录城市: {unknown['说明']}")
+
+
+def test_distance_matrix_matches_pairs():
+    """N×M距离矩阵与逐对计算一致"""
+    origins = ["北京", "上海", "东京"]
+    destinations = ["巴黎", "纽约", "悉尼", "曼谷"]
+    matrix = city_index.distance_matrix(origins, destinations)
+    assert matrix.shape == (3, 4)
+    for i, o in enumerate(origins):
+        for j, d in enumerate(destinations):
+            assert abs(matrix[i, j] - city_index.distance(o, d)) < 1e-6
+
+    table = travel_distance_matrix(["Beijing"], ["东京", "首尔"])
+    assert table["出发地"] == ["北京"] and len(table["距离公里"][0]) == 2
+    print("✅ 距离矩阵与逐对计算一致")
+
+
+def test_matrix_speed():
+    """全部城市两两距离一次算完"""
+    index = CityIndex()
+    assert len(index) >= 50
+    names = index.names
+    start = time.perf_counter()
+    matrix = index.distance_matrix(names, names)
+    elapsed = time.perf_counter() - start
+    assert abs(matrix - matrix.T).max() < 1e-6 and abs(matrix.diagonal()).max() < 1e-9
+    print(f"📊 {len(names)}×{len(names)} 距离矩阵耗时 {elapsed * 1000:.2f}ms")
+
+
+if __name__ == "__main__":
+    test_known_distances()
+    test_travel_time_is_deterministic()
+    test_travel_time_unknown_and_same_city()
+    test_distance_matrix_matches_pairs()
+    test_matrix_speed()
@@ -0,0 +1,72 @@
+"""导入开销测试：检查按需导入，并报告 python -X importtime 的耗时"""
+
+import os
+import subprocess
+import sys
+from typing import List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# 这些提供商相关的包只应在第一次创建客户端时导入
+HEAVY_PREFIXES = ("langchain", "langchain_openai", "langchain_ollama", "openai", "ollama", "httpx")
+
+
+# 子进程在导入完成后输出 sys.modules，用该标记与导入时的输出分开
+MODULES_MARKER = "--sys.modules--"
+
+
+def measure_import(module: str) -> Tuple[float, List[str], str]:
+    """
+    在子进程中导入模块，解析 -X importtime 的输出并取回导入后的 sys.modules
+
+    Returns:
+        (模块累计导入耗时毫秒, 导入后 sys.modules 中的模块名, 导入时的标准输出)
+    """
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    script = f"import {module}, sys; print({MODULES_MARKER!r}); print(','.join(sorted(sys.modules)))"
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", script],
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    assert result.returncode == 0, result.stderr[-2000:]
+
+    cumulative_us = 0
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = [part.strip() for part in line[len("import time:"):].split("|")]
+        if name == module:
+            cumulative_us = int(cumulative)
+
+    stdout, _, loaded = result.stdout.partition(MODULES_MARKER + "\n")
+    return cumulative_us / 1000, loaded.strip().split(","), stdout
+
+
+def _check_lazy(module: str):
+    elapsed_ms, modules, stdout = measure_import(module)
+    heavy = sorted(name for name in modules if name.split(".")[0] in HEAVY_PREFIXES)
+
+    # 耗时受机器负载影响，只作参考输出，以导入后 sys.modules 中有无重量级依赖为准
+    print(f"  {module}: {elapsed_ms:.1f} ms, {len(modules)} 个模块")
+    assert not heavy, f"导入 {module} 时不应加载: {heavy[:5]}"
+    assert stdout == "", f"导入 {module} 时不应有输出: {stdout[:100]}"
+
+
+def test_agent_import_is_lazy():
+    """导入Agent模块不创建助手、不加载LLM提供商"""
+    _check_lazy("src.agents.basic_agent")
+    print("✅ Agent模块按需初始化")
+
+
+def test_tools_import_is_light():
+    """导入工具模块只加载注册表本身"""
+    _check_lazy("src.tools.basic_tools")
+    print("✅ 工具模块导入轻量")
+
+
+if __name__ == "__main__":
+    test_tools_import_is_light()
+    test_agent_import_is_lazy()
@@ -0,0 +1,149 @@
+"""LLM响应缓存测试"""
+
+import os
+import sys
+import tempfile
+import time
+# sys.path.append('src')
+
+from types import SimpleNamespace
+
+from src.agents.basic_agent import TravelAssistant
+from src.core.llm_cache import CachedChatModel, ResponseCache
+from src.core.llm_client import ClientPool, LLMClient
+from src.core.retry import RetryPolicy
+from src.core.tools.tool_registry import ToolRegistry
+
+
+SYSTEM = {"role": "system", "content": "你是一位专业的旅行助手"}
+
+
+def test_key_normalization():
+    """空白差异不影响缓存键，模型和温度影响缓存键"""
+    a = ResponseCache.make_key("ollama", "qwen", 0, [SYSTEM, {"role": "user", "content": "我想去日本旅游"}])
+    b = ResponseCache.make_key("ollama", "qwen", 0, [SYSTEM, {"role": "User", "content": "  我想去日本旅游 "}])
+    c = ResponseCache.make_key("ollama", "qwen", 0.7, [SYSTEM, {"role": "user", "content": "我想去日本旅游"}])
+    assert a == b, "归一化后应得到相同的键"
+    assert a != c, "温度不同应得到不同的键"
+    print("✅ 缓存键归一化正确")
+
+
+def test_lru_and_ttl():
+    """LRU淘汰与TTL过期"""
+    cache = ResponseCache(max_entries=2, ttl=0.05)
+    cache.set("a", "A")
+    cache.set("b", "B")
+    assert cache.get("a") == "A"
+    cache.set("c", "C")  # 淘汰最久未使用的b
+    assert cache.get("b") is None
+    assert cache.get("a") == "A"
+
+    time.sleep(0.06)
+    assert cache.get("a") is None, "过期条目不应命中"
+
+    stats = cache.stats()
+    assert stats["hits"] == 2 and stats["misses"] == 2, stats
+    print(f"✅ LRU/TTL正常，统计: {stats}")
+
+
+def test_disk_tier_survives_restart():
+    """磁盘二级缓存在重建实例后仍可命中"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "llm_cache.sqlite")
+        cache = ResponseCache(db_path=db_path)
+        cache.set("key", "东京推荐浅草寺")
+        cache.close()
+
+        restarted = ResponseCache(db_path=db_path)
+        assert restarted.get("key") == "东京推荐浅草寺"
+        assert restarted.stats()["disk_hits"] == 1
+        restarted.close()
+    print("✅ 磁盘缓存重启后可用")
+
+
+def test_tool_calling_chat_is_cached():
+    """启用工具的 chat() 重复提问时由缓存返回；工具集合变化时不命中"""
+    class TextModel:
+        temperature = 0
+        model_name = "stub"
+
+        def __init__(self):
+            self.calls = []
+
+        def invoke(self, messages, **kwargs):
+            self.calls.append(kwargs)
+            return SimpleNamespace(content="东京春季最适合赏樱", tool_calls=[])
+
+    registry = ToolRegistry()
+
+    @registry.register(name="get_season", description="季节信息")
+    def get_season(destination: str) -> str:
+        return "春季"
+
+    model = TextModel()
+    client = CachedChatModel(model, ResponseCache(), provider="stub")
+
+    def ask(tool_registry):
+        assistant = TravelAssistant(client=client, summarize_history=False, tool_registry=tool_registry)
+        return assistant.chat("东京什么季节去好？")
+
+    assert ask(registry) == ask(registry) == "东京春季最适合赏樱"
+    assert len(model.calls) == 1 and "tools" in model.calls[0], "第二次应由缓存返回"
+
+    other = ToolRegistry()
+    other.register(name="get_time", description="时间")(lambda timezone: "12:00")
+    ask(other)
+    assert len(model.calls) == 2, "工具集合不同不应命中缓存"
+    print(f"✅ 工具调用路径命中缓存: {client.cache.stats()}")
+
+
+def test_tool_calls_in_key_ignore_call_ids():
+    """缓存键包含工具调用的名称和参数，不含随机的调用id"""
+    def history(call_id, days):
+        return [SYSTEM, {"role": "user", "content": "预算"},
+                {"role": "assistant", "content": "", "tool_calls": [{"name": "budget", "args": {"days": days}, "id": call_id}]},
+                {"role": "tool", "content": "300", "tool_call_id": call_id}]
+
+    key = ResponseCache.make_key("ollama", "qwen", 0, history("call_1", 3))
+    assert key == ResponseCache.make_key("ollama", "qwen", 0, history("call_2", 3))
+    assert key != ResponseCache.make_key("ollama", "qwen", 0, history("call_1", 4))
+    assert key != ResponseCache.make_key("ollama", "qwen", 0, history("call_1", 3), {"tools": []})
+    print("✅ 工具调用计入缓存键")
+
+
+def test_client_cache_from_env():
+    """设置 LLM_CACHE_* 环境变量后，默认构造的客户端带响应缓存"""
+    names = ("LLM_CACHE_SIZE", "LLM_CACHE_TTL", "LLM_CACHE_PATH")
+    saved = {k: os.environ.pop(k) for k in names if k in os.environ}
+    with tempfile.TemporaryDirectory() as tmp:
+        try:
+            pool = ClientPool()
+            llm = LLMClient(provider="ollama", pool=pool, fallback_providers=[], retry_policy=RetryPolicy(max_attempts=1))
+            key = ("ollama", os.getenv('OLLAMA_MODEL_NAME'), os.getenv('OLLAMA_BASEURL'),
+                   llm.temperature, llm.max_tokens, llm.timeout)
+            model = SimpleNamespace(temperature=0, model_name="stub")
+            pool.get_or_create(key, lambda: model)
+            assert llm.cache is None and llm.get_clients() is model, "未配置时不启用缓存"
+
+            os.environ.update(LLM_CACHE_SIZE="16", LLM_CACHE_TTL="60",
+                              LLM_CACHE_PATH=os.path.join(tmp, "llm_cache.sqlite"))
+            llm = LLMClient(provider="ollama", pool=pool, fallback_providers=[], retry_policy=RetryPolicy(max_attempts=1))
+            client = llm.get_clients()
+            assert isinstance(client, CachedChatModel) and client.client is model
+            assert llm.cache.max_entries == 16 and llm.cache.ttl == 60
+            assert LLMClient(provider="ollama", pool=pool).cache is llm.cache, "同一配置共用缓存实例"
+            llm.cache.close()
+        finally:
+            for k in names:
+                os.environ.pop(k, None)
+            os.environ.update(saved)
+    print("✅ 环境变量启用响应缓存")
+
+
+if __name__ == "__main__":
+    test_key_normalization()
+    test_lru_and_ttl()
+    test_disk_tier_survives_restart()
+    test_tool_calling_chat_is_cached()
+    test_tool_calls_in_key_ignore_call_ids()
+    test_client_cache_from_env()
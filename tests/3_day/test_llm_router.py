@@ -0,0 +1,198 @@
+"""多提供商路由测试"""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+from types import SimpleNamespace
+# sys.path.append('src')
+
+from src.core.llm_client import ClientPool, LLMClient
+from src.core.llm_router import AllProvidersFailedError, CircuitBreaker, RouterChatModel
+from src.core.retry import RetryPolicy
+
+
+class FakeModel:
+    """可配置延迟和失败的假模型"""
+
+    def __init__(self, name, delay=0.0, fail=False):
+        self.name = name
+        self.delay = delay
+        self.fail = fail
+        self.calls = 0
+        self.cancelled = False
+        self.temperature = 0
+
+    def invoke(self, messages, **kwargs):
+        self.calls += 1
+        if self.fail:
+            raise ConnectionError(f"{self.name} 不可用")
+        return SimpleNamespace(content=self.name)
+
+    async def ainvoke(self, messages, **kwargs):
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        if self.fail:
+            raise ConnectionError(f"{self.name} 不可用")
+        return SimpleNamespace(content=self.name)
+
+    async def astream(self, messages, **kwargs):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise ConnectionError(f"{self.name} 不可用")
+        for token in [self.name, "!"]:
+            yield SimpleNamespace(content=token)
+
+
+def test_failover_on_error():
+    """主提供商出错时转到备用提供商"""
+    router = RouterChatModel([("ollama", FakeModel("ollama", fail=True)), ("zhipu", FakeModel("zhipu"))])
+    assert router.invoke([]).content == "zhipu"
+    assert asyncio.run(router.ainvoke([])).content == "zhipu"
+    assert router.health()["ollama"]["failures"] == 2
+    assert router.temperature == 0, "属性应转发给主提供商"
+    print(f"✅ 故障转移正常: {router.health()}")
+
+
+def test_hedged_request_cancels_loser():
+    """主提供商慢时发起对冲请求，先返回者胜出，慢的被取消"""
+    slow, fast = FakeModel("ollama", delay=1.0), FakeModel("zhipu", delay=0.01)
+    router = RouterChatModel([("ollama", slow), ("zhipu", fast)], hedge_after_ms=50)
+
+    start = time.perf_counter()
+    response = asyncio.run(router.ainvoke([]))
+    elapsed = time.perf_counter() - start
+
+    assert response.content == "zhipu"
+    assert elapsed < 0.5, f"对冲后应很快返回，实际 {elapsed:.2f}s"
+    assert slow.cancelled, "落后的请求应被取消"
+    print(f"✅ 对冲请求 {elapsed * 1000:.0f} ms 返回")
+
+
+def test_hedged_stream():
+    """流式调用按首个分段对冲"""
+    router = RouterChatModel(
+        [("ollama", FakeModel("ollama", delay=1.0)), ("zhipu", FakeModel("zhipu", delay=0.01))],
+        hedge_after_ms=50,
+    )
+
+    async def collect():
+        return [chunk.content async for chunk in router.astream([])]
+
+    assert asyncio.run(collect()) == ["zhipu", "!"]
+    print("✅ 流式对冲正常")
+
+
+def test_circuit_breaker_opens_and_recovers():
+    """连续失败后熔断，恢复时间后放行试探请求"""
+    breaker = CircuitBreaker(failure_threshold=2, recovery_time=0.05)
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN and not breaker.allow()
+    time.sleep(0.06)
+    assert breaker.allow() and breaker.state == CircuitBreaker.HALF_OPEN
+    breaker.record_success(0.1)
+    assert breaker.state == CircuitBreaker.CLOSED
+    print("✅ 熔断器状态切换正常")
+
+
+def test_open_breaker_skips_provider():
+    """熔断的提供商被跳过"""
+    bad = FakeModel("ollama", fail=True)
+    router = RouterChatModel([("ollama", bad), ("zhipu", FakeModel("zhipu"))], failure_threshold=1)
+    router.invoke([])
+    router.invoke([])
+    assert bad.calls == 1, "熔断后不应再请求ollama"
+
+    router = RouterChatModel([("ollama", FakeModel("ollama", fail=True))])
+    try:
+        router.invoke([])
+        assert False, "应该抛出异常"
+    except AllProvidersFailedError:
+        pass
+    print("✅ 熔断后跳过不健康的提供商")
+
+
+def test_candidates_do_not_change_breaker_state():
+    """只有真正发出请求时熔断器才进入half_open，未被尝试的提供商保持open"""
+    router = RouterChatModel([("ollama", FakeModel("ollama")), ("zhipu", FakeModel("zhipu"))],
+                             failure_threshold=1, recovery_time=0)
+    router.breakers["zhipu"].record_failure()
+    assert router.invoke([]).content == "ollama"
+    assert router.breakers["zhipu"].state == CircuitBreaker.OPEN, "没有请求zhipu，不应进入half_open"
+    print("✅ 选择候选不改变熔断状态")
+
+
+def test_half_open_allows_one_probe():
+    """恢复期过后同时只放行一个试探请求"""
+    gate = threading.Event()
+
+    class BlockingModel(FakeModel):
+        def invoke(self, messages, **kwargs):
+            self.calls += 1
+            gate.wait(timeout=2)
+            return SimpleNamespace(content=self.name)
+
+    primary = BlockingModel("ollama")
+    backup = FakeModel("zhipu")
+    router = RouterChatModel([("ollama", primary), ("zhipu", backup)], failure_threshold=1, recovery_time=0)
+    router.breakers["ollama"].record_failure()
+
+    probe = threading.Thread(target=router.invoke, args=([],))
+    probe.start()
+    time.sleep(0.05)
+    assert router.breakers["ollama"].state == CircuitBreaker.HALF_OPEN
+    # 试探期间其他请求转到备用提供商
+    assert [router.invoke([]).content for _ in range(3)] == ["zhipu"] * 3
+    gate.set()
+    probe.join()
+    assert primary.calls == 1 and router.breakers["ollama"].state == CircuitBreaker.CLOSED
+    print("✅ half_open 同时只有一个试探请求")
+
+
+def test_cancelled_probe_is_released():
+    """试探请求被对冲取消后归还名额，之后可以重新试探"""
+    slow, fast = FakeModel("ollama", delay=1.0), FakeModel("zhipu", delay=0.01)
+    router = RouterChatModel([("ollama", slow), ("zhipu", fast)], hedge_after_ms=20,
+                             failure_threshold=1, recovery_time=0)
+    router.breakers["ollama"].record_failure()
+    assert asyncio.run(router.ainvoke([])).content == "zhipu"
+    assert slow.cancelled
+    assert router.breakers["ollama"].state == CircuitBreaker.OPEN and router.breakers["ollama"].available()
+    print("✅ 被取消的试探请求归还名额")
+
+
+def test_unconfigured_fallback_is_skipped():
+    """备用提供商未配置时跳过，不影响主提供商"""
+    saved = {k: os.environ.pop(k) for k in ("ZHIPU_API_KEY", "ZHIPU_BASEURL", "ZHIPU_MODEL_NAME") if k in os.environ}
+    try:
+        pool = ClientPool()
+        llm = LLMClient(provider="ollama", pool=pool, fallback_providers=["zhipu"],
+                        retry_policy=RetryPolicy(max_attempts=1))
+        primary = FakeModel("ollama")
+        key = ("ollama", os.getenv('OLLAMA_MODEL_NAME'), os.getenv('OLLAMA_BASEURL'),
+               llm.temperature, llm.max_tokens, llm.timeout)
+        pool.get_or_create(key, lambda: primary)
+        assert llm.get_clients() is primary
+    finally:
+        os.environ.update(saved)
+    print("✅ 跳过未配置的备用提供商")
+
+
+if __name__ == "__main__":
+    test_failover_on_error()
+    test_hedged_request_cancels_loser()
+    test_hedged_stream()
+    test_circuit_breaker_opens_and_recovers()
+    test_open_breaker_skips_provider()
+    test_candidates_do_not_change_breaker_state()
+    test_half_open_allows_one_probe()
+    test_cancelled_probe_is_released()
+    test_unconfigured_fallback_is_skipped()
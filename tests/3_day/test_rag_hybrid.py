@@ -0,0 +1,188 @@
+"""BM25倒排索引与混合检索测试"""
+
+import math
+import re
+import tempfile
+import time
+from collections import Counter
+from types import SimpleNamespace
+# sys.path.append('src')
+
+import numpy as np
+
+from src.agents.basic_agent import TravelAssistant
+from rag_helpers import CachedEmbedder, make_retriever
+from src.rag import BM25Index, Chunk, Retriever, VectorIndex, reciprocal_rank_fusion
+from src.rag.bm25 import tokenize_keys
+
+
+def naive_tokens(text):
+    """逐字符实现的参考切分：中文1-2字n-gram，英文数字整词"""
+    text = text.lower()
+    tokens = []
+    for run in re.findall(r"[一-鿿]+", text):
+        tokens += list(run) + [run[i:i + 2] for i in range(len(run) - 1)]
+    return tokens + re.findall(r"[a-z0-9]+", text)
+
+
+def naive_bm25(texts, query, k1=1.2, b=0.75):
+    docs = [Counter(naive_tokens(t)) for t in texts]
+    lengths = [sum(d.values()) for d in docs]
+    avgdl = sum(lengths) / len(docs)
+    scores = []
+    for doc, length in zip(docs, lengths):
+        score = 0.0
+        for term in set(naive_tokens(query)):
+            df = sum(term in d for d in docs)
+            if term in doc:
+                idf = math.log1p((len(docs) - df + 0.5) / (df + 0.5))
+                tf = doc[term]
+                score += idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * length / avgdl))
+        scores.append(score)
+    return scores
+
+
+def test_tokenizer():
+    """中文按字符n-gram切分且不跨越文本，英文按整词"""
+    keys, docs = tokenize_keys(["东京塔", "塔Tokyo Tower", ""])
+    assert docs.tolist().count(0) == 5          # 东 京 塔 东京 京塔
+    assert docs.tolist().count(1) == 3          # 塔 tokyo tower
+    assert len(np.unique(keys)) == 7            # "塔"在两个文本中是同一个词项
+    # 大小写不敏感，"塔东"不会跨越文本生成
+    assert set(tokenize_keys(["TOKYO"])[0]) <= set(keys.tolist())
+    assert not set(tokenize_keys(["塔东"])[0]) <= set(keys.tolist())
+    print(f"✅ 切分: {len(keys)} 个词项键")
+
+
+def test_bm25_matches_reference():
+    """数组实现的得分与逐词计算的BM25一致"""
+    texts = ["东京地铁很方便，JR山手线环绕市中心", "巴黎地铁线路密集", "曼谷BTS轻轨和地铁MRT",
+             "悉尼歌剧院", "东京成田机场到市区乘Skyliner", ""]
+    index = BM25Index.build(texts)
+    for query in ["东京地铁", "mrt 轻轨", "机场 skyliner", "不存在"]:
+        assert np.allclose(index.scores(query), naive_bm25(texts, query), atol=1e-5), query
+    indices, scores = index.search("东京地铁", k=3)
+    assert indices[0] == 0 and np.all(np.diff(scores) <= 0)
+    assert len(index.search("不存在", k=3)[0]) == 0
+    # 已删除的文档不返回
+    alive = np.ones(len(texts), dtype=bool)
+    alive[0] = False
+    assert 0 not in index.search("东京地铁", k=3, alive=alive)[0].tolist()
+    print(f"✅ BM25得分与参考实现一致，索引 {index.nbytes} 字节")
+
+
+def test_reciprocal_rank_fusion():
+    """两路都靠前的文档排在最前"""
+    fused = reciprocal_rank_fusion([[1, 2, 3], [3, 1, 4]], k=60)
+    assert [doc for doc, _ in fused] == [1, 3, 2, 4]
+    assert math.isclose(fused[0][1], 1 / 61 + 1 / 62)
+    assert reciprocal_rank_fusion([]) == []
+    print(f"✅ RRF: {fused}")
+
+
+def test_retrieval_modes():
+    """三种模式都能检索；关键词查询在bm25和hybrid下命中正确目的地"""
+    retriever = make_retriever(mode="hybrid")
+    query = "去曼谷的大皇宫要注意什么？"
+    for mode in ("bm25", "hybrid"):
+        passages = retriever.retrieve(query, mode=mode)
+        assert passages[0]["source"] == "曼谷.md" and "大皇宫" in passages[0]["text"], (mode, passages[0])
+    assert retriever.retrieve("London Oyster", mode="bm25")[0]["source"] == "伦敦.md"
+    queries = ["东京成田机场怎么去市区", "巴黎卢浮宫"]
+    for mode in ("vector", "bm25", "hybrid"):
+        assert retriever.retrieve_many(queries, mode=mode) == [retriever.retrieve(q, mode=mode) for q in queries]
+    # 默认模式为构造时指定的模式
+    assert retriever.retrieve(query) == retriever.retrieve(query, mode="hybrid")
+    try:
+        retriever.retrieve(query, mode="sparse")
+        raise AssertionError("未知模式应报错")
+    except ValueError:
+        pass
+    print(f"✅ 混合检索: {retriever.retrieve(query)[0]['chunk_id']}")
+
+
+def test_bm25_skips_deleted_rows():
+    """增量导入标记删除的行不会被BM25返回"""
+    retriever = make_retriever()
+    top = retriever.retrieve("曼谷大皇宫", mode="bm25")[0]
+    row = next(i for i in range(len(retriever.index)) if retriever.index.chunk(i).chunk_id == top["chunk_id"])
+    index = VectorIndex.delete(retriever.index.index_dir, [row])
+    retriever = Retriever(index, retriever.embedder)
+    assert all(p["chunk_id"] != top["chunk_id"] for p in retriever.retrieve("曼谷大皇宫", mode="bm25"))
+    print("✅ BM25跳过已删除的片段")
+
+
+def test_assistant_rag_mode():
+    """助手按 rag_mode 检索资料"""
+    seen = []
+
+    class Model:
+        def invoke(self, messages, **kwargs):
+            return SimpleNamespace(content="好的", tool_calls=[])
+
+    class RecordingRetriever:
+        def retrieve(self, query, top_k=None, mode=None):
+            seen.append(mode)
+            return []
+
+    assistant = TravelAssistant(client=Model(), summarize_history=False, use_tools=False,
+                                retriever=RecordingRetriever(), rag_mode="bm25")
+    assistant.chat("曼谷大皇宫")
+    assert seen == ["bm25"]
+    print("✅ 助手检索模式: bm25")
+
+
+def test_search_tool_registered():
+    """检索工具的 mode 参数以枚举形式暴露给模型"""
+    from src.core.tools.tool_registry import tool_registry
+    import src.tools.basic_tools  # noqa: F401
+    schema = next(s for s in tool_registry.function_schemas() if s["function"]["name"] == "search_travel_guides")
+    assert set(schema["function"]["parameters"]["properties"]["mode"]["enum"]) == {"hybrid", "vector", "bm25"}
+    print("✅ 工具 search_travel_guides 已注册")
+
+
+def benchmark_bm25(n: int = 20000, queries: int = 30):
+    """基准：n个片段的BM25构建耗时、每个片段的内存，以及三种模式的查询中位数"""
+    guides = make_retriever().index
+    texts = [guides.chunk(i).passage for i in range(len(guides))]
+    # 合成语料：截取不同位置和长度，避免大量完全相同的片段
+    chunks = [Chunk(f"synthetic#{i}", "synthetic", "",
+                    texts[i % len(texts)][(i // len(texts)) % 40:][: 60 + i % 120]) for i in range(n)]
+
+    start = time.perf_counter()
+    bm25 = BM25Index.build([c.passage for c in chunks])
+    build_time = time.perf_counter() - start
+
+    embedder = CachedEmbedder()
+    retriever = Retriever(VectorIndex.build(tempfile.mkdtemp(), iter(chunks), embedder, batch_size=4096), embedder)
+    retriever._bm25, retriever._alive = bm25, retriever.index.alive_mask()
+
+    samples = ["东京机场交通", "巴黎博物馆门票", "曼谷夜市美食", "悉尼海滩冲浪", "伦敦地铁Oyster卡"]
+    latencies = {}
+    for mode in ("bm25", "vector", "hybrid"):
+        retriever.retrieve(samples[0], mode=mode)  # 预热
+        timings = []
+        for i in range(queries):
+            t = time.perf_counter()
+            retriever.retrieve(samples[i % len(samples)], mode=mode)
+            timings.append(time.perf_counter() - t)
+        latencies[mode] = sorted(timings)[len(timings) // 2]
+    return n, build_time, bm25.nbytes / n, latencies
+
+
+def test_benchmark():
+    n, build_time, per_doc, latencies = benchmark_bm25()
+    print(f"📊 {n} 个片段: BM25构建 {build_time:.2f}s, 每片段 {per_doc:.0f} 字节, 查询中位数 "
+          + ", ".join(f"{mode} {t * 1000:.2f}ms" for mode, t in latencies.items()))
+    assert per_doc < 2048, "倒排表应紧凑存放"
+
+
+if __name__ == "__main__":
+    test_tokenizer()
+    test_bm25_matches_reference()
+    test_reciprocal_rank_fusion()
+    test_retrieval_modes()
+    test_bm25_skips_deleted_rows()
+    test_assistant_rag_mode()
+    test_search_tool_registered()
+    test_benchmark()
@@ -0,0 +1,221 @@
+"""知识库增量导入测试"""
+
+import os
+import shutil
+import tempfile
+import threading
+import time
+# sys.path.append('src')
+
+from src.core.tools.tool_registry import tool_registry
+from src.rag import HashingEmbedder, Retriever, VectorIndex
+from src.rag import retriever as retriever_module
+from src.rag.ingest import Ingestor, ingest_lock, main
+from src.rag.retriever import DEFAULT_CORPUS_DIR
+import src.tools.basic_tools  # noqa: F401  注册 search_travel_guides
+
+
+class CountingEmbedder(HashingEmbedder):
+    """记录每次向量化的批大小，可以在第fail_after批时抛出异常模拟中断"""
+
+    def __init__(self, fail_after=None):
+        super().__init__()
+        self.batches = []
+        self.fail_after = fail_after
+
+    def embed_batch(self, texts):
+        if self.fail_after is not None and len(self.batches) >= self.fail_after:
+            raise RuntimeError("向量化服务不可用")
+        self.batches.append(len(texts))
+        return super().embed_batch(texts)
+
+
+def make_workspace():
+    """复制内置指南到临时语料目录，返回 (语料目录, 索引目录)"""
+    root = tempfile.mkdtemp()
+    corpus = os.path.join(root, "guides")
+    shutil.copytree(DEFAULT_CORPUS_DIR, corpus)
+    return corpus, os.path.join(root, "index")
+
+
+def sources(index):
+    return {index.chunk(i).source for i in range(len(index)) if i not in set(index.deleted.tolist())}
+
+
+def test_second_run_embeds_nothing():
+    """语料未变化时不读取文件内容、不调用向量器"""
+    corpus, index_dir = make_workspace()
+    embedder = CountingEmbedder()
+    first = Ingestor(corpus, index_dir, embedder, batch_size=8).run()
+    assert first.mode == "full" and first.embedded == first.chunks > 0
+    assert max(embedder.batches) <= 8 and sum(embedder.batches) == first.embedded
+
+    embedder.batches.clear()
+    second = Ingestor(corpus, index_dir, embedder).run()
+    assert second.mode == "incremental"
+    assert second.changed == [] and second.embedded == 0 and embedder.batches == []
+    print(f"✅ {first.summary()}")
+    print(f"✅ {second.summary()}")
+
+
+def test_changed_file_only_reembeds_new_chunks():
+    """修改一个文件只向量化变化的片段，旧片段被标记删除"""
+    corpus, index_dir = make_workspace()
+    Ingestor(corpus, index_dir, CountingEmbedder()).run()
+    with open(os.path.join(corpus, "东京.md"), "a", encoding="utf-8") as f:
+        f.write("\n## 温泉\n箱根温泉距离东京约90分钟车程，可以乘小田急浪漫特快前往。\n")
+
+    embedder = CountingEmbedder()
+    report = Ingestor(corpus, index_dir, embedder).run()
+    assert report.changed == ["东京.md"]
+    assert report.embedded == 1 and report.reused == report.chunks - 1
+    assert sum(embedder.batches) == 1
+
+    index = VectorIndex(index_dir)
+    passage = Retriever(index, embedder).retrieve("箱根温泉怎么去", 1)[0]
+    assert passage["heading"] == "东京旅行指南 > 温泉"
+    print(f"✅ 修改文件: {report.summary()}")
+
+
+def test_edit_and_delete_leave_tombstones():
+    """改写片段和删除文件后旧行不再被检索到；重复内容只向量化一次"""
+    corpus, index_dir = make_workspace()
+    Ingestor(corpus, index_dir, CountingEmbedder(), compact_ratio=1.0).run()
+
+    path = os.path.join(corpus, "曼谷.md")
+    with open(path, encoding="utf-8") as f:
+        text = f.read()
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text.replace("冬阴功汤", "冬阴功"))
+    os.remove(os.path.join(corpus, "伦敦.md"))
+    shutil.copy(os.path.join(corpus, "巴黎.md"), os.path.join(corpus, "巴黎副本.md"))
+
+    report = Ingestor(corpus, index_dir, CountingEmbedder(), compact_ratio=1.0).run()
+    assert report.removed == ["伦敦.md"]
+    assert sorted(report.changed) == ["巴黎副本.md", "曼谷.md"]
+    assert report.embedded == 1  # 只有改写的那个片段；副本与原文件内容相同
+    assert report.tombstoned == 1 + 5  # 改写前的片段 + 伦敦的5个片段
+
+    index = VectorIndex(index_dir)
+    assert "伦敦.md" not in sources(index)
+    texts = [index.chunk(i).text for i in range(len(index)) if i not in set(index.deleted.tolist())]
+    assert not any("冬阴功汤" in t for t in texts) and any("冬阴功、" in t for t in texts)
+    results = Retriever(index, HashingEmbedder()).retrieve("伦敦地铁Oyster卡", top_k=50)
+    assert all(p["source"] != "伦敦.md" for p in results)
+    print(f"✅ 删除与去重: {report.summary()}")
+
+
+def test_interrupted_run_recovers():
+    """向量化中途失败不会破坏索引，重新运行后结果与一次成功的导入相同"""
+    corpus, index_dir = make_workspace()
+    Ingestor(corpus, index_dir, CountingEmbedder()).run()
+    before = VectorIndex(index_dir).live_count
+    for name in ("巴黎.md", "悉尼.md"):
+        with open(os.path.join(corpus, name), "a", encoding="utf-8") as f:
+            f.write(f"\n## 补充\n{name}的补充说明。\n")
+
+    try:
+        Ingestor(corpus, index_dir, CountingEmbedder(fail_after=1), batch_size=1).run()
+        assert False
+    except RuntimeError:
+        pass
+    assert VectorIndex(index_dir).live_count == before  # 未提交的追加不可见
+
+    report = Ingestor(corpus, index_dir, CountingEmbedder()).run()
+    index = VectorIndex(index_dir)
+    assert report.embedded == 2 and index.live_count == before + 2
+    hashes = [h for i, h in enumerate(index.row_hashes()) if i not in set(index.deleted.tolist())]
+    assert len(hashes) == len(set(hashes))
+    print(f"✅ 中断后恢复: {report.summary()}")
+
+
+def test_compaction_and_cli():
+    """墓碑过多时压缩；命令行可以全量或增量重建"""
+    corpus, index_dir = make_workspace()
+    main(["--corpus", corpus, "--index", index_dir])
+    for name in ("巴黎.md", "悉尼.md", "曼谷.md"):
+        os.remove(os.path.join(corpus, name))
+
+    report = main(["--corpus", corpus, "--index", index_dir])
+    index = VectorIndex(index_dir)
+    assert report.compacted and len(index.deleted) == 0
+    assert sources(index) == {"东京.md", "伦敦.md", "巴厘岛.md"}
+    assert sorted(f for f in os.listdir(index_dir) if f.startswith("vectors")) == ["vectors.1.f32"]
+
+    full = main(["--corpus", corpus, "--index", index_dir, "--full"])
+    assert full.mode == "full" and full.embedded == full.chunks == len(VectorIndex(index_dir))
+    print("✅ 压缩与命令行重建")
+
+
+def test_concurrent_runs_are_serialized():
+    """同一索引目录的导入互斥：持有锁时其他导入等待，并发导入只向量化一次"""
+    corpus, index_dir = make_workspace()
+    embedder = CountingEmbedder()
+    reports = []
+
+    def run():
+        reports.append(Ingestor(corpus, index_dir, embedder).run())
+
+    with ingest_lock(index_dir):
+        waiting = threading.Thread(target=run)
+        waiting.start()
+        time.sleep(0.2)
+        assert waiting.is_alive() and not reports, "持有锁时导入应等待"
+    waiting.join()
+
+    threads = [threading.Thread(target=run) for _ in range(3)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert sum(embedder.batches) == reports[0].embedded > 0, "并发导入不应重复向量化"
+    assert all(r.embedded == 0 for r in reports[1:])
+    index = VectorIndex(index_dir)
+    assert index.live_count == reports[0].chunks and len(index.deleted) == 0
+    print(f"✅ {len(reports)} 次导入按顺序执行")
+
+
+def test_reingest_refreshes_search_tool():
+    """重新导入后，全局检索器和检索工具的缓存不再返回旧结果"""
+    corpus, index_dir = make_workspace()
+    saved = {k: os.environ.get(k) for k in ("RAG_CORPUS_DIR", "RAG_INDEX_DIR")}
+    os.environ.update(RAG_CORPUS_DIR=corpus, RAG_INDEX_DIR=index_dir)
+    retriever_module._retriever = None
+    tool_registry.clear_cache()
+    try:
+        query = {"query": "雷克雅未克 蓝湖温泉", "mode": "bm25"}
+        before = tool_registry.execute("search_travel_guides", **query)
+        assert all(p["source"] != "冰岛.md" for p in before)
+
+        with open(os.path.join(corpus, "冰岛.md"), "w", encoding="utf-8") as f:
+            f.write("# 冰岛\n\n## 温泉\n雷克雅未克附近的蓝湖温泉需要提前预约。\n")
+        report = Ingestor().run()
+        assert report.changed == ["冰岛.md"]
+
+        after = tool_registry.execute("search_travel_guides", **query)
+        assert after[0]["source"] == "冰岛.md", after
+
+        # 其他索引目录的导入不影响全局检索器
+        current = retriever_module.get_retriever()
+        other_corpus, other_index = make_workspace()
+        Ingestor(other_corpus, other_index, CountingEmbedder()).run()
+        assert retriever_module.get_retriever() is current
+        print(f"✅ 重新导入后检索到: {after[0]['heading']}")
+    finally:
+        for key, value in saved.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+        retriever_module._retriever = None
+        tool_registry.clear_cache()
+
+
+if __name__ == "__main__":
+    test_second_run_embeds_nothing()
+    test_changed_file_only_reembeds_new_chunks()
+    test_edit_and_delete_leave_tombstones()
+    test_interrupted_run_recovers()
+    test_compaction_and_cli()
+    test_concurrent_runs_are_serialized()
+    test_reingest_refreshes_search_tool()
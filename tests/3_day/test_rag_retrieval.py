@@ -0,0 +1,121 @@
+"""目的地知识检索（RAG）测试"""
+
+import tempfile
+import time
+from types import SimpleNamespace
+# sys.path.append('src')
+
+import numpy as np
+
+from src.agents.basic_agent import TravelAssistant
+from rag_helpers import CachedEmbedder, make_retriever
+from src.rag import Chunk, HashingEmbedder, IndexMismatchError, Retriever, VectorIndex, chunk_text
+
+
+def test_chunking_respects_sections():
+    """片段不跨章节，不超过最大长度，超长句子被切开"""
+    text = "# 指南\n\n## 交通\n" + "乘地铁很方便。" * 30 + "\n\n## 美食\n" + "拉" * 500
+    chunks = chunk_text(text, "demo.md", max_chars=100, overlap=20)
+    assert all(len(c.text) <= 100 for c in chunks)
+    assert {c.heading for c in chunks} == {"指南 > 交通", "指南 > 美食"}
+    assert chunks[0].chunk_id == "demo.md#0" and chunks[0].passage.startswith("指南 > 交通\n")
+    # 相邻片段有重叠
+    assert chunks[1].text.startswith("乘地铁很方便。")
+    print(f"✅ 分块: {len(chunks)} 个片段")
+
+
+def test_hashing_embedder_is_deterministic():
+    """哈希向量与进程无关，逐行归一化"""
+    embedder = HashingEmbedder(dim=256)
+    a = embedder.embed_batch(["东京樱花季", "Paris metro", ""])
+    b = embedder.embed_batch(["东京樱花季", "Paris metro", ""])
+    assert a.dtype == np.float32 and a.shape == (3, 256)
+    assert np.array_equal(a, b)
+    assert abs(np.linalg.norm(a[0]) - 1) < 1e-5 and not a[2].any()
+    print("✅ 哈希向量确定且归一化")
+
+
+def test_retrieves_relevant_guides():
+    """检索结果来自相关目的地，批量检索与逐个检索一致"""
+    retriever = make_retriever()
+    queries = ["东京成田机场怎么去市区", "曼谷泼水节是几月", "伦敦地铁用Oyster卡"]
+    expected = ["东京.md", "曼谷.md", "伦敦.md"]
+    for query, source in zip(queries, expected):
+        passages = retriever.retrieve(query)
+        assert passages[0]["source"] == source, (query, passages[0])
+        assert passages[0]["score"] >= passages[-1]["score"]
+    assert retriever.retrieve_many(queries) == [retriever.retrieve(q) for q in queries]
+    print(f"✅ 检索: {retriever.retrieve(queries[0])[0]['heading']}")
+
+
+def test_index_checks_embedder():
+    """换了向量器的索引不能直接使用"""
+    retriever = make_retriever()
+    try:
+        Retriever(retriever.index, HashingEmbedder(dim=128))
+        assert False
+    except IndexMismatchError:
+        pass
+    reopened = VectorIndex(retriever.index.index_dir)
+    assert len(reopened) == len(retriever.index)
+    assert isinstance(reopened.vectors, np.memmap)
+    print("✅ 索引与向量器匹配检查")
+
+
+def test_assistant_injects_passages():
+    """助手把检索到的资料作为系统消息注入上下文"""
+    seen = []
+
+    class Model:
+        def invoke(self, messages, **kwargs):
+            seen.append(messages)
+            return SimpleNamespace(content="好的", tool_calls=[])
+
+    assistant = TravelAssistant(client=Model(), summarize_history=False, use_tools=False,
+                                retriever=make_retriever(), rag_top_k=2)
+    assistant.chat("曼谷大皇宫")
+    knowledge = [m for m in seen[0] if m["role"] == "system" and "目的地资料" in m["content"]]
+    assert len(knowledge) == 1 and "[1]" in knowledge[0]["content"]
+    assert len(assistant.last_passages) == 2 and assistant.last_passages[0]["source"] == "曼谷.md"
+    assert seen[0][-1] == {"role": "user", "content": "曼谷大皇宫"}
+    print(f"✅ 注入资料: {[p['chunk_id'] for p in assistant.last_passages]}")
+
+
+def test_large_index_query_latency():
+    """数万个片段的索引：查询结果正确，打印构建耗时与查询中位数（耗时只作参考，不做断言）"""
+    n, embedder = 30000, HashingEmbedder()
+    rng = np.random.default_rng(0)
+    guides = make_retriever().index
+    vocabulary = [guides.chunk(i).text for i in range(len(guides))]
+    chunks = (Chunk(f"synthetic#{i}", "synthetic", "", vocabulary[i % len(vocabulary)][: 40 + i % 80])
+              for i in range(n))
+
+    start = time.perf_counter()
+    index = VectorIndex.build(tempfile.mkdtemp(), chunks, CachedEmbedder(), batch_size=4096)
+    build_time = time.perf_counter() - start
+    assert len(index) == n
+
+    queries = embedder.embed_batch(["东京机场交通", "巴黎博物馆", "曼谷夜市美食", "悉尼海滩"])
+    index.search(queries[0], 5)  # 预热页缓存
+    latencies = []
+    for _ in range(20):
+        q = queries[rng.integers(len(queries))]
+        t = time.perf_counter()
+        indices, scores = index.search(q, 5)
+        latencies.append(time.perf_counter() - t)
+    p50 = sorted(latencies)[len(latencies) // 2]
+    assert indices.shape == (1, 5) and np.all(np.diff(scores[0]) <= 0)
+
+    # 分块计算与整体计算结果一致
+    small_blocks = VectorIndex(index.index_dir, block_rows=7000)
+    assert np.array_equal(small_blocks.search(queries, 5)[1], index.search(queries, 5)[1])
+    print(f"📊 {n} 个片段：构建 {build_time:.2f}s，查询中位数 {p50 * 1000:.2f}ms")
+
+
+if __name__ == "__main__":
+    test_chunking_respects_sections()
+    test_hashing_embedder_is_deterministic()
+    test_retrieves_relevant_guides()
+    test_index_checks_embedder()
+    test_assistant_injects_passages()
+    test_large_index_query_latency()
@@ -0,0 +1,143 @@
+"""重试策略测试（基于本地假模型）"""
+
+import asyncio
+import sys
+from types import SimpleNamespace
+# sys.path.append('src')
+
+from src.core.llm_router import AllProvidersFailedError, RouterChatModel
+from src.core.retry import DeadlineExceededError, RetryingChatModel, RetryPolicy
+
+
+class HTTPError(Exception):
+    """带状态码的假HTTP错误"""
+
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+class FlakyModel:
+    """前几次调用失败的假模型"""
+
+    def __init__(self, errors):
+        self.errors = list(errors)
+        self.calls = 0
+
+    def _next(self):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return SimpleNamespace(content="成功")
+
+    def invoke(self, messages, **kwargs):
+        return self._next()
+
+    async def ainvoke(self, messages, **kwargs):
+        return self._next()
+
+    def stream(self, messages, **kwargs):
+        self._next()
+        yield SimpleNamespace(content="成")
+        yield SimpleNamespace(content="功")
+
+
+def _policy(**kwargs):
+    """等待只记录不真正sleep，时钟随等待推进"""
+    sleeps = []
+    now = [0.0]
+
+    def sleep(seconds):
+        sleeps.append(seconds)
+        now[0] += seconds
+
+    policy = RetryPolicy(sleep=sleep, rng=lambda: 1.0, clock=lambda: now[0], **kwargs)
+    return policy, sleeps
+
+
+def test_classification():
+    """可重试与不可重试错误的区分"""
+    policy = RetryPolicy()
+    assert policy.is_retryable(HTTPError(429))
+    assert policy.is_retryable(HTTPError(503))
+    assert policy.is_retryable(ConnectionResetError())
+    assert policy.is_retryable(Exception("Rate limit reached"))
+    assert not policy.is_retryable(HTTPError(401))
+    assert not policy.is_retryable(ValueError("参数错误"))
+    print("✅ 错误分类正确")
+
+
+def test_exponential_backoff():
+    """失败后按指数退避重试直到成功"""
+    policy, sleeps = _policy(max_attempts=4, base_delay=0.1, max_delay=0.3)
+    model = RetryingChatModel(FlakyModel([HTTPError(500), HTTPError(429), ConnectionError()]), policy)
+    assert model.invoke([]).content == "成功"
+    assert sleeps == [0.1, 0.2, 0.3], sleeps
+    print(f"✅ 退避序列: {sleeps}")
+
+
+def test_non_retryable_raises_immediately():
+    """不可重试错误不重试"""
+    policy, sleeps = _policy()
+    fake = FlakyModel([HTTPError(400)])
+    try:
+        RetryingChatModel(fake, policy).invoke([])
+        assert False, "应该抛出异常"
+    except HTTPError:
+        pass
+    assert fake.calls == 1 and sleeps == []
+    print("✅ 不可重试错误直接抛出")
+
+
+def test_deadline_caps_total_time():
+    """等待时间超出截止时间时停止重试"""
+    policy, sleeps = _policy(max_attempts=10, base_delay=1.0, deadline=2.5)
+    fake = FlakyModel([ConnectionError()] * 10)
+    try:
+        RetryingChatModel(fake, policy).invoke([])
+        assert False, "应该抛出异常"
+    except DeadlineExceededError:
+        pass
+    assert sum(sleeps) < 2.5, sleeps
+    print(f"✅ 截止时间内共重试 {fake.calls} 次")
+
+
+def test_async_and_stream():
+    """异步调用与流式调用同样重试"""
+    policy = RetryPolicy(base_delay=0.001)
+    model = RetryingChatModel(FlakyModel([HTTPError(502)]), policy)
+    assert asyncio.run(model.ainvoke([])).content == "成功"
+
+    policy, _ = _policy(base_delay=0.001)
+    model = RetryingChatModel(FlakyModel([ConnectionError()]), policy)
+    assert "".join(chunk.content for chunk in model.stream([])) == "成功"
+    print("✅ 异步与流式重试正常")
+
+
+def test_retry_wraps_router():
+    """重试包在路由外层：所有提供商都是可重试错误时整体重试，有不可重试错误时不重试"""
+    policy, sleeps = _policy()
+    primary, backup = FlakyModel([HTTPError(503)]), FlakyModel([ConnectionError()])
+    model = RetryingChatModel(RouterChatModel([("ollama", primary), ("zhipu", backup)]), policy)
+    assert model.invoke([]).content == "成功"
+    assert primary.calls == 2 and len(sleeps) == 1
+
+    policy, sleeps = _policy()
+    model = RetryingChatModel(
+        RouterChatModel([("ollama", FlakyModel([HTTPError(503)])), ("zhipu", FlakyModel([HTTPError(401)]))]), policy)
+    try:
+        model.invoke([])
+        assert False, "应该抛出异常"
+    except AllProvidersFailedError as e:
+        assert len(e.causes) == 2 and sleeps == []
+    assert not policy.is_retryable(AllProvidersFailedError("所有LLM提供商均处于熔断状态"))
+    print("✅ 路由外层的重试按各提供商的错误判断")
+
+
+if __name__ == "__main__":
+    test_classification()
+    test_exponential_backoff()
+    test_non_retryable_raises_immediately()
+    test_deadline_caps_total_time()
+    test_async_and_stream()
+    test_retry_wraps_router()
@@ -0,0 +1,83 @@
+"""目的地季节知识库测试"""
+
+# sys.path.append('src')
+
+from src.core.tools.tool_registry import tool_registry
+from src.core.tools.validators import ToolValidationError
+from src.tools.basic_tools import compare_seasons, get_season_info
+from src.tools.season_engine import season_store
+
+
+def test_every_month_matches_a_season():
+    """每个月都落在某个季节里，包括跨年的季节"""
+    assert get_season_info("曼谷", 12)["季节"] == "凉季 (11-2月)"
+    assert get_season_info("曼谷", 1)["季节"] == "凉季 (11-2月)"
+    assert get_season_info("曼谷", 4)["季节"] == "热季 (3-5月)"
+    assert get_season_info("曼谷", 8)["季节"] == "雨季 (6-10月)"
+    assert get_season_info("东京", 4)["季节"] == "春季 (3-5月)"
+    assert get_season_info("悉尼", 1)["季节"] == "夏季 (12-2月)"
+    for destination in [*season_store.destinations(), "未收录城市"]:
+        for month in range(1, 13):
+            info = get_season_info(destination, month)
+            assert info["季节"] and info["特点"] and info["推荐活动"], (destination, month)
+    print(f"✅ 曼谷12月: {get_season_info('曼谷', 12)}")
+
+
+def test_overview_format():
+    """不指定月份时返回所有季节与最佳旅行时间"""
+    info = get_season_info("曼谷")
+    assert set(info) == {"目的地", "所有季节", "最佳旅行时间"}
+    assert list(info["所有季节"]) == ["凉季 (11-2月)", "热季 (3-5月)", "雨季 (6-10月)"]
+    assert get_season_info("未收录城市")["最佳旅行时间"]
+    try:
+        get_season_info("东京", 13)
+        assert False
+    except ValueError:
+        pass
+    print("✅ 全年概览格式正确")
+
+
+def test_batch_matches_scalar():
+    """批量执行与逐个调用结果一致"""
+    calls = [("get_season_info", {"destination": d, "month": m})
+             for d in ["东京", "曼谷", "伦敦"] for m in (1, 4, 7, 11)]
+    calls.append(("get_season_info", {"destination": "巴黎"}))
+    results = tool_registry.execute_many(calls)
+    assert results == [get_season_info(**kwargs) for _, kwargs in calls]
+
+    table = compare_seasons(["曼谷", "悉尼"], [1, 7])
+    assert len(table["rows"]) == 4
+    assert table["rows"][0][:3] == ["曼谷", 1, "凉季 (11-2月)"]
+    assert len(compare_seasons(["东京"])["rows"]) == 12
+    print(f"✅ 批量查询 {len(calls)} 次结果一致")
+
+
+def test_invalid_month_fails_only_its_call():
+    """月份按1-12校验，不合法的月份只让对应的调用失败"""
+    schema = next(s for s in tool_registry.function_schemas() if s["function"]["name"] == "get_season_info")
+    assert schema["function"]["parameters"]["properties"]["month"]["enum"] == list(range(1, 13))
+
+    tool_registry.clear_cache()
+    results = tool_registry.execute_many([("get_season_info", {"destination": "东京", "month": 4}),
+                                          ("get_season_info", {"destination": "东京", "month": 13}),
+                                          ("get_season_info", {"destination": "曼谷", "month": 1})])
+    assert results[0] == get_season_info("东京", 4) and results[2] == get_season_info("曼谷", 1)
+    assert isinstance(results[1], ToolValidationError)
+    try:
+        tool_registry.execute("compare_seasons", destinations=["东京"], months=[1, 13])
+        assert False
+    except ToolValidationError as e:
+        assert e.errors[0]["param"] == "months"
+
+    # 绕过参数校验直接调用批量实现时同样只影响出错的调用
+    from src.tools.basic_tools import get_season_info_batch
+    batch = get_season_info_batch([{"destination": "东京", "month": 13}, {"destination": "东京", "month": 4}])
+    assert isinstance(batch[0], ValueError) and batch[1] == get_season_info("东京", 4)
+    print("✅ 不合法的月份只让对应调用失败")
+
+
+if __name__ == "__main__":
+    test_every_month_matches_a_season()
+    test_overview_format()
+    test_batch_matches_scalar()
+    test_invalid_month_fails_only_its_call()
@@ -0,0 +1,172 @@
+"""多会话管理测试"""
+
+import asyncio
+import sys
+import threading
+import time
+from types import SimpleNamespace
+# sys.path.append('src')
+
+from src.agents.session_manager import SessionManager
+
+
+class SlowModel:
+    """记录同一会话的并发度；gate 未放行前阻塞"""
+
+    def __init__(self, delay=0.02, gate=None):
+        self.delay = delay
+        self.gate = gate
+        self.active = {}
+        self.max_active = {}
+        self._lock = threading.Lock()
+
+    def _session(self, messages):
+        return messages[-1]["content"].split(":")[0]
+
+    def _enter(self, messages):
+        sid = self._session(messages)
+        with self._lock:
+            self.active[sid] = self.active.get(sid, 0) + 1
+            self.max_active[sid] = max(self.max_active.get(sid, 0), self.active[sid])
+        return sid
+
+    def _exit(self, sid, messages):
+        with self._lock:
+            self.active[sid] -= 1
+        return SimpleNamespace(content="回复 " + messages[-1]["content"], tool_calls=[])
+
+    def invoke(self, messages, **kwargs):
+        sid = self._enter(messages)
+        if self.gate is not None and sid == "a":
+            self.gate.wait(timeout=5)
+        time.sleep(self.delay)
+        return self._exit(sid, messages)
+
+    async def ainvoke(self, messages, **kwargs):
+        sid = self._enter(messages)
+        await asyncio.sleep(self.delay)
+        return self._exit(sid, messages)
+
+
+def make_manager(model, **kwargs):
+    return SessionManager(client=model, **kwargs)
+
+
+def test_same_session_turns_are_serialized():
+    """同一会话的并发请求串行执行，历史不丢失"""
+    model = SlowModel()
+    # 活跃上限小于会话数，请求期间不断触发淘汰
+    manager = make_manager(model, max_active=1)
+    threads = [threading.Thread(target=manager.chat, args=(sid, f"{sid}:问题{i}"))
+               for i in range(8) for sid in ("s1", "s2")]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert model.max_active == {"s1": 1, "s2": 1}, model.max_active
+    assert len(manager.store.load("s1").history) == 16
+    assert len(manager.get("s2").conversation_history) == 16
+    print(f"✅ {len(threads)} 个并发请求按会话串行执行")
+
+
+def test_async_same_session_turns_are_serialized():
+    """异步请求同样按会话串行，不同会话并发"""
+    model = SlowModel()
+    manager = make_manager(model)
+
+    async def run():
+        await asyncio.gather(*(manager.achat(sid, f"{sid}:问题{i}") for sid in ("x", "y") for i in range(4)))
+
+    asyncio.run(run())
+    assert model.max_active == {"x": 1, "y": 1}, model.max_active
+    assert len(manager.get("x").conversation_history) == 8
+    print("✅ 异步请求按会话串行")
+
+
+def test_eviction_keeps_busy_sessions():
+    """淘汰不会丢掉正在处理请求的会话，被淘汰的会话从存储中恢复"""
+    gate = threading.Event()
+    manager = make_manager(SlowModel(delay=0, gate=gate), max_active=2)
+    busy = threading.Thread(target=manager.chat, args=("a", "a:慢请求"))
+    busy.start()
+    time.sleep(0.05)
+
+    for sid in ("b", "c", "d"):
+        manager.chat(sid, f"{sid}:问题")
+    assert "a" in manager._agents, "进行中的会话不应被淘汰"
+    agent_a = manager._agents["a"]
+
+    gate.set()
+    busy.join(timeout=5)
+    assert agent_a.conversation_history[-1]["content"] == "回复 a:慢请求"
+    assert manager.active_sessions() == 2, "请求结束后恢复到上限以内"
+
+    restored = manager.get("b")
+    assert restored.conversation_history[0]["content"] == "b:问题", "被淘汰的会话应从存储恢复"
+    print(f"✅ 淘汰保留忙碌会话，当前活跃 {manager.active_sessions()} 个")
+
+
+def test_sync_and_async_turns_share_session_lock():
+    """同一会话的同步与异步请求共用一把锁，事件循环之间也能正常串行"""
+    model = SlowModel()
+    manager = make_manager(model)
+    thread = threading.Thread(target=lambda: [manager.chat("m", f"m:同步{i}") for i in range(4)])
+
+    async def run():
+        await asyncio.gather(*(manager.achat("m", f"m:异步{i}") for i in range(4)))
+
+    thread.start()
+    asyncio.run(run())
+    asyncio.run(run())
+    thread.join()
+    assert model.max_active == {"m": 1}, model.max_active
+    assert len(manager.get("m").conversation_history) == 24
+    print("✅ 同步与异步请求按会话串行")
+
+
+def test_reset_waits_for_running_turn():
+    """重置会等待该会话进行中的请求结束，不会被随后写入的历史覆盖"""
+    gate = threading.Event()
+    manager = make_manager(SlowModel(delay=0, gate=gate))
+    busy = threading.Thread(target=manager.chat, args=("a", "a:慢请求"))
+    busy.start()
+    time.sleep(0.05)
+    resetter = threading.Thread(target=manager.reset, args=("a",))
+    resetter.start()
+    time.sleep(0.05)
+    assert resetter.is_alive(), "请求进行中时重置应等待"
+    gate.set()
+    busy.join(timeout=5)
+    resetter.join(timeout=5)
+    assert manager.get("a").conversation_history == []
+    print("✅ 重置等待进行中的请求")
+
+
+def test_cancelled_waiter_releases_lock():
+    """等待会话锁的异步请求被取消后，锁不会泄漏"""
+    gate = threading.Event()
+    manager = make_manager(SlowModel(delay=0, gate=gate))
+    busy = threading.Thread(target=manager.chat, args=("a", "a:慢请求"))
+    busy.start()
+    time.sleep(0.05)
+
+    async def cancel_waiter():
+        task = asyncio.ensure_future(manager.achat("a", "a:排队"))
+        await asyncio.sleep(0.1)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    asyncio.run(cancel_waiter())
+    gate.set()
+    busy.join(timeout=5)
+    assert not manager._session_locks["a"].locked()
+    print("✅ 取消等待后锁已释放")
+
+
+if __name__ == "__main__":
+    test_same_session_turns_are_serialized()
+    test_async_same_session_turns_are_serialized()
+    test_eviction_keeps_busy_sessions()
+    test_sync_and_async_turns_share_session_lock()
+    test_reset_waits_for_running_turn()
+    test_cancelled_waiter_releases_lock()
@@ -0,0 +1,120 @@
+"""会话存储测试"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+# sys.path.append('src')
+
+from src.core.session_store import (
+    AppendOnlySessionStore,
+    InMemorySessionStore,
+    SQLiteSessionStore,
+)
+
+
+def _turn(i):
+    return [
+        {"role": "user", "content": f"问题{i}"},
+        {"role": "assistant", "content": f"回答{i}"},
+    ]
+
+
+def _exercise(store):
+    """追加、丢弃、摘要、删除的通用流程"""
+    for i in range(3):
+        store.append("alice", _turn(i))
+    store.drop_oldest("alice", 2)
+    store.set_summary("alice", "用户问过问题0")
+    store.append("bob", _turn(9))
+    store.delete("bob")
+
+    state = store.load("alice")
+    assert [m["content"] for m in state.history] == ["问题1", "回答1", "问题2", "回答2"], state.history
+    assert state.summary == "用户问过问题0"
+    assert store.load("bob").history == []
+
+
+def test_in_memory_store():
+    """内存存储与LRU淘汰"""
+    store = InMemorySessionStore(max_sessions=2)
+    _exercise(store)
+    store.append("c1", _turn(1))
+    store.append("c2", _turn(2))
+    assert store.load("alice").history == [], "最久未访问的会话应被淘汰"
+    print("✅ 内存会话存储正常")
+
+
+def test_sqlite_store_persists():
+    """SQLite存储批量写入并在重启后恢复"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "sessions.db")
+        store = SQLiteSessionStore(path, batch_size=100, flush_interval=60)
+        _exercise(store)
+        store.close()
+
+        reopened = SQLiteSessionStore(path)
+        state = reopened.load("alice")
+        assert len(state.history) == 4 and state.summary == "用户问过问题0"
+        reopened.close()
+    print("✅ SQLite会话存储正常")
+
+
+def test_append_only_store_replays_and_compacts():
+    """追加日志存储回放与压缩"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "sessions.log")
+        store = AppendOnlySessionStore(path, batch_size=100, flush_interval=60)
+        _exercise(store)
+        store.compact()
+        store.close()
+
+        with open(path, encoding="utf-8") as f:
+            assert len(f.readlines()) == 2, "压缩后只剩alice的历史和摘要两条记录"
+
+        reopened = AppendOnlySessionStore(path)
+        state = reopened.load("alice")
+        assert len(state.history) == 4 and state.summary == "用户问过问题0"
+        reopened.close()
+    print("✅ 追加日志会话存储正常")
+
+
+def test_buffered_writes_flush_without_later_writes():
+    """缓冲的写入按间隔后台落盘，其他进程无需等到下一次写入就能读到"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "sessions.db")
+        store = SQLiteSessionStore(path, batch_size=100, flush_interval=0.05)
+        store.append("alice", _turn(1))
+
+        other = sqlite3.connect(path)
+        deadline = time.monotonic() + 2
+        count = 0
+        while time.monotonic() < deadline and count == 0:
+            time.sleep(0.02)
+            count = other.execute("SELECT COUNT(*) FROM messages").fetchone()[0]
+        other.close()
+        assert count == 2, "后台线程应把缓冲的写入落盘"
+        store.close()
+        store.close()  # 重复关闭无副作用
+    print("✅ 缓冲写入按间隔落盘")
+
+
+def test_close_flushes_buffer():
+    """关闭时落盘缓冲区中的写入"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "sessions.log")
+        store = AppendOnlySessionStore(path, batch_size=100, flush_interval=60)
+        store.append("alice", _turn(1))
+        assert os.path.getsize(path) == 0
+        store.close()
+        assert AppendOnlySessionStore(path, flush_interval=0).load("alice").history == _turn(1)
+    print("✅ 关闭时落盘")
+
+
+if __name__ == "__main__":
+    test_in_memory_store()
+    test_sqlite_store_persists()
+    test_append_only_store_replays_and_compacts()
+    test_buffered_writes_flush_without_later_writes()
+    test_close_flushes_buffer()
@@ -0,0 +1,140 @@
+"""滚动摘要测试"""
+
+import sys
+import threading
+from types import SimpleNamespace
+# sys.path.append('src')
+
+from src.core.summarizer import ConversationSummarizer
+
+
+class FakeSummaryClient:
+    """记录调用的假模型：把新增对话追加到已有摘要后面"""
+
+    def __init__(self, delay: threading.Event = None):
+        self.prompts = []
+        self.delay = delay
+
+    def invoke(self, messages):
+        if self.delay is not None:
+            self.delay.wait(timeout=1)
+        prompt = messages[-1]["content"]
+        self.prompts.append(prompt)
+        previous = prompt.split("已有摘要：")[1].split("\n")[0]
+        new = prompt.split("新增对话：\n")[1].split("\n\n")[0].replace("\n", "；")
+        previous = "" if previous == "（无）" else previous + "；"
+        return SimpleNamespace(content=previous + new)
+
+
+def test_incremental_fold():
+    """每次只合并新移出的消息"""
+    client = FakeSummaryClient()
+    summarizer = ConversationSummarizer(client, name="Aria")
+
+    summarizer.submit([{"role": "user", "content": "想去东京"}])
+    summarizer.wait(timeout=2)
+    summarizer.submit([{"role": "assistant", "content": "推荐春季"}])
+    summarizer.wait(timeout=2)
+
+    assert summarizer.summary == "用户: 想去东京；Aria: 推荐春季", summarizer.summary
+    assert "想去东京" not in client.prompts[1].split("新增对话")[1], "旧消息不应重复摘要"
+    assert summarizer.as_message()["role"] == "system"
+    print(f"✅ 摘要: {summarizer.summary}")
+
+
+def test_submissions_are_batched_in_order():
+    """后台任务运行期间的提交会按顺序合并"""
+    gate = threading.Event()
+    client = FakeSummaryClient(delay=gate)
+    summarizer = ConversationSummarizer(client)
+
+    summarizer.submit([{"role": "user", "content": "1"}])
+    summarizer.submit([{"role": "user", "content": "2"}])
+    summarizer.submit([{"role": "user", "content": "3"}])
+    gate.set()
+    summarizer.wait(timeout=2)
+
+    assert summarizer.summary.index("1") < summarizer.summary.index("3")
+    assert len(client.prompts) <= 2
+    print(f"✅ 3次提交合并为 {len(client.prompts)} 次模型调用")
+
+
+def test_reset_clears_summary():
+    """重置后摘要为空"""
+    summarizer = ConversationSummarizer(FakeSummaryClient())
+    summarizer.submit([{"role": "user", "content": "想去巴黎"}])
+    summarizer.wait(timeout=2)
+    summarizer.reset()
+    assert summarizer.as_message() is None
+    print("✅ 摘要已重置")
+
+
+def test_failing_callback_keeps_scheduling():
+    """回调抛出异常后，之后的提交仍会被摘要"""
+    updates = []
+
+    def on_update(summary):
+        updates.append(summary)
+        if len(updates) == 1:
+            raise OSError("存储不可用")
+
+    summarizer = ConversationSummarizer(FakeSummaryClient(), on_update=on_update)
+    summarizer.submit([{"role": "user", "content": "想去悉尼"}])
+    summarizer.wait(timeout=2)
+    summarizer.submit([{"role": "user", "content": "预算一万"}])
+    summarizer.wait(timeout=2)
+    assert len(updates) == 2 and "预算一万" in summarizer.summary, updates
+    print(f"✅ 回调失败后继续摘要: {summarizer.summary}")
+
+
+def test_failed_fold_is_retried():
+    """合并失败的消息放回队首，与之后移出的消息一起重新合并"""
+    gate = threading.Event()
+
+    class FlakyClient(FakeSummaryClient):
+        def invoke(self, messages):
+            if not self.prompts:
+                self.prompts.append(None)
+                self.delay.wait(timeout=1)
+                raise TimeoutError("模型超时")
+            return super().invoke(messages)
+
+    client = FlakyClient(delay=gate)
+    summarizer = ConversationSummarizer(client, retry_delay=0)
+    summarizer.submit([{"role": "user", "content": "想去首尔"}])
+    summarizer.submit([{"role": "user", "content": "五月出发"}])
+    gate.set()
+    summarizer.wait(timeout=2)
+
+    assert "想去首尔" in summarizer.summary and "五月出发" in summarizer.summary, summarizer.summary
+    assert summarizer.summary.index("想去首尔") < summarizer.summary.index("五月出发")
+    print(f"✅ 失败后重试合并: {summarizer.summary}")
+
+
+def test_retries_are_bounded():
+    """重试次数用完后丢弃这批消息，之后的提交仍会被摘要"""
+    class BrokenClient(FakeSummaryClient):
+        def invoke(self, messages):
+            if "想去首尔" in messages[-1]["content"]:
+                self.prompts.append(None)
+                raise TimeoutError("模型超时")
+            return super().invoke(messages)
+
+    client = BrokenClient()
+    summarizer = ConversationSummarizer(client, max_retries=2, retry_delay=0)
+    summarizer.submit([{"role": "user", "content": "想去首尔"}])
+    summarizer.wait(timeout=2)
+    assert len(client.prompts) == 3 and summarizer.summary == ""
+    summarizer.submit([{"role": "user", "content": "预算八千"}])
+    summarizer.wait(timeout=2)
+    assert summarizer.summary == "用户: 预算八千", summarizer.summary
+    print("✅ 重试次数有上限")
+
+
+if __name__ == "__main__":
+    test_incremental_fold()
+    test_submissions_are_batched_in_order()
+    test_reset_clears_summary()
+    test_failing_callback_keeps_scheduling()
+    test_failed_fold_is_retried()
+    test_retries_are_bounded()
@@ -0,0 +1,57 @@
+"""时区引擎测试"""
+
+import datetime
+import sys
+# sys.path.append('src')
+
+from src.tools.basic_tools import get_current_time
+from src.tools.time_engine import UnknownTimezoneError, current_time, resolve_zone, world_clock
+
+# 固定时刻：2025-07-01 12:00 UTC（北半球夏令时期间）
+SUMMER = datetime.datetime(2025, 7, 1, 12, 0, tzinfo=datetime.timezone.utc)
+WINTER = datetime.datetime(2025, 1, 15, 12, 0, tzinfo=datetime.timezone.utc)
+
+
+def test_zone_conversion():
+    """按真实时区换算，与服务器本地时区无关"""
+    assert current_time("Asia/Shanghai", SUMMER) == "2025年07月01日 20:00:00 (Asia/Shanghai 上海 UTC+8)"
+    assert current_time("Asia/Tokyo", SUMMER).startswith("2025年07月01日 21:00:00")
+    print(f"✅ {current_time('Asia/Shanghai', SUMMER)}")
+
+
+def test_daylight_saving():
+    """夏令时自动处理"""
+    assert "08:00:00" in current_time("America/New_York", SUMMER) and "UTC-4 夏令时" in current_time("America/New_York", SUMMER)
+    assert "07:00:00" in current_time("America/New_York", WINTER) and "UTC-5)" in current_time("America/New_York", WINTER)
+    assert "23:00:00" in current_time("悉尼", WINTER) and "夏令时" in current_time("悉尼", WINTER)
+    print("✅ 夏令时正确")
+
+
+def test_aliases_and_offsets():
+    """支持城市名、别名和UTC偏移"""
+    assert resolve_zone("东京")[0] == "Asia/Tokyo"
+    assert resolve_zone("paris")[0] == "Europe/Paris"
+    assert "17:30:00" in current_time("UTC+5:30", SUMMER)
+    try:
+        resolve_zone("Mars/Olympus")
+        assert False
+    except UnknownTimezoneError:
+        pass
+    print("✅ 城市名与UTC偏移")
+
+
+def test_world_clock_single_read():
+    """世界时钟的所有结果对应同一时刻"""
+    clock = world_clock(["Asia/Shanghai", "伦敦", "纽约", "UTC"], SUMMER)
+    assert clock["伦敦"].startswith("2025年07月01日 13:00:00")
+    assert clock["纽约"].startswith("2025年07月01日 08:00:00")
+    assert clock["UTC"].startswith("2025年07月01日 12:00:00")
+    assert "上海" in get_current_time()
+    print(f"✅ 世界时钟: {clock}")
+
+
+if __name__ == "__main__":
+    test_zone_conversion()
+    test_daylight_saving()
+    test_aliases_and_offsets()
+    test_world_clock_single_read()
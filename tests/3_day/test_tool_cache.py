@@ -0,0 +1,100 @@
+"""工具结果缓存测试"""
+
+import sys
+# sys.path.append('src')
+
+from src.core.tools.result_cache import ToolCache
+from src.core.tools.tool_registry import ToolRegistry
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_registry(cache):
+    registry = ToolRegistry()
+    calls = []
+
+    @registry.register(name="budget", description="预算", cache=cache)
+    def budget(days: int, destination: str, travelers: int = 1) -> dict:
+        calls.append((days, destination, travelers))
+        return {"总预算": days * travelers * 100, "详情": {"住宿": 35}}
+
+    @registry.register(name="now", description="当前时间")
+    def now() -> str:
+        calls.append("now")
+        return "12:00"
+
+    return registry, calls
+
+
+def test_canonical_key():
+    """参数形式不同但校验后等价的调用命中同一条目"""
+    registry, calls = make_registry(cache=True)
+    first = registry.execute("budget", days=3, destination="东京")
+    assert registry.execute("budget", days="3", destination="东京") == first
+    assert registry.execute("budget", destination="东京", days=3.0, travelers=1) == first
+    assert len(calls) == 1
+    registry.execute("budget", days=3, destination="东京", travelers=2)
+    assert len(calls) == 2
+
+    stats = registry.cache_stats()["budget"]
+    assert stats["hits"] == 2 and stats["misses"] == 2 and stats["hit_rate"] == 0.5, stats
+    print(f"✅ 规范化缓存键: {stats}")
+
+
+def test_cached_results_are_copies():
+    """修改返回值不会污染缓存"""
+    registry, _ = make_registry(cache=True)
+    result = registry.execute("budget", days=1, destination="巴黎")
+    result["详情"]["住宿"] = 0
+    assert registry.execute("budget", days=1, destination="巴黎")["详情"]["住宿"] == 35
+    print("✅ 缓存返回副本")
+
+
+def test_ttl_and_max_entries():
+    """过期条目重新计算，超出容量时淘汰最久未使用的条目"""
+    clock = FakeClock()
+    registry, calls = make_registry(cache=ToolCache(ttl=10, max_entries=2, clock=clock))
+    registry.execute("budget", days=1, destination="A")
+    clock.now = 11
+    registry.execute("budget", days=1, destination="A")
+    assert len(calls) == 2, "过期后应重新计算"
+
+    registry.execute("budget", days=1, destination="B")
+    registry.execute("budget", days=1, destination="C")
+    registry.execute("budget", days=1, destination="A")
+    assert len(calls) == 5, "A 应已被淘汰"
+    print("✅ TTL与容量限制生效")
+
+
+def test_uncached_tools():
+    """未启用缓存的工具每次都执行"""
+    registry, calls = make_registry(cache=True)
+    registry.execute("now")
+    registry.execute("now")
+    assert calls.count("now") == 2
+    assert "now" not in registry.cache_stats()
+    print("✅ 非确定性工具不缓存")
+
+
+def test_builtin_tools_policy():
+    """内置工具：确定性工具开启缓存，get_current_time不缓存"""
+    from src.core.tools.tool_registry import tool_registry
+    import src.tools.basic_tools  # noqa: F401
+    assert tool_registry.get_tool("calculate_budget").cache is not None
+    assert tool_registry.get_tool("convert_currency").cache is not None
+    assert tool_registry.get_tool("get_current_time").cache is None
+    print("✅ 内置工具缓存策略正确")
+
+
+if __name__ == "__main__":
+    test_canonical_key()
+    test_cached_results_are_copies()
+    test_ttl_and_max_entries()
+    test_uncached_tools()
+    test_builtin_tools_policy()
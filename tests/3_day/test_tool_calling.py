@@ -0,0 +1,171 @@
+"""工具调用循环测试"""
+
+import asyncio
+import io
+import sys
+import time
+from contextlib import redirect_stdout
+from types import SimpleNamespace
+# sys.path.append('src')
+
+from src.agents.basic_agent import TravelAssistant
+from src.core.tool_calling import ToolCallRunner
+from src.core.tools.tool_registry import ToolRegistry
+
+
+def make_registry():
+    registry = ToolRegistry()
+
+    @registry.register(name="slow_budget", description="慢速预算")
+    def slow_budget(days: int) -> dict:
+        time.sleep(0.2)
+        return {"total": days * 100}
+
+    @registry.register(name="slow_rate", description="慢速汇率")
+    def slow_rate(currency: str) -> float:
+        time.sleep(0.2)
+        return 7.2
+
+    return registry
+
+
+class ToolCallingModel:
+    """第一次返回两个工具调用，之后根据工具结果给出回复"""
+
+    def __init__(self, always_call=False):
+        self.calls = []
+        self.always_call = always_call
+
+    def _respond(self, messages, kwargs):
+        self.calls.append((list(messages), kwargs))
+        tool_results = [m for m in messages if isinstance(m, dict) and m["role"] == "tool"]
+        if "tools" in kwargs and (self.always_call or not tool_results):
+            return SimpleNamespace(content="", tool_calls=[
+                {"name": "slow_budget", "args": {"days": "3"}, "id": "call_1"},
+                {"name": "slow_rate", "args": {"currency": "USD"}, "id": "call_2"},
+            ])
+        return SimpleNamespace(content="结果: " + ",".join(m["content"] for m in tool_results), tool_calls=[])
+
+    def invoke(self, messages, **kwargs):
+        return self._respond(messages, kwargs)
+
+    async def ainvoke(self, messages, **kwargs):
+        return self._respond(messages, kwargs)
+
+    def _chunks(self, response):
+        # 工具调用整段返回，文本逐字返回
+        if response.tool_calls:
+            return [response]
+        return [SimpleNamespace(content=ch, tool_calls=[]) for ch in response.content]
+
+    def stream(self, messages, **kwargs):
+        yield from self._chunks(self._respond(messages, kwargs))
+
+    async def astream(self, messages, **kwargs):
+        for chunk in self._chunks(self._respond(messages, kwargs)):
+            yield chunk
+
+
+def make_assistant(model, **kwargs):
+    return TravelAssistant(client=model, summarize_history=False, tool_registry=make_registry(), **kwargs)
+
+
+def test_tool_calls_run_in_parallel():
+    """同一步中的独立工具调用并发执行"""
+    model = ToolCallingModel()
+    assistant = make_assistant(model)
+
+    start = time.perf_counter()
+    reply = assistant.chat("三天预算多少？")
+    elapsed = time.perf_counter() - start
+
+    assert reply == '结果: {"total": 300},7.2', reply
+    assert elapsed < 0.35, f"两个0.2秒的工具应并发执行，实际耗时 {elapsed:.2f}s"
+    assert [t["function"]["name"] for t in model.calls[0][1]["tools"]] == ["slow_budget", "slow_rate"]
+    tool_ids = [m["tool_call_id"] for m in model.calls[1][0] if isinstance(m, dict) and m["role"] == "tool"]
+    assert tool_ids == ["call_1", "call_2"]
+    assert assistant.conversation_history[-1]["content"] == reply
+    print(f"✅ 2个工具调用并发执行，耗时 {elapsed:.2f}s")
+
+
+def test_async_tool_calls_run_in_parallel():
+    """异步版本同样并发执行"""
+    assistant = make_assistant(ToolCallingModel())
+    start = time.perf_counter()
+    reply = asyncio.run(assistant.achat("三天预算多少？"))
+    elapsed = time.perf_counter() - start
+    assert reply.startswith("结果:"), reply
+    assert elapsed < 0.35, elapsed
+    print(f"✅ 异步工具调用并发执行，耗时 {elapsed:.2f}s")
+
+
+def test_step_limit():
+    """模型一直调用工具时，达到步数上限后不再提供工具"""
+    model = ToolCallingModel(always_call=True)
+    assistant = make_assistant(model, max_tool_steps=2)
+    reply = assistant.chat("预算")
+    assert len(model.calls) == 3
+    assert "tools" not in model.calls[-1][1]
+    assert reply.startswith("结果:")
+    print("✅ 达到步数上限后强制给出回复")
+
+
+def test_tool_errors_are_returned_to_model():
+    """工具参数错误以结构化结果返回给模型，不中断对话"""
+    class BadArgsModel(ToolCallingModel):
+        def _respond(self, messages, kwargs):
+            if not any(isinstance(m, dict) and m["role"] == "tool" for m in messages):
+                return SimpleNamespace(content="", tool_calls=[{"name": "slow_budget", "args": {"days": "x"}, "id": "c"}])
+            return super()._respond(messages, {})
+
+    reply = make_assistant(BadArgsModel()).chat("预算")
+    assert "validation_error" in reply, reply
+    print("✅ 工具错误返回给模型")
+
+
+def test_stream_runs_tool_loop():
+    """流式聊天同样执行工具调用，最终回复逐段输出"""
+    model = ToolCallingModel()
+    assistant = make_assistant(model)
+    reply = "".join(assistant.chat_stream("三天预算多少？"))
+    assert reply == '结果: {"total": 300},7.2', reply
+    assert "tools" in model.calls[0][1] and len(model.calls) == 2
+    assert assistant.conversation_history[-1]["content"] == reply
+
+    async def collect():
+        return "".join([part async for part in make_assistant(ToolCallingModel()).achat_stream("三天预算多少？")])
+
+    assert asyncio.run(collect()) == reply
+    print(f"✅ 流式聊天执行工具调用: {reply}")
+
+
+def test_stream_step_limit():
+    """流式聊天达到步数上限后不再提供工具"""
+    model = ToolCallingModel(always_call=True)
+    reply = "".join(make_assistant(model, max_tool_steps=1).chat_stream("预算"))
+    assert len(model.calls) == 2 and "tools" not in model.calls[-1][1]
+    assert reply.startswith("结果:")
+    print("✅ 流式聊天达到步数上限后强制给出回复")
+
+
+def test_runner_does_not_print():
+    """执行工具调用不向标准输出打印（流式回复时会插进正文），通过回调通知调用"""
+    seen = []
+    runner = ToolCallRunner(make_registry(), on_call=seen.append)
+    calls = [{"name": "slow_rate", "args": {"currency": "USD"}, "id": "call_1"}]
+    out = io.StringIO()
+    with redirect_stdout(out):
+        messages = runner.run(calls)
+    assert out.getvalue() == "", out.getvalue()
+    assert seen == calls and messages[0]["content"] == "7.2"
+    print("✅ 工具调用不打印到标准输出")
+
+
+if __name__ == "__main__":
+    test_tool_calls_run_in_parallel()
+    test_async_tool_calls_run_in_parallel()
+    test_step_limit()
+    test_tool_errors_are_returned_to_model()
+    test_stream_runs_tool_loop()
+    test_stream_step_limit()
+    test_runner_does_not_print()
@@ -0,0 +1,105 @@
+"""工具执行策略测试（超时、并发限制、执行器）"""
+
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+# sys.path.append('src')
+
+from src.core.tools.execution import ToolExecutionError, ToolTimeoutError, _get_process_pool
+from src.core.tools.tool_registry import ToolRegistry
+
+registry = ToolRegistry()
+
+
+@registry.register(name="cpu_square", description="在子进程中计算", executor="process")
+def cpu_square(n: int) -> dict:
+    return {"value": n * n, "pid": os.getpid()}
+
+
+def test_timeout_is_structured():
+    """超时返回结构化错误，不会一直阻塞"""
+    local = ToolRegistry()
+
+    @local.register(name="hang", description="挂起的工具", timeout=0.1)
+    def hang(seconds: float) -> str:
+        time.sleep(seconds)
+        return "done"
+
+    start = time.perf_counter()
+    try:
+        local.execute("hang", seconds=1)
+        assert False, "应该超时"
+    except ToolTimeoutError as e:
+        assert isinstance(e, RuntimeError) and isinstance(e, TimeoutError)
+        assert e.to_dict()["error"] == "timeout"
+    assert time.perf_counter() - start < 0.5
+    assert local.execute("hang", seconds=0) == "done"
+    print("✅ 超时返回结构化错误")
+
+
+def test_execution_error_is_structured():
+    """工具内部异常转换为ToolExecutionError"""
+    local = ToolRegistry()
+
+    @local.register(name="boom", description="总是出错")
+    def boom() -> str:
+        raise KeyError("东京")
+
+    try:
+        local.execute("boom")
+        assert False
+    except ToolExecutionError as e:
+        assert e.to_dict() == {"error": "execution_error", "tool": "boom", "message": "'东京'"}
+    print("✅ 执行错误为结构化错误")
+
+
+def test_max_concurrency():
+    """同时执行的调用数不超过max_concurrency"""
+    local = ToolRegistry()
+    active = [0]
+    peak = [0]
+    lock = threading.Lock()
+
+    @local.register(name="limited", description="限流工具", max_concurrency=2, executor="thread")
+    def limited(i: int) -> int:
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.05)
+        with lock:
+            active[0] -= 1
+        return i
+
+    with ThreadPoolExecutor(max_workers=6) as pool:
+        results = list(pool.map(lambda i: local.execute("limited", i=i), range(6)))
+    assert results == list(range(6))
+    assert peak[0] == 2, peak[0]
+    print(f"✅ 并发峰值 {peak[0]}")
+
+
+def test_process_executor():
+    """CPU密集型工具在子进程中执行"""
+    result = registry.execute("cpu_square", n=12)
+    assert result["value"] == 144
+    assert result["pid"] != os.getpid()
+    assert _get_process_pool()._mp_context.get_start_method() == "spawn", "子进程不应从带线程的主进程fork"
+    print("✅ 进程池执行")
+
+
+def test_invalid_policy():
+    try:
+        ToolRegistry().register(name="x", executor="gpu")
+        assert False
+    except ValueError:
+        pass
+    print("✅ 非法执行器被拒绝")
+
+
+if __name__ == "__main__":
+    test_timeout_is_structured()
+    test_execution_error_is_structured()
+    test_max_concurrency()
+    test_process_executor()
+    test_invalid_policy()
@@ -0,0 +1,71 @@
+"""函数调用schema导出测试"""
+
+import json
+import sys
+from typing import Dict, List, Optional
+# sys.path.append('src')
+
+from src.core.tools.tool_registry import ToolRegistry, ToolCategory
+
+
+def _make_registry():
+    registry = ToolRegistry()
+
+    @registry.register(name="compare", description="比较多个目的地", category=ToolCategory.TRAVEL,
+                       choices={"level": ["经济", "豪华"]})
+    def compare(destinations: List[str],
+                prices: Dict[str, float],
+                month: Optional[int] = None,
+                level: str = "经济") -> Dict[str, float]:
+        """
+        Args:
+            destinations: 目的地列表
+            prices: 每日价格
+            month: 月份
+            level: 预算级别
+        """
+        return prices
+
+    return registry
+
+
+def test_json_schema_types():
+    """泛型和Optional类型转换为正确的JSON Schema"""
+    registry = _make_registry()
+    schema = registry.function_schemas()[0]["function"]
+    props = schema["parameters"]["properties"]
+
+    assert props["destinations"] == {"type": "array", "items": {"type": "string"}, "description": "目的地列表"}
+    assert props["prices"]["additionalProperties"] == {"type": "number"}
+    assert props["month"]["type"] == "integer"
+    assert props["level"]["enum"] == ["经济", "豪华"] and props["level"]["default"] == "经济"
+    assert schema["parameters"]["required"] == ["destinations", "prices"]
+
+    params = registry.list_tools()[0]["parameters"]
+    assert params[2]["type"] == "Optional[int]"
+    assert registry.list_tools()[0]["returns"]["type"] == "Dict[str, float]"
+    print("✅ JSON Schema类型正确")
+
+
+def test_schemas_are_memoized_per_version():
+    """schema按注册表版本缓存，注册/清空后失效"""
+    registry = _make_registry()
+    first = registry.function_schemas_json()
+    assert registry.function_schemas_json() is first, "同一版本应返回同一对象"
+    assert json.loads(first)[0]["function"]["name"] == "compare"
+
+    @registry.register(name="noop")
+    def noop() -> str:
+        return ""
+
+    second = registry.function_schemas_json()
+    assert second is not first and len(json.loads(second)) == 2
+
+    registry.clear()
+    assert registry.function_schemas() == [] and registry.list_tools() == []
+    print("✅ schema缓存随注册表版本失效")
+
+
+if __name__ == "__main__":
+    test_json_schema_types()
+    test_schemas_are_memoized_per_version()
@@ -0,0 +1,86 @@
+"""预编译工具参数校验器测试"""
+
+import sys
+from enum import Enum
+from typing import Dict, List, Literal, Optional
+# sys.path.append('src')
+
+from src.core.tools.tool_registry import ToolRegistry, ToolCategory
+from src.core.tools.validators import ToolValidationError
+
+
+class Level(Enum):
+    LOW = "经济"
+    HIGH = "豪华"
+
+
+registry = ToolRegistry()
+
+
+@registry.register(name="plan", category=ToolCategory.TRAVEL, choices={"mode": ["飞机", "高铁"]})
+def plan(days: int,
+         rate: float,
+         month: Optional[int] = None,
+         prices: Dict[str, float] = None,
+         stops: List[int] = None,
+         level: Level = Level.LOW,
+         season: Literal["春", "秋"] = "春",
+         mode: str = "飞机",
+         flexible: bool = False) -> dict:
+    return {"days": days, "rate": rate, "month": month, "prices": prices, "stops": stops,
+            "level": level, "season": season, "mode": mode, "flexible": flexible}
+
+
+def test_coerced_values_reach_the_tool():
+    """转换后的参数会真正传给工具"""
+    result = registry.execute(
+        "plan", days="3", rate=2, month="4", prices={"东京": "150"}, stops=["1", 2.0],
+        level="豪华", flexible="false",
+    )
+    assert result["days"] == 3 and isinstance(result["rate"], float)
+    assert result["month"] == 4
+    assert result["prices"] == {"东京": 150.0}
+    assert result["stops"] == [1, 2]
+    assert result["level"] is Level.HIGH
+    assert result["flexible"] is False
+    print(f"✅ 参数已转换: {result}")
+
+
+def test_optional_accepts_none():
+    """Optional参数可以显式传None"""
+    assert registry.execute("plan", days=1, rate=1.0, month=None)["month"] is None
+    print("✅ Optional参数接受None")
+
+
+def test_structured_errors():
+    """校验失败返回结构化错误"""
+    try:
+        registry.execute("plan", rate="很贵", season="夏", mode="轮船", extra=1)
+        assert False, "应该抛出异常"
+    except ToolValidationError as e:
+        codes = {err["param"]: err["code"] for err in e.errors}
+        assert codes == {
+            "days": "missing",
+            "rate": "type_error",
+            "season": "invalid_choice",
+            "mode": "invalid_choice",
+            "extra": "unexpected",
+        }, codes
+        assert isinstance(e, ValueError), "应保持ValueError兼容"
+        assert e.to_dict()["tool"] == "plan"
+        print(f"✅ 结构化错误: {e}")
+
+
+def test_validate_arguments_compat():
+    """validate_arguments 仍返回布尔值"""
+    tool = registry.get_tool("plan")
+    assert tool.validate_arguments(days=1, rate=1)
+    assert not tool.validate_arguments(days="x", rate=1)
+    print("✅ validate_arguments兼容")
+
+
+if __name__ == "__main__":
+    test_coerced_values_reach_the_tool()
+    test_optional_accepts_none()
+    test_structured_errors()
+    test_validate_arguments_compat()